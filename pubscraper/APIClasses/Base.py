@@ -1,7 +1,126 @@
+import asyncio
+
+from pubscraper import budget
+from pubscraper.cache import Cache
+from pubscraper.stats import RunStats
+from pubscraper.transport import Transport, make_session
+
+
 class Base:
-    def get_publications_by_author(self, author_name: str, rows: int = 10):
+    # number of authors handed to get_publications_by_authors at once. APIs
+    # that can combine authors into one query (OR queries, batched fetches)
+    # raise it; the default keeps one author per call.
+    batch_size = 1
+    # requests per second the API class limits itself to (None if it isn't
+    # throttled), reported next to the actual request rate in progress output
+    requests_per_second = None
+
+    def __init__(self, cache: Cache = None, stats: RunStats = None):
+        self.cache = cache if cache is not None else Cache()
+        self.stats = stats if stats is not None else RunStats()
+        # optional concurrent.futures.ProcessPoolExecutor used for parsing
+        self.parse_pool = None
+        self.transport = Transport(self.get_name(), self.cache, self.stats)
+
+    def configure(
+        self, cache: Cache = None, stats: RunStats = None, parse_pool=None, http_client=None
+    ):
+        """
+        Share a cache, run statistics and parse pool between API classes
+        :param http_client: HTTP client to send requests with (see
+        transport.CLIENTS)
+        """
+        if cache is not None:
+            self.cache = cache
+            self.transport.cache = cache
+        if stats is not None:
+            self.stats = stats
+            self.transport.stats = stats
+        if parse_pool is not None:
+            self.parse_pool = parse_pool
+        if http_client is not None:
+            self.transport.session = make_session(http_client)
+
+    def _parse(self, func, *args):
+        """
+        Run a module-level parsing function on a raw response body, in the
+        parse pool if one is configured so CPU-bound parsing doesn't hold up
+        the thread issuing requests
+        :param func: picklable parsing function
+        :return: whatever func returns
+        """
+        if self.parse_pool is None:
+            return func(*args)
+        self.stats.incr(f"{self.get_name()}.parses_offloaded")
+        return self.parse_pool.submit(func, *args).result()
+
+    def get_publications_by_author(
+        self, author_name: str, rows: int = 10, since: str = None, orcid: str = None
+    ):
         pass
 
+    def get_publications_by_authors(
+        self,
+        authors: list[str],
+        rows: int = 10,
+        since: str = None,
+        budgets: dict = None,
+        orcids: dict = None,
+    ):
+        """
+        Look up several authors at once, yielding each author's results as
+        soon as they are ready. This default queries one author at a time.
+        :param authors: names of the authors to search
+        :param rows: maximum number of publications to return per author
+        :param since: only publications published after this date are needed
+        (APIs may ignore it; results are filtered again later)
+        :param budgets: optional {author: Budget} dict; requests made for an
+        author are charged to their budget
+        :param orcids: optional {author: ORCID iD} dict; authors with an iD are
+        searched by it instead of their name
+        :return: a generator of (author, publications) tuples
+        """
+        for author in authors:
+            author_budget = budgets.get(author) if budgets else budget.current()
+            orcid = orcids.get(author) if orcids else None
+            with budget.activate(author_budget):
+                publications = self.get_publications_by_author(
+                    author, rows, since=since, orcid=orcid
+                )
+            yield author, publications
+
+    async def aget_publications_by_authors(
+        self,
+        authors: list[str],
+        rows: int = 10,
+        since: str = None,
+        budgets: dict = None,
+        orcids: dict = None,
+    ):
+        """
+        Async variant of get_publications_by_authors. Requests are still
+        made by the blocking implementation, in a worker thread, so the rate
+        limits and the cache are shared with synchronous callers.
+        :return: an async generator of (author, publications) tuples
+        """
+        results = self.get_publications_by_authors(authors, rows, since, budgets, orcids)
+        done = object()
+        while True:
+            result = await asyncio.to_thread(budget.bind(next), results, done)
+            if result is done:
+                return
+            yield result
+
+    def get_publications_by_dois(self, dois: list[str], author_name: str = None) -> dict:
+        """
+        Look up publications by DOI, to complete publications found by other
+        APIs that are missing fields. APIs with a bulk DOI lookup override
+        this; the default finds nothing.
+        :param author_name: author the lookup is made for (for statistics)
+        :return: dict of {lowercase DOI: publication}
+        """
+        return {}
+
     def get_name(self):
         class_name = type(self).__name__
         return class_name
@@ -1,9 +1,14 @@
 import requests
+import itertools
 import json
 import logging
 from dateutil.parser import parse
+from ratelimit import limits, sleep_and_retry
 
 from pubscraper.APIClasses.Base import Base
+from pubscraper.budget import BudgetExceeded
+from pubscraper.cache import NEGATIVE
+from pubscraper import serializers
 import pubscraper.config as config
 
 logger = logging.getLogger(__name__)
@@ -11,19 +16,32 @@ logger = logging.getLogger(__name__)
 # NOTE: we might want to limit results to works published after TACC was founded
 
 """
-Many results from CrossRef are are missing data we're interested in. Currently,
-we skip over results with missing data and make another request. If we requested
-10 rows, we repeat this process until we have 10 valid publications for each author.
-This is a slow process, and we should think about better solutions
+Many results from CrossRef are are missing data we're interested in. Results
+without a title are skipped and another request is made: if we requested 10 rows,
+we repeat this process until we have 10 valid publications for each author, every
+result has been looked at, or the author's budget runs out (in which case the
+publications found so far are returned). Results that only miss other fields (e.g.
+the journal) are kept, and the pipeline completes them by looking their DOIs up in
+the other APIs (see pubscraper.enrich).
 """
 
 
 class CrossRef(Base):
-    def __init__(self):
+    # CrossRef's public pool allows 5 requests per second
+    requests_per_second = 5
+
+    def __init__(self, cache=None, stats=None):
+        super().__init__(cache, stats)
         self.base_url = config.CROSSREF_URL
 
+    @sleep_and_retry
+    @limits(calls=requests_per_second, period=1)
+    def _throttle(self):
+        pass
+
     # TODO: should these extract methods be squished to one method w a switch? ask erik
-    def _extract_journal(self, publication_item):
+    @staticmethod
+    def _extract_journal(publication_item):
         try:
             journal = publication_item["container-title"][0]
             logging.debug(f"Successfully extracted journal: {journal}")
@@ -32,9 +50,12 @@ class CrossRef(Base):
             logging.debug(f"Error fetching container-title from {publication_item} \n")
             return None
 
-    def _extract_authors(self, publication_item):
+    @staticmethod
+    def _extract_authors(publication_item):
+        # many works (e.g. editorials, datasets) have no "author" key at all;
+        # they are kept, and enrichment looks their authors up elsewhere
         authors = []
-        for author in publication_item["author"]:
+        for author in publication_item.get("author", []):
             try:
                 name = author["given"] + " " + author["family"]
             except KeyError:
@@ -46,10 +67,11 @@ class CrossRef(Base):
                 logging.debug(f"No author name found in {author} \n")
             authors.append(name)
             logging.debug(f"added {name} to author list")
-        return (",").join(authors)
+        return (",").join(authors) or None
 
-    def _extract_publication_date(self, publication_item):
-        logging.debug(json.dumps(publication_item, indent=2))
+    @staticmethod
+    def _extract_publication_date(publication_item):
+        serializers.log_payload(logger, "CrossRef item", publication_item)
         try:
             # Extract the `date-time` field from the `created` key
             date_time = publication_item.get("created", {}).get("date-time", None)
@@ -63,27 +85,50 @@ class CrossRef(Base):
             logging.error(f"Error extracting `date-time`: {e}")
             return None
         
-    def _extract_title(self, publication_item):
+    @staticmethod
+    def _extract_title(publication_item):
         try:
             title = publication_item["title"][0]
             logging.debug(f"Successfuly extracted title: {title}")
             return title
-        except KeyError:
+        except (KeyError, IndexError):
             logging.debug(f"Error fetching title from {publication_item} \n")
             return None
 
-    def _is_valid_pub(self, pub: dict[str, str]) -> bool:
-        for item in pub:
-            if pub[item] is None:
-                return False
-        return True
+    @staticmethod
+    def _is_valid_pub(pub: dict[str, str]) -> bool:
+        # other missing fields can be filled in by enrichment, but a work
+        # without a title is usually a component (figure, table) of another
+        return bool(pub["title"] and pub["doi"])
 
-    def _aggregate_publications(self, author_name, rows=10, offset=0):
+    @staticmethod
+    def _query_params(author_name, since=None, orcid=None):
+        """
+        :param since: date in YYYY, YYYY-MM, or YYYY-MM-DD format (optional)
+        :param orcid: the author's ORCID iD (optional)
+        :return: query parameters selecting works by the author (by ORCID iD
+        when there is one, by name otherwise), published on or after since
+        """
+        filters = []
+        params = {}
+        if orcid:
+            filters.append(f"orcid:{orcid}")
+        else:
+            params["query.author"] = author_name.replace(" ", "+")
+        if since:
+            filters.append(f"from-pub-date:{since}")
+        if filters:
+            params["filter"] = ",".join(filters)
+        return params
+
+    def _aggregate_publications(self, author_name, rows=10, offset=0, since=None, orcid=None):
         """
         Given the name of an author, search CrossRef for works written by
         that author name
         :params author_name: name of author to search
         :params rows: maximum number of publications to return (default is 10)
+        :params since: only search for works published on or after this date (optional)
+        :params orcid: search by this ORCID iD instead of the name (optional)
         :return: a list of publication objects/dicts holding UID, journal name,
         publication date, title, and list of authors for each publication
         """
@@ -99,62 +144,86 @@ class CrossRef(Base):
             return 0, None
 
         params = {
-            "query.author": author_name.replace(" ", "+"),
+            **self._query_params(author_name, since, orcid),
             "rows": rows,
             "offset": offset,
             "mailto": "jlh7459@my.utexas.edu",
         }
-        
+        self.stats.incr("CrossRef.requests", author=author_name)
+
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.transport.get(
+                self.base_url, params=params, timeout=10, throttle=self._throttle
+            )
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             logging.error(f"CrossRef API request error: {e}")
-            return []
+            return 0, None
 
-        data = response.json()
-        logging.debug(json.dumps(data, indent=2))
+        total_results, publications = self._parse(parse_works_page, response.content)
 
-        total_results = data["message"]["total-results"]
+        logging.debug(
+            f"found {len(publications)} valid publications for author {author_name}"
+        )
 
-        publications = []
+        return total_results, publications
 
-        for publication_item in data["message"]["items"]:
-            # Extract and standardize the publication date to "YYYY-MM-DD"
-            raw_publication_date = self._extract_publication_date(publication_item)
-            if raw_publication_date:
-                try:
-                    publication_date = parse(raw_publication_date).strftime("%Y-%m-%d")
-                except Exception as e:
-                    logging.warning(f"Error parsing publication date: {e}")
-                    publication_date = None
-            else:
-                publication_date = None
+    def _negative_key(self, author_name, since=None, orcid=None):
+        key = f"CrossRef:orcid:{orcid}" if orcid else f"CrossRef:query.author:{author_name}"
+        return f"{key}:since={since}" if since else key
 
-            journal = self._extract_journal(publication_item)
-            title = self._extract_title(publication_item)
-            authors = self._extract_authors(publication_item)
-            doi = publication_item["DOI"]
-
-            pub = {
-                "from": "CrossRef",
-                "journal": journal,
-                "publication_date": publication_date,
-                "title": title,
-                "authors": authors,
-                "doi": doi,
-            }
+    def _count_results(self, author_name, since=None, orcid=None):
+        """
+        Ask CrossRef how many works match an author without downloading any
+        :return: the total number of results, or None if the request failed
+        """
+        params = {
+            **self._query_params(author_name, since, orcid),
+            "rows": 0,
+            "mailto": "jlh7459@my.utexas.edu",
+        }
+        self.stats.incr("CrossRef.count_requests", author=author_name)
 
-            if self._is_valid_pub(pub):
-                publications.append(pub)
+        try:
+            # a cached count would only repeat the answer being rechecked
+            response = self.transport.get(
+                self.base_url,
+                params=params,
+                timeout=10,
+                throttle=self._throttle,
+                use_cache=False,
+            )
+            response.raise_for_status()
+            return serializers.loads(response.content)["message"]["total-results"]
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            logging.error(f"CrossRef API request error: {e}")
+            return None
 
-        logging.debug(
-            f"found {len(publications)} valid publications for author {author_name}"
-        )
+    def _get_known_short(self, author, since=None, orcid=None):
+        """
+        Check the negative cache for an author whose results were exhausted
+        before reaching the requested number of rows on a previous run. Unless
+        config.NEGATIVE_CACHE_RECHECK is off, a count-only request confirms
+        that nothing new has been published since.
+        :return: the cached list of publications, or None on a cache miss
+        """
+        key = self._negative_key(author, since, orcid)
+        known = self.cache.get(NEGATIVE, key)
+        if known is None:
+            return None
 
-        return total_results, publications
+        if config.NEGATIVE_CACHE_RECHECK:
+            if self._count_results(author, since, orcid) != known["total_results"]:
+                logging.debug(f"Results for {author} have changed, searching again")
+                self.cache.delete(NEGATIVE, key)
+                return None
 
-    def get_publications_by_author(self, author: str, rows: int = 10):
+        self.stats.incr("CrossRef.negative_cache_hits", author=author)
+        return known["publications"]
+
+    def get_publications_by_author(
+        self, author: str, rows: int = 10, since: str = None, orcid: str = None
+    ):
         if rows < 0:
             logging.error(f"Rows must be a positive number (received {rows})")
             raise ValueError("Rows must be a positive number")
@@ -164,31 +233,50 @@ class CrossRef(Base):
             return None
 
         publications = []
-        desired_rows = rows
-        offset = len(publications)
-        logging.debug(
-            f"Initial request: requesting {rows} publications from {author} (offset = {offset})"
-        )
-        while len(publications) < desired_rows:
-            total_results, pubs = self._aggregate_publications(author, rows, offset)
-            if pubs is None:
-                # an error occured in _aggregate_publications, return None
-                return None
-
-            logging.debug(f"Received {len(pubs)} valid publications for {author}")
-            publications += pubs
-
-            if total_results < rows:
-                logging.warning(
-                    f"Requested {rows} publications from {author}, found {total_results}"
-                )
-                return publications
+        try:
+            known_publications = self._get_known_short(author, since, orcid)
+            if known_publications is not None:
+                logging.debug(f"Using cached results for {author}")
+                return known_publications[:rows] or None
 
-            offset += rows
-            rows -= len(pubs)
+            desired_rows = rows
+            offset = len(publications)
             logging.debug(
-                f"Requesting {rows} more publications by {author} (offset = {offset})"
+                f"Initial request: requesting {rows} publications from {author} (offset = {offset})"
             )
+            while len(publications) < desired_rows:
+                total_results, pubs = self._aggregate_publications(
+                    author, rows, offset, since, orcid
+                )
+                if pubs is None:
+                    # an error occured in _aggregate_publications, return None
+                    return None
+
+                logging.debug(f"Received {len(pubs)} valid publications for {author}")
+                publications += pubs
+
+                # stop once every result has been looked at, even if too few were valid
+                if total_results < rows or offset + rows >= total_results:
+                    logging.warning(
+                        f"Requested {desired_rows} publications from {author}, "
+                        f"found {len(publications)} valid of {total_results}"
+                    )
+                    self.cache.set(
+                        NEGATIVE,
+                        self._negative_key(author, since, orcid),
+                        {"total_results": total_results, "publications": publications},
+                        ttl=config.NEGATIVE_CACHE_TTL,
+                    )
+                    return publications
+
+                offset += rows
+                rows -= len(pubs)
+                logging.debug(
+                    f"Requesting {rows} more publications by {author} (offset = {offset})"
+                )
+        except BudgetExceeded as e:
+            logging.warning(f"Stopped searching CrossRef for {author}: {e}")
+            return publications or None
 
         logging.debug(
             f"Retrieved {len(publications)} publications by {author} from CrossRef"
@@ -196,6 +284,86 @@ class CrossRef(Base):
         return publications or None
 
 
+    def get_publications_by_dois(self, dois: list[str], author_name: str = None) -> dict:
+        """
+        Look up works by DOI with filter=doi:a,doi:b,..., up to
+        config.ENRICH_BATCH_SIZE DOIs per request
+        :return: dict of {lowercase DOI: publication}
+        """
+        publications = {}
+        # commas separate filters, so DOIs containing one can't be looked up
+        dois = [doi for doi in dois if "," not in doi]
+        for batch in itertools.batched(dois, config.ENRICH_BATCH_SIZE):
+            params = {
+                "filter": ",".join(f"doi:{doi}" for doi in batch),
+                "rows": len(batch),
+                "mailto": "jlh7459@my.utexas.edu",
+            }
+            self.stats.incr("CrossRef.doi_requests", author=author_name)
+            try:
+                response = self.transport.get(
+                    self.base_url, params=params, timeout=10, throttle=self._throttle
+                )
+                response.raise_for_status()
+                _, pubs = self._parse(parse_works_page, response.content)
+            except BudgetExceeded as e:
+                logging.warning(f"Stopped looking up DOIs in CrossRef: {e}")
+                break
+            except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+                logging.error(f"CrossRef API request error: {e}")
+                continue
+            for pub in pubs:
+                publications[pub["doi"].lower()] = pub
+        return publications
+
+
+def parse_works_page(body):
+    """
+    Extract publications from a page of CrossRef /works results. Kept at
+    module level so it can be sent to a process pool (see Base._parse).
+    :params body: raw JSON response body
+    :return: the total number of results for the query, and a list of the
+    valid publications on this page
+    """
+    data = serializers.loads(body)
+    serializers.log_payload(logger, "CrossRef response", data)
+
+    total_results = data["message"]["total-results"]
+
+    publications = []
+
+    for publication_item in data["message"]["items"]:
+        # Extract and standardize the publication date to "YYYY-MM-DD"
+        raw_publication_date = CrossRef._extract_publication_date(publication_item)
+        if raw_publication_date:
+            try:
+                publication_date = parse(raw_publication_date).strftime("%Y-%m-%d")
+            except Exception as e:
+                logging.warning(f"Error parsing publication date: {e}")
+                publication_date = None
+        else:
+            publication_date = None
+
+        journal = CrossRef._extract_journal(publication_item)
+        title = CrossRef._extract_title(publication_item)
+        authors = CrossRef._extract_authors(publication_item)
+        doi = publication_item["DOI"]
+
+        pub = {
+            "from": "CrossRef",
+            "journal": journal,
+            "publication_date": publication_date,
+            "title": title,
+            "authors": authors,
+            "doi": doi,
+        }
+
+        if CrossRef._is_valid_pub(pub):
+            publications.append(pub)
+
+    return total_results, publications
+
+
 def search_multiple_authors(authors: list[str], rows: int = 10):
     crossref = CrossRef()
     all_results = {}
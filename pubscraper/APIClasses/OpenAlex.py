@@ -0,0 +1,288 @@
+import requests
+import json
+import logging
+from datetime import datetime
+from dateutil.parser import parse
+from ratelimit import limits, sleep_and_retry
+
+from pubscraper.APIClasses.Base import Base
+from pubscraper.budget import BudgetExceeded
+from pubscraper.cache import NEGATIVE, STATE
+from pubscraper import budget, serializers
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+OpenAlex can OR up to 50 values in a single filter, so instead of searching
+works by name for every author, each author is resolved to an OpenAlex
+author ID once (and remembered in the cache), and the works of a whole batch
+of authors are then listed with a single author.id:A1|A2|... filter, paged
+with a cursor. Only the fields we use are requested (select=).
+"""
+
+MAILTO = "jlh7459@my.utexas.edu"
+AUTHOR_FIELDS = "id,display_name,orcid,last_known_institutions,affiliations"
+WORK_FIELDS = "id,doi,title,publication_date,type,primary_location,authorships"
+
+
+class OpenAlex(Base):
+    batch_size = config.OPENALEX_BATCH_SIZE
+    # OpenAlex allows 10 requests per second
+    requests_per_second = 10
+
+    def __init__(self, cache=None, stats=None, affiliation=config.AFFILIATION_KEYWORD):
+        super().__init__(cache, stats)
+        self.authors_url = config.OPENALEX_AUTHORS_URL
+        self.works_url = config.OPENALEX_WORKS_URL
+        # namesakes found by a name search are told apart by this institution
+        self.affiliation = affiliation
+
+    @sleep_and_retry
+    @limits(calls=requests_per_second, period=1)
+    def _throttle(self):
+        pass
+
+    def _make_request(self, url, params):
+        response = self.transport.get(url, params=params, timeout=10, throttle=self._throttle)
+        response.raise_for_status()
+        return response
+
+    def _search_authors(self, author_name, params):
+        """
+        :return: the authors an /authors query returns, or None if the
+        request failed
+        """
+        params = {**params, "select": AUTHOR_FIELDS, "mailto": MAILTO}
+        self.stats.incr("OpenAlex.author_lookups", author=author_name)
+        try:
+            response = self._make_request(self.authors_url, params)
+            return serializers.loads(response.content)["results"]
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            logging.error(f"OpenAlex API request error: {e}")
+            return None
+
+    def _resolve_author(self, author_name, orcid=None):
+        """
+        Find the OpenAlex author ID for an ORCID iD, or for a name when there
+        is no iD or OpenAlex doesn't know it. A name search returns several
+        namesakes; the one with the ORCID iD is preferred, then one affiliated
+        with self.affiliation, then the best match. IDs are remembered for
+        config.OPENALEX_AUTHOR_TTL; names and iDs without a match are
+        remembered for config.NEGATIVE_CACHE_TTL.
+        :return: a short author ID (e.g. "A5023888391"), or None
+        """
+        key = f"OpenAlex.orcid:{orcid}" if orcid else f"OpenAlex.author:{author_name}"
+        author_id = self.cache.get(STATE, key)
+        if author_id is not None:
+            return author_id
+        if self.cache.get(NEGATIVE, key) is not None:
+            self.stats.incr("OpenAlex.negative_cache_hits", author=author_name)
+            return None
+
+        results = None
+        if orcid:
+            results = self._search_authors(author_name, {"filter": f"orcid:{orcid}", "per-page": 1})
+        if not results:
+            params = {"search": author_name, "per-page": config.OPENALEX_AUTHOR_CANDIDATES}
+            results = self._search_authors(author_name, params)
+            if results is None:
+                return None
+
+        candidate = pick_author(results, orcid, self.affiliation)
+        if candidate is None:
+            logging.info(f"No OpenAlex author found for {author_name}")
+            self.cache.set(NEGATIVE, key, {"count": 0}, ttl=config.NEGATIVE_CACHE_TTL)
+            return None
+        author_id = candidate["id"].rsplit("/", 1)[-1]
+        logging.debug(f"Resolved {author_name} to OpenAlex author {author_id}")
+        self.cache.set(STATE, key, author_id, ttl=config.OPENALEX_AUTHOR_TTL)
+        return author_id
+
+    def _list_works(self, author_ids, rows, since=None):
+        """
+        List the works of several authors with one filter, following the
+        cursor until every author has rows works, the results run out, or
+        config.OPENALEX_MAX_PAGES pages have been read
+        :param author_ids: dict of {author_id: [author_names]}
+        :return: dict of {author_name: [publications]}, and whether the
+        budget ran out before every page that was needed could be read
+        """
+        filters = [f"author.id:{'|'.join(author_ids)}"]
+        if since:
+            try:
+                # missing months and days default to 1 rather than today's
+                since = parse(since, default=datetime(1, 1, 1)).strftime("%Y-%m-%d")
+                filters.append(f"from_publication_date:{since}")
+            except (ValueError, OverflowError):
+                logging.warning(f"Could not parse date {since}, not filtering by date")
+        params = {
+            "filter": ",".join(filters),
+            "select": WORK_FIELDS,
+            "sort": "publication_date:desc",
+            "per-page": config.OPENALEX_PAGE_SIZE,
+            "cursor": "*",
+            "mailto": MAILTO,
+        }
+
+        publications = {name: [] for names in author_ids.values() for name in names}
+        for _ in range(config.OPENALEX_MAX_PAGES):
+            self.stats.incr("OpenAlex.works_requests")
+            try:
+                response = self._make_request(self.works_url, params)
+            except BudgetExceeded as e:
+                logging.warning(f"Stopped listing OpenAlex works: {e}")
+                return publications, True
+            except requests.exceptions.RequestException as e:
+                logging.error(f"OpenAlex API request error: {e}")
+                return publications, False
+
+            next_cursor, works = self._parse(parse_works_page, response.content)
+            for work_author_ids, pub in works:
+                for author_id in dict.fromkeys(work_author_ids):
+                    for name in author_ids.get(author_id, []):
+                        if len(publications[name]) < rows:
+                            publications[name].append(pub)
+
+            if not next_cursor or all(len(pubs) >= rows for pubs in publications.values()):
+                break
+            params["cursor"] = next_cursor
+        return publications, False
+
+    def get_publications_by_authors(
+        self, authors, rows=10, since=None, budgets=None, orcids=None
+    ):
+        """
+        Resolve each author to an OpenAlex author ID (by ORCID iD when
+        orcids has one for them), then list the works of all of them with a
+        single (paged) filter
+        :return: a generator of (author, publications) tuples
+        """
+        if rows < 0:
+            logging.error(f"Rows must be a positive number (received {rows})")
+            raise ValueError("Rows must be a positive number")
+
+        author_ids = {}
+        for author in authors:
+            if not author:
+                logging.warning("received empty string for author name, returning None")
+                yield author, None
+                continue
+            author_budget = budgets.get(author) if budgets else budget.current()
+            try:
+                with budget.activate(author_budget):
+                    author_id = self._resolve_author(author, (orcids or {}).get(author))
+            except BudgetExceeded as e:
+                logging.warning(f"Stopped searching OpenAlex for {author}: {e}")
+                author_id = None
+            if author_id is None:
+                yield author, None
+            else:
+                author_ids.setdefault(author_id, []).append(author)
+
+        if not author_ids:
+            return
+        publications, truncated = self._list_works(author_ids, rows, since)
+        for author, pubs in publications.items():
+            if truncated and len(pubs) < rows and budgets and author in budgets:
+                budgets[author].exhausted = True
+            logging.debug(f"Retrieved {len(pubs)} publications by {author}")
+            yield author, pubs or None
+
+    def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+        orcids = {author_name: orcid} if orcid else None
+        for _, publications in self.get_publications_by_authors(
+            [author_name], rows, since, orcids=orcids
+        ):
+            return publications
+        return None
+
+
+def pick_author(candidates, orcid=None, affiliation=None):
+    """
+    Pick the author a roster entry refers to among the results of an
+    /authors query, which are sorted by relevance
+    :param orcid: the author's ORCID iD, if known
+    :param affiliation: text the name of one of the author's institutions
+    should contain
+    :return: the ORCID iD's author, else the first author affiliated with
+    affiliation, else the first author (None if there are no candidates)
+    """
+    if not candidates:
+        return None
+    if orcid:
+        for candidate in candidates:
+            if (candidate.get("orcid") or "").rsplit("/", 1)[-1] == orcid:
+                return candidate
+    if affiliation:
+        for candidate in candidates:
+            institutions = list(candidate.get("last_known_institutions") or [])
+            institutions += [
+                entry.get("institution") or {} for entry in candidate.get("affiliations") or []
+            ]
+            if any(
+                affiliation.lower() in (institution.get("display_name") or "").lower()
+                for institution in institutions
+            ):
+                return candidate
+    return candidates[0]
+
+
+def parse_work(work):
+    """
+    Convert an OpenAlex work into a publication dict
+    :return: the IDs of the work's authors, and the publication dict
+    """
+    source = (work.get("primary_location") or {}).get("source") or {}
+    authorships = work.get("authorships") or []
+    doi = work.get("doi") or ""
+    return [
+        (authorship.get("author") or {}).get("id", "").rsplit("/", 1)[-1]
+        for authorship in authorships
+    ], {
+        "from": "OpenAlex",
+        "journal": source.get("display_name"),
+        "content_type": work.get("type"),
+        "publication_date": work.get("publication_date"),
+        "title": work.get("title"),
+        "authors": ",".join(
+            (authorship.get("author") or {}).get("display_name") or ""
+            for authorship in authorships
+        ),
+        "doi": doi.removeprefix("https://doi.org/"),
+    }
+
+
+def parse_works_page(body):
+    """
+    Extract works from a page of OpenAlex /works results. Kept at module
+    level so it can be sent to a process pool (see Base._parse).
+    :params body: raw JSON response body
+    :return: the cursor for the next page (None on the last page), and a
+    list of (author IDs, publication dict) tuples
+    """
+    data = serializers.loads(body)
+    serializers.log_payload(logger, "OpenAlex response", data)
+    next_cursor = data.get("meta", {}).get("next_cursor")
+    return next_cursor, [parse_work(work) for work in data.get("results", [])]
+
+
+def search_multiple_authors(authors: list[str], rows: int = 10):
+    openalex = OpenAlex()
+    return {
+        author: publications
+        for author, publications in openalex.get_publications_by_authors(authors, rows)
+        if author
+    }
+
+
+def main() -> None:
+    author_names = input("Enter author names(comma-separated): ").split(",")
+    author_names = [name.strip() for name in author_names]
+
+    result = search_multiple_authors(author_names, 10)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,273 @@
 import requests
+import io
+import itertools
 import json
 import time
 import logging
+from datetime import datetime
 from dateutil.parser import parse
 from ratelimit import limits, sleep_and_retry
 import os
+from xml.etree import ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
 from pubscraper.APIClasses.Base import Base
+from pubscraper.budget import BudgetExceeded, bind
+from pubscraper.cache import NEGATIVE, STATE
+from pubscraper import budget, serializers
+from pubscraper.pipeline import iso_date
+from pubscraper.transport import ResponseTooLarge
 import pubscraper.config as config
 
 logger = logging.getLogger(__name__)
 
 class PubMed(Base):
-    def __init__(self):
+    # 2 requests per second for safety (PubMed API limit is 3 per second)
+    requests_per_second = 2
+
+    def __init__(
+        self,
+        cache=None,
+        stats=None,
+        concurrent_formats=config.PUBMED_CONCURRENT_NAME_FORMATS,
+        affiliation=config.AFFILIATION_KEYWORD,
+        author_batch_size=config.PUBMED_AUTHOR_BATCH_SIZE,
+    ):
+        super().__init__(cache, stats)
+        self.concurrent_formats = concurrent_formats
+        # authors combined into one esearch OR query by get_publications_by_authors
+        self.author_batch_size = author_batch_size
+        # publications are only kept if the author's affiliation contains this
+        # text; without it the lighter esummary endpoint is used instead of efetch
+        self.affiliation = affiliation
         self.search_url = config.PUBMED_SEARCH_URL
+        self.summary_url = config.PUBMED_SUMMARY_URL
         self.fetch_url = config.PUBMED_FETCH_URL
         logging.debug(f"PubMed API rate limit: 2 requests per second (API limit is 3/second)")
 
     @sleep_and_retry
-    @limits(calls=2, period=1)  # Use 2 requests per second for safety (PubMed API limit is 3 per second)
-    def _make_request(self, url, params):
+    @limits(calls=requests_per_second, period=1)
+    def _throttle(self):
+        pass
+
+    def _make_request(self, url, params, use_cache=True):
+        # responses served from the cache don't count against the rate limit
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = self.transport.get(
+                url, params=params, timeout=10, throttle=self._throttle, use_cache=use_cache
+            )
+        except ResponseTooLarge:
+            raise
         except requests.exceptions.RequestException as e:
             logging.error(f"Error fetching data from {url}: {e}")
             raise
         response.raise_for_status()
         return response
 
-    def _get_UIDs_by_author(self, author_name, rows=10):
+    def _fetch_ids(self, url, UIDs, params, counter, author_name=None):
+        """
+        Request articles in batches of config.PUBMED_BATCH_SIZE UIDs. A batch
+        whose response goes over the transport's byte limit is split in half
+        and requested again, down to single articles, which are skipped if
+        they are still too large.
+        :params params: request parameters besides the UIDs
+        :params counter: statistics counter incremented for every request
+        :return: a generator of responses
+        """
+        pending = [
+            UIDs[start : start + config.PUBMED_BATCH_SIZE]
+            for start in range(0, len(UIDs), config.PUBMED_BATCH_SIZE)
+        ]
+        while pending:
+            batch = pending.pop(0)
+            self.stats.incr(counter, author=author_name)
+            try:
+                yield self._make_request(url, {**params, "id": ",".join(batch)})
+            except ResponseTooLarge as e:
+                if len(batch) == 1:
+                    logging.warning(f"Skipping PubMed article {batch[0]}: {e}")
+                    continue
+                logging.debug(f"Splitting a batch of {len(batch)} PubMed articles: {e}")
+                self.stats.incr("PubMed.batches_split", author=author_name)
+                half = len(batch) // 2
+                pending[:0] = [batch[:half], batch[half:]]
+
+    def _get_search_terms(self, author_name, orcid=None):
+        """
+        Build the esearch terms to try for an author, in order of preference.
+        PubMed indexes authors last name first, so the roster's last name is
+        moved to the front (e.g. "Kelsey m Beavers" -> "Beavers+Kelsey+m")
+        :param author_name: name of author in format "First [Middle] Last"
+        :param orcid: the author's ORCID iD, searched for before any name (optional)
+        :return: a list of (strategy, term) tuples
+        """
+        *first_names, last_name = author_name.split()
+        # records carrying the author's ORCID iD can't be a namesake's
+        identifiers = [("orcid", f"{orcid}[auid]")] if orcid else []
+        return identifiers + [
+            # Format 1: Last+First+Middle[Full Author Name]
+            (
+                "full_author_name",
+                f"{last_name}+{'+'.join(first_names)}[Full Author Name]",
+            ),
+            # Format 2: Last+First[Author]
+            ("author", f"{last_name}+{first_names[0]}[Author]"),
+        ]
+
+    def _negative_key(self, author_name, strategy, since=None):
+        key = f"PubMed:{strategy}:{author_name}"
+        return f"{key}:since={since}" if since else key
+
+    def _date_params(self, since):
+        """
+        :param since: date in YYYY, YYYY-MM, or YYYY-MM-DD format (optional)
+        :return: esearch parameters restricting results to publications
+        published on or after since
+        """
+        if not since:
+            return {}
+        try:
+            # missing months and days default to 1 rather than today's
+            mindate = parse(since, default=datetime(1, 1, 1)).strftime("%Y/%m/%d")
+        except (ValueError, OverflowError):
+            logging.warning(f"Could not parse date {since}, not filtering by date")
+            return {}
+        # PubMed needs both ends of the range
+        return {"datetype": "pdat", "mindate": mindate, "maxdate": "3000"}
+
+    def _esearch(self, author_name, strategy, search_term, rows, since=None):
+        """
+        Run a single esearch query for an author. Empty results are recorded
+        in the negative cache for this author and search strategy.
+        :return: a (possibly empty) list of UIDs, or None if the request failed
+        """
+        params = {
+            "db": "pubmed",  # Try pubmed instead of pmc
+            "term": search_term,
+            "retmax": rows,
+            "retmode": "JSON",
+            **self._date_params(since),
+        }
+        self.stats.incr("PubMed.esearch", author=author_name)
+
+        try:
+            # Log the full URL being called
+            query_url = f"{self.search_url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+            logging.debug(f"Making request to: {query_url}")
+
+            response = self._make_request(self.search_url, params=params)
+            data = serializers.loads(response.content)
+
+            # Log the response
+            serializers.log_payload(logger, "Response", data)
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            logging.error(f"PubMed API Request error: {e}")
+            return None
+
+        id_list = data.get("esearchresult", {}).get("idlist", [])
+        if not id_list:
+            self.cache.set(
+                NEGATIVE,
+                self._negative_key(author_name, strategy, since),
+                {"count": 0},
+                ttl=config.NEGATIVE_CACHE_TTL,
+            )
+        return id_list
+
+    def _esearch_count(self, author_name, search_term, since=None):
+        """
+        Run a count-only esearch query for an author
+        :return: the number of matching records, or None if the request failed
+        """
+        params = {
+            "db": "pubmed",
+            "term": search_term,
+            "rettype": "count",
+            "retmode": "JSON",
+            **self._date_params(since),
+        }
+        self.stats.incr("PubMed.esearch_count", author=author_name)
+
+        try:
+            # a cached count would only repeat the answer being rechecked
+            response = self._make_request(self.search_url, params=params, use_cache=False)
+            return int(serializers.loads(response.content)["esearchresult"]["count"])
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            logging.error(f"PubMed API Request error: {e}")
+            return None
+
+    def _is_known_empty(self, author_name, candidates, since=None):
+        """
+        Check the negative cache for an author. An author is known to be empty
+        when every search strategy came back empty on a previous run; unless
+        config.NEGATIVE_CACHE_RECHECK is off, that is confirmed with a single
+        count-only query using the broadest (last) search term.
+        :return: True if the author can be skipped
+        """
+        for strategy, _ in candidates:
+            if self.cache.get(NEGATIVE, self._negative_key(author_name, strategy, since)) is None:
+                return False
+
+        if config.NEGATIVE_CACHE_RECHECK:
+            count = self._esearch_count(author_name, candidates[-1][1], since)
+            if count != 0:
+                logging.debug(f"{author_name} is no longer empty, searching again")
+                for strategy, _ in candidates:
+                    self.cache.delete(NEGATIVE, self._negative_key(author_name, strategy, since))
+                return False
+
+        self.stats.incr("PubMed.negative_cache_hits", author=author_name)
+        return True
+
+    def _run_searches(self, author_name, candidates, rows, since=None):
+        """
+        Try each candidate search term until one returns UIDs. When
+        concurrent_formats is enabled the candidates are issued together
+        (still subject to the rate limit) rather than one after the other.
+        :return: a (strategy, UIDs) tuple, or (None, None) if nothing was found
+        """
+        if self.concurrent_formats and len(candidates) > 1:
+            with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+                futures = [
+                    (
+                        strategy,
+                        executor.submit(
+                            bind(self._esearch), author_name, strategy, term, rows, since
+                        ),
+                    )
+                    for strategy, term in candidates
+                ]
+                for strategy, future in futures:
+                    id_list = future.result()
+                    if id_list:
+                        return strategy, id_list
+            return None, None
+
+        for strategy, term in candidates:
+            id_list = self._esearch(author_name, strategy, term, rows, since)
+            if id_list:
+                return strategy, id_list
+        return None, None
+
+    def _get_UIDs_by_author(self, author_name, rows=10, since=None, orcid=None):
         """
-        Retrieve a given author's UID publications
-        :param author_name: name of author in format "Last First [Middle]"
+        Retrieve a given author's UID publications. The search strategy that
+        found results is remembered for each author and tried first next time,
+        and authors known to have no publications are skipped.
+        :param author_name: name of author in format "First [Middle] Last"
         :param rows: number of results to return (default is 10)
+        :param since: only return papers published on or after this date (optional)
+        :param orcid: the author's ORCID iD, tried before their name (optional)
         :return: A list of UIDs corresponding to papers written by the author
         """
+        if rows < 0:
+            logging.error(f"Rows must be a positive number (received {rows})")
+            raise ValueError("Rows must be a positive number")
+
         if not author_name or author_name == "":
             logging.debug("Skipping empty author name")
             return None
@@ -44,45 +277,36 @@ class PubMed(Base):
         if len(split_name) < 2:
             logging.warning(f"Invalid author name format: {author_name}")
             return None
-        
-        # Try different search formats
-        # Format 1: Last+First+Middle[Full Author Name]
-        name_search1 = f"{split_name[0]}+{'+'.join(split_name[1:])}[Full Author Name]"
-        # Format 2: Last+First[Author]
-        name_search2 = f"{split_name[0]}+{split_name[1]}[Author]"
-        
+
+        candidates = self._get_search_terms(author_name, orcid)
+        memo_key = f"PubMed.strategy:{author_name}"
+        preferred = self.cache.get(STATE, memo_key)
+
+        if self._is_known_empty(author_name, candidates, since):
+            logging.info(f"No publications found for author: {author_name} (cached)")
+            return None
+
         logging.debug(f"Trying search formats:")
-        logging.debug(f"1: {name_search1}")
-        logging.debug(f"2: {name_search2}")
+        for i, (strategy, term) in enumerate(candidates, start=1):
+            logging.debug(f"{i}: {term}")
 
-        for search_term in [name_search1, name_search2]:
-            params = {
-                "db": "pubmed",  # Try pubmed instead of pmc
-                "term": search_term,
-                "retmax": rows,
-                "retmode": "JSON",
-            }
+        strategy, id_list = None, None
+        remaining = candidates
+        if preferred in dict(candidates):
+            logging.debug(f"Trying remembered search strategy {preferred} first")
+            strategy, id_list = self._run_searches(
+                author_name, [(preferred, dict(candidates)[preferred])], rows, since
+            )
+            remaining = [c for c in candidates if c[0] != preferred]
 
-            try:
-                # Log the full URL being called
-                query_url = f"{self.search_url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-                logging.debug(f"Making request to: {query_url}")
-                
-                response = self._make_request(self.search_url, params=params)
-                data = response.json()
-                
-                # Log the response
-                logging.debug(f"Response: {json.dumps(data, indent=2)}")
-                
-                if "esearchresult" in data and "idlist" in data["esearchresult"]:
-                    id_list = data["esearchresult"]["idlist"]
-                    if id_list:
-                        logging.info(f"Found {len(id_list)} publications for {author_name}")
-                        return id_list
-                
-            except Exception as e:
-                logging.error(f"PubMed API Request error: {e}")
-                continue
+        if not id_list:
+            strategy, id_list = self._run_searches(author_name, remaining, rows, since)
+
+        if id_list:
+            if strategy != preferred:
+                self.cache.set(STATE, memo_key, strategy)
+            logging.info(f"Found {len(id_list)} publications for {author_name}")
+            return id_list
 
         logging.info(f"No publications found for author: {author_name}")
         return None
@@ -92,138 +316,450 @@ class PubMed(Base):
         Get detailed publication information using efetch
         :params UIDs: list of UIDs
         :params author_name: name of author to check affiliations for
-        :return: list of publication dictionaries
+        :return: list of publication dictionaries (those of the batches
+        fetched so far if the budget runs out)
         """
         if not UIDs:
             return None
 
+        publications = []
         params = {
             "db": "pubmed",
-            "id": ",".join(UIDs),
             "retmode": "xml"
         }
 
         try:
-            response = self._make_request(self.fetch_url, params=params)
-            from xml.etree import ElementTree as ET
-            root = ET.fromstring(response.text)
-            
-            publications = []
-            for article in root.findall(".//PubmedArticle"):
-                try:
-                    # Extract only necessary information
-                    title = article.find(".//ArticleTitle").text
-                    journal = article.find(".//Journal/Title").text
-                    doi = next((id_elem.text for id_elem in article.findall(".//ArticleId") if id_elem.get("IdType") == "doi"), "")
-                    
-                    # Get publication date
-                    pub_date = article.find(".//PubDate")
-                    year = pub_date.find("Year")
-                    month = pub_date.find("Month")
-                    day = pub_date.find("Day")
-                    publication_date = f"{year.text if year is not None else ''}-{month.text if month is not None else ''}-{day.text if day is not None else ''}"
-                    
-                    # Get authors and affiliations
-                    authors = []
-                    affiliations = []
-                    for author in article.findall(".//Author"):
-                        last_name = author.find("LastName")
-                        fore_name = author.find("ForeName")
-                        author_name = " ".join(filter(None, [fore_name.text if fore_name is not None else '', last_name.text if last_name is not None else '']))
-                        authors.append(author_name)
-
-                        # Get affiliations for this author
-                        aff_list = author.findall(".//AffiliationInfo/Affiliation")
-                        author_affiliations = [aff.text for aff in aff_list if aff.text]
-                        
-                        if author_affiliations:
-                            affiliations.append({
-                                "author": author_name,
-                                "affiliations": author_affiliations
-                            })
-
-                    # Check for UT system affiliation
-                    if not self._check_ut_affiliation(affiliations, author_name):
-                        continue
-
-                    pub = {
-                        "from": "PubMed",
-                        "journal": journal,
-                        "publication_date": publication_date,
-                        "title": title,
-                        "authors": ",".join(authors),
-                        "affiliations": affiliations,
-                        "doi": doi
-                    }
-                    publications.append(pub)
-                    
-                except Exception as e:
-                    logging.warning(f"Error processing article: {e}")
-                    continue
+            for response in self._fetch_ids(
+                self.fetch_url, UIDs, params, "PubMed.efetch", author_name
+            ):
+                publications += self._parse(
+                    parse_efetch_xml, response.content, self.affiliation, author_name
+                )
+        except BudgetExceeded as e:
+            logging.warning(f"Stopped fetching articles for {author_name}: {e}")
+        except Exception as e:
+            logging.error(f"Error fetching data from PubMed: {e}")
+            return None
 
-            if publications:
-                logging.info(f"Successfully processed {len(publications)} publications")
-                return publications
-            else:
-                logging.warning("No publications with UT system affiliations found")
-                return None
+        if publications:
+            logging.info(f"Successfully processed {len(publications)} publications")
+            return publications
+        logging.warning("No publications with UT system affiliations found")
+        return None
 
+    def _get_publication_summaries(self, UIDs, author_name=None):
+        """
+        Get publication information using esummary JSON. This is much lighter
+        than efetch XML but carries no affiliations, so it is only used when
+        no affiliation check is required.
+        :params UIDs: list of UIDs
+        :params author_name: name of author the UIDs were found for
+        :return: list of publication dictionaries
+        """
+        if not UIDs:
+            return None
+
+        publications = []
+        params = {
+            "db": "pubmed",
+            "retmode": "json",
+        }
+        try:
+            for response in self._fetch_ids(
+                self.summary_url, UIDs, params, "PubMed.esummary", author_name
+            ):
+                publications += self._parse(parse_esummary_json, response.content)
+        except BudgetExceeded as e:
+            logging.warning(f"Stopped fetching summaries for {author_name}: {e}")
         except Exception as e:
             logging.error(f"Error fetching data from PubMed: {e}")
             return None
 
-    def _check_ut_affiliation(self, affiliations, author_name=None):
+        if publications:
+            logging.info(f"Successfully processed {len(publications)} publications")
+            return publications
+        return None
+
+    @property
+    def batch_size(self):
+        return max(self.author_batch_size, 1)
+
+    def _batch_search_term(self, author_name, orcid=None):
         """
-        Check if any affiliation contains UT system keywords
-        If author_name is provided, check only that specific author's affiliation
-        :param affiliations: List of affiliation dictionaries
-        :param author_name: Optional name of the specific author to check
-        :return: Boolean indicating if UT system affiliation is present
+        :return: the search term used for an author inside an OR query (their
+        ORCID iD, the strategy remembered for the author, or the full author name)
         """
-        if not affiliations:
-            return False
-        
-        for author_info in affiliations:
-            # If author_name is provided, only check that specific author
-            if author_name and not author_info['author'].lower().startswith(author_name.lower().split()[0].lower()):
+        if orcid:
+            return f"{orcid}[auid]"
+        candidates = dict(self._get_search_terms(author_name))
+        preferred = self.cache.get(STATE, f"PubMed.strategy:{author_name}")
+        return candidates.get(preferred, candidates["full_author_name"])
+
+    def _search_batch(self, author_names, rows, since=None, orcids=None):
+        """
+        Search for several authors with a single esearch OR query and fetch
+        the matching publications
+        :return: list of publication dictionaries for all the authors (None if
+        a request failed), and whether the search had more matches than the
+        rows * len(author_names) that were fetched
+        """
+        orcids = orcids or {}
+        term = " OR ".join(
+            f"({self._batch_search_term(name, orcids.get(name))})" for name in author_names
+        )
+        params = {
+            "db": "pubmed",
+            "term": term,
+            "retmax": rows * len(author_names),
+            "retmode": "JSON",
+            **self._date_params(since),
+        }
+        self.stats.incr("PubMed.esearch_batches")
+
+        try:
+            response = self._make_request(self.search_url, params=params)
+            result = serializers.loads(response.content).get("esearchresult", {})
+            id_list = result.get("idlist", [])
+            capped = int(result.get("count", len(id_list))) > len(id_list)
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            logging.error(f"PubMed API Request error: {e}")
+            return None, False
+        logging.info(f"Found {len(id_list)} publications for {len(author_names)} authors")
+
+        if not self.affiliation:
+            return self._get_publication_summaries(id_list) or [], capped
+        return self._get_publication_details(id_list) or [], capped
+
+    def get_publications_by_authors(
+        self, authors, rows=10, since=None, budgets=None, orcids=None
+    ):
+        """
+        Look up several authors with one esearch OR query per batch (see
+        author_batch_size), attributing each article to the authors whose
+        name appears in its author list. Falls back to one author at a time
+        when batching is off. When the OR query matched more articles than
+        were fetched, prolific authors may have crowded out the others, so
+        authors left with fewer than rows publications are searched again on
+        their own.
+        :return: a generator of (author, publications) tuples
+        """
+        if self.author_batch_size <= 1 or len(authors) < 2:
+            yield from super().get_publications_by_authors(authors, rows, since, budgets, orcids)
+            return
+
+        valid = [author for author in authors if author and len(author.split()) >= 2]
+        for author in authors:
+            if author not in valid:
+                logging.warning(f"Invalid author name format: {author}")
+                yield author, None
+
+        try:
+            publications, capped = self._search_batch(valid, rows, since, orcids)
+        except BudgetExceeded as e:
+            logging.warning(f"Stopped searching PubMed for {len(valid)} authors: {e}")
+            for author in valid:
+                if budgets and author in budgets:
+                    budgets[author].exhausted = True
+            publications, capped = None, False
+
+        for author in valid:
+            if publications is None:
+                yield author, None
                 continue
-                
-            for affiliation in author_info.get('affiliations', []):
-                if not affiliation:
+            matched = [
+                pub
+                for pub in publications
+                if any(author_matches(author, name) for name in pub["authors"].split(","))
+            ][:rows]
+            self.stats.incr("PubMed.batch_attributed", len(matched), author=author)
+            if capped and len(matched) < rows:
+                self.stats.incr("PubMed.batch_requeries", author=author)
+                author_budget = budgets.get(author) if budgets else budget.current()
+                with budget.activate(author_budget):
+                    requeried = self.get_publications_by_author(
+                        author, rows, since, (orcids or {}).get(author)
+                    )
+                if requeried is not None:
+                    matched = requeried
+            yield author, matched or None
+
+    def get_publications_by_dois(self, dois: list[str], author_name: str = None) -> dict:
+        """
+        Look up articles by DOI: one esearch ORing up to
+        config.ENRICH_BATCH_SIZE DOIs, then one efetch for the articles found
+        :return: dict of {lowercase DOI: publication}
+        """
+        publications = {}
+        for batch in itertools.batched(dois, config.ENRICH_BATCH_SIZE):
+            params = {
+                "db": "pubmed",
+                "term": " OR ".join(f'"{doi}"[doi]' for doi in batch),
+                "retmax": len(batch),
+                "retmode": "JSON",
+            }
+            self.stats.incr("PubMed.doi_searches", author=author_name)
+            try:
+                response = self._make_request(self.search_url, params=params)
+                UIDs = serializers.loads(response.content).get("esearchresult", {}).get("idlist")
+                if not UIDs:
                     continue
-                if 'university of texas' in affiliation.lower():
-                    logging.debug(f"Found UT affiliation for {author_info['author']}: {affiliation}")
-                    return True
-        
-        return False
+                pubs = []
+                for response in self._fetch_ids(
+                    self.fetch_url,
+                    UIDs,
+                    {"db": "pubmed", "retmode": "xml"},
+                    "PubMed.efetch",
+                    author_name,
+                ):
+                    # the articles are already known to be the author's, so no affiliation check
+                    pubs += self._parse(parse_efetch_xml, response.content, None)
+            except BudgetExceeded as e:
+                logging.warning(f"Stopped looking up DOIs in PubMed: {e}")
+                break
+            except Exception as e:
+                logging.error(f"Error fetching data from PubMed: {e}")
+                continue
+            for pub in pubs:
+                if pub["doi"]:
+                    publications[pub["doi"].lower()] = pub
+        return publications
+
+    def _check_ut_affiliation(self, affiliations, author_name=None):
+        return check_affiliation(affiliations, self.affiliation, author_name)
 
-    def get_publications_by_author(self, author_name, rows=10):
+    def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
         """
         Given the name of an author, search PubMed for works written by that author
         :params author_name: name of author to search
         :params rows: maximum number of publications to return (default is 10)
+        :params since: only search for works published on or after this date (optional)
+        :params orcid: the author's ORCID iD, searched for before their name (optional)
         :return: a list of publication objects/dicts holding data for each publication
         """
         logging.debug(f"Fetching publications for author: {author_name}")
-        UIDs = self._get_UIDs_by_author(author_name, rows)
-        if not UIDs:
-            logging.info(f"No publications found for {author_name}")
+        try:
+            UIDs = self._get_UIDs_by_author(author_name, rows, since, orcid)
+            if not UIDs:
+                logging.info(f"No publications found for {author_name}")
+                return None
+
+            if self.affiliation:
+                publications = self._get_publication_details(UIDs, author_name)
+            else:
+                publications = self._get_publication_summaries(UIDs, author_name)
+        except BudgetExceeded as e:
+            logging.warning(f"Stopped searching PubMed for {author_name}: {e}")
             return None
-        
-        publications = self._get_publication_details(UIDs, author_name)
         if publications:
             logging.debug(f"Successfully retrieved {len(publications)} publications")
         return publications
 
 
-def search_multiple_authors(authors, rows=10):
+"""
+The parsing functions below are kept at module level (and free of any API
+class state) so they can be sent to a process pool along with the raw
+response body; see Base._parse.
+"""
+
+
+def _iter_articles(body):
+    """
+    Parse an efetch XML response incrementally
+    :params body: raw XML response body
+    :return: a generator of PubmedArticle elements; each one is cleared once
+    the next is read, so the whole document tree is never held in memory
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    for _, element in ET.iterparse(io.BytesIO(body)):
+        if element.tag == "PubmedArticle":
+            yield element
+            element.clear()
+
+
+def parse_efetch_xml(body, affiliation, author_name=None):
+    """
+    Extract publications from an efetch XML response
+    :params body: raw XML response body
+    :params affiliation: only keep publications with an affiliation containing this text
+    (None keeps every publication)
+    :params author_name: name of author to check affiliations for
+    :return: list of publication dictionaries
+    """
+    publications = []
+    for article in _iter_articles(body):
+        try:
+            # Extract only necessary information
+            title = article.find(".//ArticleTitle").text
+            journal = article.find(".//Journal/Title").text
+            doi = next((id_elem.text for id_elem in article.findall(".//ArticleId") if id_elem.get("IdType") == "doi"), "")
+
+            # Get publication date
+            pub_date = article.find(".//PubDate")
+            year = pub_date.find("Year")
+            month = pub_date.find("Month")
+            day = pub_date.find("Day")
+            # e.g. "2024-Oct-22", normalized to "2024-10-22" like the other APIs' dates
+            publication_date = iso_date(
+                "-".join(part.text for part in (year, month, day) if part is not None and part.text)
+            )
+
+            # Get authors and affiliations
+            authors = []
+            affiliations = []
+            for author in article.findall(".//Author"):
+                last_name = author.find("LastName")
+                fore_name = author.find("ForeName")
+                author_name = " ".join(filter(None, [fore_name.text if fore_name is not None else '', last_name.text if last_name is not None else '']))
+                authors.append(author_name)
+
+                # Get affiliations for this author
+                aff_list = author.findall(".//AffiliationInfo/Affiliation")
+                author_affiliations = [aff.text for aff in aff_list if aff.text]
+
+                if author_affiliations:
+                    affiliations.append({
+                        "author": author_name,
+                        "affiliations": author_affiliations
+                    })
+
+            # Check for UT system affiliation
+            if affiliation is not None and not check_affiliation(
+                affiliations, affiliation, author_name
+            ):
+                continue
+
+            pub = {
+                "from": "PubMed",
+                "journal": journal,
+                "publication_date": publication_date,
+                "title": title,
+                "authors": ",".join(authors),
+                "affiliations": affiliations,
+                "doi": doi
+            }
+            publications.append(pub)
+
+        except Exception as e:
+            logging.warning(f"Error processing article: {e}")
+            continue
+
+    return publications
+
+
+def parse_summary(summary):
+    """
+    Convert a single esummary record into a publication dict
+    :params summary: esummary JSON document for one UID
+    :return: publication dict
+    """
+    doi = next(
+        (
+            article_id.get("value", "")
+            for article_id in summary.get("articleids", [])
+            if article_id.get("idtype") == "doi"
+        ),
+        "",
+    )
+
+    raw_date = summary.get("sortdate") or summary.get("pubdate", "")
+    try:
+        publication_date = parse(raw_date).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError):
+        publication_date = raw_date
+
+    return {
+        "from": "PubMed",
+        "journal": summary.get("fulljournalname") or summary.get("source"),
+        "publication_date": publication_date,
+        "title": summary.get("title"),
+        "authors": ",".join(
+            author.get("name", "") for author in summary.get("authors", [])
+        ),
+        "doi": doi,
+    }
+
+
+def parse_esummary_json(body):
+    """
+    Extract publications from an esummary JSON response
+    :params body: raw JSON response body
+    :return: list of publication dictionaries
+    """
+    result = serializers.loads(body)["result"]
+    publications = []
+    for uid in result.get("uids", []):
+        if uid not in result:
+            continue
+        try:
+            publications.append(parse_summary(result[uid]))
+        except Exception as e:
+            logging.warning(f"Error processing article: {e}")
+    return publications
+
+
+def check_affiliation(affiliations, keyword, author_name=None):
+    """
+    Check if any affiliation contains the affiliation keyword (e.g. UT system)
+    If author_name is provided, check only that specific author's affiliation
+    :param affiliations: List of affiliation dictionaries
+    :param keyword: text to look for in each affiliation
+    :param author_name: Optional name of the specific author to check
+    :return: Boolean indicating if the affiliation is present
+    """
+    if not affiliations:
+        return False
+
+    for author_info in affiliations:
+        # If author_name is provided, only check that specific author
+        if author_name and not author_info['author'].lower().startswith(author_name.lower().split()[0].lower()):
+            continue
+
+        for affiliation in author_info.get('affiliations', []):
+            if not affiliation:
+                continue
+            if keyword.lower() in affiliation.lower():
+                logging.debug(f"Found {keyword} affiliation for {author_info['author']}: {affiliation}")
+                return True
+
+    return False
+
+
+def _name_tokens(name):
+    return "".join(c if c.isalnum() else " " for c in name.lower()).split()
+
+
+def author_matches(author_name, article_author):
+    """
+    Check if an author name from the roster refers to an author listed on an
+    article, in either name order and with or without initials (e.g. "w j
+    allen" matches "Allen WJ" and "William J Allen"): one name has to appear
+    in full and another one has to agree on its first letter
+    :param author_name: name of an author on the roster
+    :param article_author: name of an author of the article
+    :return: True if the names match
+    """
+    roster_tokens = _name_tokens(author_name)
+    article_tokens = _name_tokens(article_author)
+    for surname in set(roster_tokens) & set(article_tokens):
+        others = [token for token in roster_tokens if token != surname]
+        article_others = [token for token in article_tokens if token != surname]
+        if any(token[0] == other[0] for token in others for other in article_others):
+            return True
+    return False
+
+
+def search_multiple_authors(authors, rows=10, affiliation=config.AFFILIATION_KEYWORD):
     """
     Search PubMed Central for works written by multiple authors
     :params authors: list of author names
     :params rows: maximum number of publications to return per author (default is 10)
+    :params affiliation: only keep publications with this affiliation (optional)
     :return: a dict {author_name: {summary_info}} for each author
     """
-    pubmed = PubMed()
+    pubmed = PubMed(affiliation=affiliation)
     all_results = {}
 
     for author in authors:
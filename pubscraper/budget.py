@@ -0,0 +1,131 @@
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+"""
+Time and request budgets. The pipeline gives every author their own budget
+(nested in a budget for the whole run) and activates it on the thread that
+queries the APIs; the transport charges each request that goes over the
+network to the active budget and raises BudgetExceeded once it has run out.
+API classes catch it and return what they have gathered so far, and the
+author is marked as truncated in the output.
+"""
+
+_active = threading.local()
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Budget:
+    def __init__(self, seconds: float = None, requests: int = None, parent=None):
+        """
+        :param seconds: time allowed, counted from the first time the budget
+        is activated (unlimited if None)
+        :param requests: number of requests allowed (unlimited if None)
+        :param parent: enclosing budget that every request is also charged to
+        """
+        self.seconds = seconds
+        self.requests = requests
+        self.parent = parent
+        self.used = 0
+        self.deadline = None
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the clock, unless it is already running
+        """
+        with self._lock:
+            if self.deadline is None and self.seconds is not None:
+                self.deadline = time.monotonic() + self.seconds
+
+    def remaining_time(self) -> float:
+        """
+        :return: seconds left in this budget and its parents (None if unlimited)
+        """
+        remaining = None
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining_time()
+            if parent_remaining is not None:
+                remaining = (
+                    parent_remaining if remaining is None else min(remaining, parent_remaining)
+                )
+        return remaining
+
+    def _check(self):
+        if self.exhausted:
+            raise BudgetExceeded("budget already exhausted")
+        if self.requests is not None and self.used >= self.requests:
+            self.exhausted = True
+            raise BudgetExceeded(f"request budget of {self.requests} used up")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.exhausted = True
+            raise BudgetExceeded(f"time budget of {self.seconds}s used up")
+
+    def charge(self):
+        """
+        Account for one request
+        :raises BudgetExceeded: if this budget or one of its parents has run out
+        """
+        chain = []
+        budget = self
+        while budget is not None:
+            chain.append(budget)
+            budget = budget.parent
+        try:
+            for budget in chain:
+                with budget._lock:
+                    budget._check()
+        except BudgetExceeded:
+            # whatever ran out, this budget can't be spent any more
+            self.exhausted = True
+            raise
+        for budget in chain:
+            with budget._lock:
+                budget.used += 1
+
+
+def current() -> Budget:
+    """
+    :return: the budget active on this thread, or None
+    """
+    return getattr(_active, "budget", None)
+
+
+@contextlib.contextmanager
+def activate(budget: Budget):
+    """
+    Make a budget the active one on this thread (starting its clock)
+    """
+    previous = current()
+    if budget is not None:
+        budget.start()
+    _active.budget = budget
+    try:
+        yield budget
+    finally:
+        _active.budget = previous
+
+
+def bind(func):
+    """
+    Wrap func so it runs under the budget active right now, e.g. when it is
+    handed to another thread
+    """
+    budget = current()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with activate(budget):
+            return func(*args, **kwargs)
+
+    return wrapper
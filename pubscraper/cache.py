@@ -0,0 +1,278 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from pubscraper import serializers
+from pubscraper.compression import compress, decompress, open_file
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+A small persistent key/value store shared by the API classes. Entries are
+grouped into namespaces ("state" for things like the PubMed search strategy
+that worked for an author, "negative" for authors known to have no
+publications, "response" for HTTP responses) and may carry an expiry time.
+Large values are stored compressed (see config.CACHE_COMPRESSION). The default cache
+lives in memory, so nothing is persisted unless a file is configured.
+
+A cache can be exported to a single portable file (JSON Lines, compressed
+according to its suffix) and imported into another one, so new containers
+and compute nodes can start warm instead of repeating the whole API crawl.
+"""
+
+STATE = "state"
+NEGATIVE = "negative"
+RESPONSE = "response"
+NAMESPACES = (STATE, NEGATIVE, RESPONSE)
+
+# first line of an exported cache file
+EXPORT_HEADER = {"format": "pubscraper-cache", "version": 1}
+# entries written to the cache in one transaction when importing
+IMPORT_BATCH_SIZE = 1000
+
+
+class Cache:
+    def __init__(self, path: str = ":memory:", compression: str = config.CACHE_COMPRESSION):
+        """
+        :param path: SQLite database file (kept in memory by default)
+        :param compression: codec used for values larger than
+        config.CACHE_COMPRESSION_MIN_SIZE ("gzip", "zstd", or None)
+        """
+        self.path = path
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.commit()
+        logger.debug(f"Opened cache at {path}")
+
+    def get_entry(self, namespace: str, key: str):
+        """
+        Look up a cache entry, including expired ones
+        :param namespace: namespace the entry was stored under
+        :param key: key of the entry
+        :return: a (value, is_fresh) tuple, or None if there is no entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        is_fresh = expires_at is None or expires_at > time.time()
+        if isinstance(value, bytes):
+            value = decompress(value)
+        return serializers.loads(value), is_fresh
+
+    def get(self, namespace: str, key: str, default=None):
+        """
+        Look up a cache entry
+        :param namespace: namespace the entry was stored under
+        :param key: key of the entry
+        :param default: value returned if the entry is missing or expired
+        :return: the stored value
+        """
+        entry = self.get_entry(namespace, key)
+        if entry is None or not entry[1]:
+            return default
+        return entry[0]
+
+    def set(self, namespace: str, key: str, value, ttl: float = None):
+        """
+        Store a JSON-serializable value
+        :param ttl: number of seconds the entry stays valid (default is forever)
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        encoded = serializers.dumps(value)
+        if self.compression and len(encoded) >= config.CACHE_COMPRESSION_MIN_SIZE:
+            encoded = compress(encoded.encode("utf-8"), self.compression)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, encoded, now, expires_at),
+            )
+            self._conn.commit()
+
+    def touch(self, namespace: str, key: str, ttl: float = None):
+        """
+        Mark an existing entry as fresh again without rewriting its value
+        :param ttl: number of seconds the entry stays valid (default is forever)
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET stored_at = ?, expires_at = ? WHERE namespace = ? AND key = ?",
+                (now, expires_at, namespace, key),
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            )
+            self._conn.commit()
+
+    def _where(self, namespaces=None, expired_only=False, stored_before=None):
+        conditions, params = [], []
+        if namespaces:
+            conditions.append(f"namespace IN ({', '.join('?' for _ in namespaces)})")
+            params += list(namespaces)
+        if expired_only:
+            conditions.append("expires_at IS NOT NULL AND expires_at <= ?")
+            params.append(time.time())
+        if stored_before is not None:
+            conditions.append("stored_at < ?")
+            params.append(stored_before)
+        return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+    def stats(self) -> dict:
+        """
+        :return: {namespace: {"entries": ..., "expired": ..., "bytes": ...}},
+        where bytes is the size of the stored (possibly compressed) values
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT namespace, COUNT(*),
+                       SUM(expires_at IS NOT NULL AND expires_at <= ?),
+                       SUM(LENGTH(CAST(value AS BLOB)))
+                FROM entries GROUP BY namespace ORDER BY namespace
+                """,
+                (time.time(),),
+            ).fetchall()
+        return {
+            namespace: {"entries": entries, "expired": expired, "bytes": size}
+            for namespace, entries, expired, size in rows
+        }
+
+    def prune(self, namespaces=None, expired_only=True, stored_before: float = None) -> int:
+        """
+        Delete entries and reclaim the space they took
+        :param namespaces: only delete entries of these namespaces (default is all)
+        :param expired_only: only delete entries that have expired
+        :param stored_before: only delete entries stored before this timestamp
+        :return: the number of entries deleted
+        """
+        where, params = self._where(namespaces, expired_only, stored_before)
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM entries{where}", params).rowcount
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        logger.info(f"Pruned {deleted} cache entries")
+        return deleted
+
+    def export_entries(self, path: str, namespaces=None, skip_expired: bool = False) -> int:
+        """
+        Write cache entries to a portable file: a header line, then one JSON
+        object per entry. Values are written decompressed, so the file can be
+        imported whatever codec either cache uses; the file as a whole is
+        compressed if its name ends in .gz or .zst.
+        :param namespaces: only export these namespaces (default is all)
+        :param skip_expired: leave out entries that have expired (they would
+        otherwise still be used to revalidate responses)
+        :return: the number of entries exported
+        """
+        where, params = self._where(namespaces)
+        if skip_expired:
+            where += " AND" if where else " WHERE"
+            where += " (expires_at IS NULL OR expires_at > ?)"
+            params.append(time.time())
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT namespace, key, value, stored_at, expires_at FROM entries{where}",
+                params,
+            ).fetchall()
+        with open_file(path, "wt", encoding="utf-8") as f:
+            f.write(serializers.dumps({**EXPORT_HEADER, "exported_at": time.time()}) + "\n")
+            for namespace, key, value, stored_at, expires_at in rows:
+                if isinstance(value, bytes):
+                    value = decompress(value)
+                entry = {
+                    "namespace": namespace,
+                    "key": key,
+                    "value": serializers.loads(value),
+                    "stored_at": stored_at,
+                    "expires_at": expires_at,
+                }
+                f.write(serializers.dumps(entry) + "\n")
+        logger.info(f"Exported {len(rows)} cache entries to {path}")
+        return len(rows)
+
+    def import_entries(self, path: str) -> int:
+        """
+        Add the entries of an exported cache file. An entry that is already
+        in the cache is only replaced if the imported copy was stored later.
+        :return: the number of entries read from the file
+        :raises ValueError: if the file isn't an exported cache
+        """
+
+        def write(batch):
+            with self._lock:
+                self._conn.executemany(
+                    """
+                    INSERT INTO entries VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (namespace, key) DO UPDATE SET
+                        value = excluded.value,
+                        stored_at = excluded.stored_at,
+                        expires_at = excluded.expires_at
+                    WHERE excluded.stored_at > entries.stored_at
+                    """,
+                    batch,
+                )
+                self._conn.commit()
+
+        count = 0
+        batch = []
+        with open_file(path, "rt", encoding="utf-8") as f:
+            header = serializers.loads(f.readline() or "null")
+            if not isinstance(header, dict) or header.get("format") != EXPORT_HEADER["format"]:
+                raise ValueError(f"{path} is not an exported pubscraper cache")
+            if header.get("version", 0) > EXPORT_HEADER["version"]:
+                raise ValueError(f"{path} was exported by a newer version of pubscraper")
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = serializers.loads(line)
+                encoded = serializers.dumps(entry["value"])
+                if self.compression and len(encoded) >= config.CACHE_COMPRESSION_MIN_SIZE:
+                    encoded = compress(encoded.encode("utf-8"), self.compression)
+                batch.append(
+                    (
+                        entry["namespace"],
+                        entry["key"],
+                        encoded,
+                        entry["stored_at"],
+                        entry["expires_at"],
+                    )
+                )
+                count += 1
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    write(batch)
+                    batch = []
+        if batch:
+            write(batch)
+        logger.info(f"Imported {count} cache entries from {path}")
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
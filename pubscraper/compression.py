@@ -0,0 +1,78 @@
+import gzip
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+"""
+Transparent gzip/zstd compression for output files and cache entries. Files
+are compressed based on their suffix (.gz or .zst). zstd needs either Python
+3.14's compression.zstd module or the zstandard package (pip install
+zstandard); gzip is always available.
+"""
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _require_zstd():
+    if zstd is None:
+        raise RuntimeError(
+            "zstd compression requires the zstandard package (pip install zstandard)"
+        )
+
+
+def split_compression(path: str) -> tuple[str, str]:
+    """
+    :param path: file path, e.g. "results.jsonl.zst"
+    :return: the path without its compression suffix, and the codec ("gzip",
+    "zstd", or None), e.g. ("results.jsonl", "zstd")
+    """
+    base, suffix = os.path.splitext(str(path))
+    if suffix.lower() in SUFFIXES:
+        return base, SUFFIXES[suffix.lower()]
+    return str(path), None
+
+
+def open_file(path: str, mode: str = "rt", **kwargs):
+    """
+    Open a file, compressing or decompressing on the fly if its suffix asks
+    for it. Accepts the same arguments as open().
+    """
+    _, codec = split_compression(path)
+    if codec == "gzip":
+        return gzip.open(path, mode, **kwargs)
+    if codec == "zstd":
+        _require_zstd()
+        return zstd.open(path, mode, **kwargs)
+    return open(path, mode, **kwargs)
+
+
+def compress(data: bytes, codec: str = "gzip") -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data)
+    if codec == "zstd":
+        _require_zstd()
+        return zstd.compress(data)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decompress gzip or zstd data, detected from its magic number
+    """
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        _require_zstd()
+        return zstd.decompress(data)
+    return data
@@ -7,6 +7,107 @@ PUBMED_SEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 PUBMED_SUMMARY_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
 CROSSREF_URL = "https://api.crossref.org/works"
 PUBMED_FETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+OPENALEX_AUTHORS_URL = "https://api.openalex.org/authors"
+OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+# Number of author IDs OR-ed together in one OpenAlex works filter (the API
+# accepts up to 50), works per page, and pages fetched per batch at most
+OPENALEX_BATCH_SIZE = 50
+OPENALEX_PAGE_SIZE = 200
+OPENALEX_MAX_PAGES = 10
+# Number of authors a name search returns to pick from, and the number of
+# seconds a name or ORCID iD stays resolved to an OpenAlex author ID
+OPENALEX_AUTHOR_CANDIDATES = 10
+OPENALEX_AUTHOR_TTL = 60 * 60 * 24 * 30
 
 WS_NAME = "utrc_active_allocations"
-TIME_SLEEP = 0.4
\ No newline at end of file
+
+# rows read from a Parquet roster at a time
+ROSTER_PARQUET_BATCH_SIZE = 1024
+
+# PubMed publications are only kept if an author affiliation contains this
+# text. When empty, PubMed uses the lighter esummary endpoint instead of efetch
+AFFILIATION_KEYWORD = "university of texas"
+# Maximum number of UIDs sent in a single esummary/efetch request
+PUBMED_BATCH_SIZE = 200
+
+# Publications missing any of these fields are completed by looking their DOI
+# up in the other APIs
+ENRICH_FIELDS = ("journal", "publication_date", "title", "authors")
+# Maximum number of DOIs looked up in a single request
+ENRICH_BATCH_SIZE = 50
+
+# Fraction of API response payloads dumped to the log when DEBUG is enabled
+DEBUG_PAYLOAD_SAMPLE_RATE = 0.1
+
+# Maximum number of items waiting between two pipeline stages
+PIPELINE_QUEUE_SIZE = 100
+# Number of worker threads for each pipeline stage (dedup and write always use one)
+PIPELINE_WORKERS = {"query": 1, "fetch": 4, "filter": 1, "enrich": 2}
+# How often (in seconds) pipeline queue depths are logged at DEBUG level
+PIPELINE_MONITOR_INTERVAL = 5
+# How often (in seconds) run progress is shown and the metrics file written
+PROGRESS_INTERVAL = 10
+# Time (in seconds) and API requests allowed for each author and for a whole
+# run (None means unlimited). Authors whose budget runs out are written with
+# the results found so far and marked as truncated.
+BUDGETS = {
+    "author": {"seconds": 120, "requests": 50},
+    "run": {"seconds": None, "requests": None},
+}
+
+# Number of jobs `pubscraper serve` runs at the same time, and how many
+# finished jobs it keeps results for
+SERVE_JOB_WORKERS = 2
+SERVE_MAX_JOBS = 100
+
+# Staleness-aware refreshing (`pubscraper refresh`): max API requests spent
+# per tick, estimated requests per API for authors never refreshed before,
+# the publication rate (per day) assumed for every author on top of their
+# observed one, how far back (in seconds) the observed rate looks, and how
+# much more urgent authors not refreshed in the current reporting period are
+REFRESH_REQUEST_BUDGET = 200
+REFRESH_DEFAULT_COST = 3
+REFRESH_BASE_RATE = 1 / 365
+REFRESH_RATE_WINDOW = 365 * 24 * 60 * 60
+REFRESH_PERIOD_BOOST = 4
+
+# Persistent cache used to remember state and API responses between runs
+CACHE_FILE = ".pubscraper_cache.sqlite"
+# Portable file `pubscraper cache export` writes and `pubscraper cache import`
+# reads by default (compressed according to its suffix)
+CACHE_EXPORT_FILE = "pubscraper_cache.jsonl.gz"
+# Publication store `pubscraper query` reads when --store_file isn't given (runs
+# only add their results to a store when --store_file is given)
+STORE_FILE = "publications.sqlite"
+# Publications already reported, left out of --only_new reports
+SEEN_FILE = "reported_publications.bin"
+# How long (in seconds) a cached API response is used before it is
+# revalidated with a conditional request (0 disables response caching)
+RESPONSE_CACHE_TTL = 60 * 60 * 24
+# Largest API response body (in bytes) downloaded before giving up on the
+# request (None is unlimited); batched requests that go over it are split into
+# smaller ones. Bodies are downloaded in chunks of DOWNLOAD_CHUNK_SIZE bytes.
+RESPONSE_MAX_BYTES = 32 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# HTTP client the API classes send requests with: "requests", or "httpx"
+# (needs pip install 'httpx[http2]') to multiplex concurrent requests over
+# HTTP/2, and the max number of connections the httpx client opens per API
+HTTP_CLIENT = "requests"
+HTTP2 = True
+HTTP_MAX_CONNECTIONS = 10
+# Codec used to compress large cache entries ("gzip", "zstd", or None), and
+# the size (in bytes) from which entries are compressed
+CACHE_COMPRESSION = "gzip"
+CACHE_COMPRESSION_MIN_SIZE = 1024
+
+# Issue all PubMed author name formats at once instead of one after the other
+PUBMED_CONCURRENT_NAME_FORMATS = False
+# Number of authors combined into one PubMed esearch OR query (0 or 1 searches
+# one author at a time). Articles are attributed back to each author by
+# matching their author lists.
+PUBMED_AUTHOR_BATCH_SIZE = 0
+
+# How long (in seconds) an author with no publications is remembered as empty,
+# and whether to confirm that with a cheap count-only request before skipping
+NEGATIVE_CACHE_TTL = 60 * 60 * 24 * 7
+NEGATIVE_CACHE_RECHECK = True
@@ -0,0 +1,57 @@
+import logging
+
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+Enrichment of incomplete publications. Rather than dropping publications
+that are missing fields (and paging through more results to replace them),
+the pipeline collects the DOIs of an author's incomplete publications and
+looks them up in bulk in the other APIs (CrossRef filter=doi:a,doi:b,...,
+PubMed esearch on [doi] followed by one efetch), filling in only the fields
+that are missing.
+"""
+
+
+def missing_fields(pub: dict) -> list[str]:
+    """
+    :return: the fields of config.ENRICH_FIELDS the publication has no value for
+    """
+    return [field for field in config.ENRICH_FIELDS if not pub.get(field)]
+
+
+def enrich_publications(publications: list, apis: dict, stats=None, author: str = None) -> int:
+    """
+    Complete publications that are missing fields, asking each API in turn
+    for the DOIs that are still incomplete. An API isn't asked about its own
+    publications, since it would return the same record.
+    :param publications: publication dicts, updated in place
+    :param apis: dict of {api_name: API class instance} to look DOIs up in
+    :param author: author the publications were found for (for statistics)
+    :return: the number of publications that were completed
+    """
+    incomplete = [pub for pub in publications if pub.get("doi") and missing_fields(pub)]
+    if not incomplete:
+        return 0
+
+    for api_name, api in apis.items():
+        wanted = {}
+        for pub in incomplete:
+            if pub.get("from") != api_name and missing_fields(pub):
+                wanted.setdefault(pub["doi"].strip().lower(), []).append(pub)
+        if not wanted:
+            continue
+        found = api.get_publications_by_dois(list(wanted), author_name=author)
+        for doi, record in found.items():
+            for pub in wanted.get(doi, []):
+                for field in missing_fields(pub):
+                    if record.get(field):
+                        pub[field] = record[field]
+
+    completed = sum(1 for pub in incomplete if not missing_fields(pub))
+    if stats is not None:
+        stats.incr("publications_enriched", completed, author=author)
+        stats.incr("publications_incomplete", len(incomplete) - completed, author=author)
+    logger.debug(f"Completed {completed} of {len(incomplete)} incomplete publications")
+    return completed
@@ -1,20 +1,44 @@
-import json
 import logging
-import time
 import os
-import tablib
-
-from openpyxl import load_workbook
-from dateutil.parser import parse
+import sqlite3
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 import click
 from click_loglevel import LogLevel
+from dateutil.parser import parse
 
 from pubscraper.version import __version__
+from pubscraper.cache import NAMESPACES, Cache
+from pubscraper.pipeline import scrape_authors
+from pubscraper.progress import Progress
+from pubscraper.roster import (
+    merge_rosters,
+    parse_roster_spec,
+    read_roster,
+    roster_format,
+    roster_label,
+    roster_size,
+)
+from pubscraper.scheduler import RefreshScheduler
+from pubscraper.seen import OnlyNewWriter, SeenSet
+from pubscraper.server import ScrapeService, make_server
+from pubscraper.stats import RunStats
+from pubscraper.store import PublicationStore
+from pubscraper.transport import CLIENTS
+from pubscraper.writers import (
+    FanoutWriter,
+    TeeWriter,
+    labelled_path,
+    open_writer,
+    resolve_output,
+)
 import pubscraper.config as config
 
 from pubscraper.APIClasses.PubMed import PubMed
 from pubscraper.APIClasses.CrossRef import CrossRef
+from pubscraper.APIClasses.OpenAlex import OpenAlex
 
 
 LOG_FORMAT = config.LOGGER_FORMAT_STRING
@@ -25,9 +49,111 @@ logger = logging.getLogger(__name__)
 APIS = {
     "PubMed": PubMed(),
     "CrossRef": CrossRef(),
+    "OpenAlex": OpenAlex(),
 }
 
 
+def configure_apis(
+    cache_file,
+    affiliation,
+    parse_processes,
+    pubmed_author_batch=config.PUBMED_AUTHOR_BATCH_SIZE,
+    http_client=config.HTTP_CLIENT,
+):
+    """
+    Share one cache, one set of run statistics and (optionally) a parse pool
+    between all configured APIs
+    :return: a (cache, stats, parse_pool) tuple
+    """
+    cache = Cache(cache_file)
+    stats = RunStats()
+    parse_pool = ProcessPoolExecutor(parse_processes) if parse_processes else None
+    for api in APIS.values():
+        try:
+            api.configure(
+                cache=cache, stats=stats, parse_pool=parse_pool, http_client=http_client
+            )
+        except RuntimeError as e:
+            raise click.BadParameter(str(e), param_hint="--http_client")
+    APIS["PubMed"].affiliation = affiliation
+    APIS["OpenAlex"].affiliation = affiliation
+    APIS["PubMed"].author_batch_size = pubmed_author_batch
+    return cache, stats, parse_pool
+
+
+def check_input_file(input_file):
+    if not os.path.isfile(input_file):
+        raise click.BadParameter(
+            f"Path '{input_file}' does not exist.", param_hint="'-i' / '--input_file'"
+        )
+    try:
+        roster_format(input_file)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'-i' / '--input_file'")
+
+
+def load_rosters(input_files) -> list:
+    """
+    Check and open every roster given with -i
+    :param input_files: roster files, each optionally followed by
+    ":<worksheet>"
+    :return: a list of (label, roster) tuples
+    """
+    specs = [parse_roster_spec(spec) for spec in dict.fromkeys(input_files)]
+    for path, _ in specs:
+        check_input_file(path)
+    rosters = []
+    labels = set()
+    for path, worksheet in specs:
+        try:
+            roster = read_roster(path, worksheet or config.WS_NAME)
+        except KeyError:
+            raise click.BadParameter(
+                f"No worksheet '{worksheet or config.WS_NAME}' in {path}",
+                param_hint="'-i' / '--input_file'",
+            )
+        label = roster_label(path, worksheet)
+        while label in labels:
+            label += "_"
+        labels.add(label)
+        rosters.append((label, roster))
+    return rosters
+
+
+def open_outputs(
+    rosters: list,
+    output_path: str,
+    format: str,
+    compact: bool = False,
+    store_file: str = None,
+    seen: SeenSet = None,
+):
+    """
+    Open the output of each roster. A single roster is written to
+    output_path; several rosters are merged so each author is queried once,
+    and written to output_path with the roster's label added. Results are
+    also added to the publication store, if there is one.
+    :param rosters: list of (label, roster) tuples from load_rosters
+    :param store_file: publication store to upsert results into (optional)
+    :param seen: only write publications missing from this seen set (the
+    store still gets every publication)
+    :return: the roster to scrape, a writer, and the list of output paths
+    """
+    if len(rosters) == 1:
+        roster, paths = rosters[0][1], [output_path]
+        writer = open_writer(output_path, format, compact=compact)
+    else:
+        roster, members = merge_rosters([roster for _, roster in rosters])
+        paths = [labelled_path(output_path, format, label) for label, _ in rosters]
+        writers = [open_writer(path, format, compact=compact) for path in paths]
+        writer = FanoutWriter(writers, members)
+    if seen is not None:
+        writer = OnlyNewWriter(writer, seen)
+    if store_file:
+        writer = TeeWriter(writer, PublicationStore(store_file))
+    return roster, writer, paths
+
+
 def set_logging_level(ctx, param, value):
     """
     Callback function for click that sets the logging level
@@ -59,7 +185,7 @@ def list_configured_apis(ctx, param, value):
         ctx.exit()
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.version_option(__version__)
 @click.option(
     "--log-level",
@@ -80,11 +206,18 @@ def list_configured_apis(ctx, param, value):
 @click.option(
     "-i",
     "--input_file",
-    type=click.Path(exists=True),
-    default="example_input.xlsx",
-    help="Specify input file",
+    type=click.Path(dir_okay=False),
+    multiple=True,
+    default=["example_input.xlsx"],
+    help="Specify input file (xlsx, csv, jsonl or parquet roster); use file.xlsx:Sheet for "
+    "another worksheet. Repeat to scrape several rosters, each with its own output.",
+)
+@click.option(
+    "-o",
+    "--output_file",
+    default="output",
+    help="Specify output file (add .gz or .zst to compress it)",
 )
-@click.option("-o", "--output_file", default="output", help="Specify output file")
 @click.option(
     "-n",
     "--number",
@@ -118,12 +251,38 @@ def list_configured_apis(ctx, param, value):
     "--format",
     "-f",
     type=click.Choice(
-        ["json", "csv", "xlsx"],
+        ["json", "jsonl", "csv", "xlsx"],
         case_sensitive=False,
     ),
     default="json",
     show_default=True,
-    help="Select the output format from: csv, xlsx, or json.",
+    help="Select the output format from: csv, xlsx, json, or jsonl.",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    default=False,
+    help="Write json output without indentation.",
+)
+@click.option(
+    "--only_new",
+    is_flag=True,
+    default=False,
+    help="Only export publications that no earlier --only_new report included (see --seen_file).",
+)
+@click.option(
+    "--seen_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=config.SEEN_FILE,
+    show_default=True,
+    help="File remembering the publications already reported with --only_new",
+)
+@click.option(
+    "--no_enrich",
+    is_flag=True,
+    default=False,
+    help="Don't complete publications that are missing fields by looking their DOIs up in "
+    "the other APIs.",
 )
 @click.option(
     "--cutoff_date",
@@ -133,9 +292,108 @@ def list_configured_apis(ctx, param, value):
     show_default=True,
     help="Specify the latest date to pull publications. Example input: 2024 or 2024-05 or 2024-05-10.",
 )
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=config.PIPELINE_WORKERS["fetch"],
+    show_default=True,
+    help="Specify the number of authors to fetch publications for at the same time",
+)
+@click.option(
+    "--author_timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=config.BUDGETS["author"]["seconds"],
+    show_default=True,
+    help="Specify the number of seconds spent on each author before writing partial results",
+)
+@click.option(
+    "--author_requests",
+    type=click.IntRange(min=1),
+    default=config.BUDGETS["author"]["requests"],
+    show_default=True,
+    help="Specify the number of API requests made for each author before writing partial results",
+)
+@click.option(
+    "--run_timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=config.BUDGETS["run"]["seconds"],
+    help="Specify the number of seconds the whole run may take; remaining authors get partial results",
+)
+@click.option(
+    "--run_requests",
+    type=click.IntRange(min=1),
+    default=config.BUDGETS["run"]["requests"],
+    help="Specify the number of API requests the whole run may make; remaining authors get partial results",
+)
+@click.option(
+    "--parse_processes",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Specify the number of processes used to parse API responses (0 parses in the fetching threads)",
+)
+@click.option(
+    "--affiliation",
+    type=str,
+    default=config.AFFILIATION_KEYWORD,
+    show_default=True,
+    help="Only keep PubMed publications with an author affiliation containing this text, and prefer OpenAlex authors with an institution containing it. Pass an empty string to disable the check.",
+)
+@click.option(
+    "--pubmed_author_batch",
+    type=click.IntRange(min=0),
+    default=config.PUBMED_AUTHOR_BATCH_SIZE,
+    show_default=True,
+    help="Combine this many authors into each PubMed search (0 searches one author at a time). Articles are matched back to authors by name.",
+)
+@click.option(
+    "--http_client",
+    type=click.Choice(CLIENTS),
+    default=config.HTTP_CLIENT,
+    show_default=True,
+    help="HTTP client to send API requests with. httpx (pip install 'httpx[http2]') multiplexes "
+    "concurrent requests over HTTP/2 instead of opening a connection for each.",
+)
+@click.option(
+    "--cache_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=config.CACHE_FILE,
+    show_default=True,
+    help="Specify the file used to persist state between runs",
+)
+@click.option(
+    "--store_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Add every run's results to this publication store, searched with `pubscraper query` "
+    f"(off by default; `pubscraper query` reads {config.STORE_FILE} unless given one)",
+)
+@click.option(
+    "--stats_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write run statistics (e.g. requests per author) to a JSON file",
+)
+@click.option(
+    "--progress_interval",
+    type=click.FloatRange(min=0),
+    default=config.PROGRESS_INTERVAL,
+    show_default=True,
+    help="Show progress (authors done, ETA, request rates, cache hit rate) every this many "
+    "seconds (0 disables it)",
+)
+@click.option(
+    "--metrics_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Keep a snapshot of the run's progress in this file while it runs: JSON, or a "
+    "Prometheus textfile if the name ends in .prom",
+)
+@click.pass_context
 
 # TODO: batch author names to circumvent rate limits?
 def main(
+    ctx,
     log_level,
     log_file,
     input_file,
@@ -144,123 +402,500 @@ def main(
     apis,
     list_apis,
     format,
+    compact,
+    only_new,
+    seen_file,
+    no_enrich,
     cutoff_date,
+    workers,
+    author_timeout,
+    author_requests,
+    run_timeout,
+    run_requests,
+    parse_processes,
+    affiliation,
+    pubmed_author_batch,
+    http_client,
+    cache_file,
+    store_file,
+    stats_file,
+    progress_interval,
+    metrics_file,
 ):
     logger.debug(f"Logging is set to level {logging.getLevelName(log_level)}")
     if log_file:
         logger.debug(f"Writing logs to {log_file}")
 
+    budgets = {
+        "author": {"seconds": author_timeout, "requests": author_requests},
+        "run": {"seconds": run_timeout, "requests": run_requests},
+    }
+
+    # options shared with subcommands such as `serve`
+    ctx.ensure_object(dict)
+    ctx.obj.update(
+        budgets=budgets,
+        input_file=input_file,
+        output_file=output_file,
+        format=format,
+        compact=compact,
+        enrich=not no_enrich,
+        apis=apis,
+        cutoff_date=cutoff_date,
+        stats_file=stats_file,
+        number=number,
+        workers=workers,
+        parse_processes=parse_processes,
+        affiliation=affiliation,
+        pubmed_author_batch=pubmed_author_batch,
+        http_client=http_client,
+        cache_file=cache_file,
+        store_file=store_file,
+    )
+    if ctx.invoked_subcommand is not None:
+        return
+
     logger.info(f"Querying the following APIs:\n{(", ").join(apis)}")
     try:
-        authors_workbook = load_workbook(filename=input_file, read_only=True)
-        worksheet = authors_workbook[config.WS_NAME]
-        rows = worksheet.rows
-
-        name_dict = {}
-        if worksheet.max_row > 1:
-            next(rows)  # skip header row
-            for row in rows:
-                institution = row[0].value
-                author_name = f"{row[1].value} {row[2].value}"
-                name_dict[author_name] = [author_name, institution]
-
-        logging.debug(f"number of names in name_dict: {len(name_dict.keys())}")
+        rosters = load_rosters(input_file)
     except FileNotFoundError:
         logger.error(f"Couldn't read input file {input_file}, exiting")
         exit(1)
 
+    cache, stats, parse_pool = configure_apis(
+        cache_file, affiliation, parse_processes, pubmed_author_batch, http_client
+    )
+
     logger.debug(f"Querying the following APIs: {apis}")
     logger.debug(f"Requesting {number} publications for each author")
 
-    authors_and_pubs = []
-
-    for author in name_dict.keys():
-        results = {author: []}
-        # FIXME: we should filter by date before the API queries (if the API supports date filtering)
-        authors_pubs = []
-        for api_name in apis:
-            api = APIS[api_name]
-            pubs_found = api.get_publications_by_author(author, number)
-            if pubs_found:
-                for pub in pubs_found:
-                    publication_date_str = pub.get("publication_date", "")
-
-                    # If a cutoff date is provided, check if the publication date is after it
-                    if cutoff_date:
-                        publication_date = (
-                            parse(publication_date_str).strftime("%Y-%m-%d")
-                            if publication_date_str
-                            else ""
-                        )
-                        if publication_date and publication_date > cutoff_date:
-                            authors_pubs.append(pub)
-                    else:
-                        authors_pubs.append(pub)
-
-        results.update({author: authors_pubs})
-        authors_and_pubs.append(results)
-        time.sleep(config.TIME_SLEEP)
+    try:
+        output_path, format = resolve_output(output_file, format)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--output_file")
+    logger.info(f"Exporting the dataset in the specified format: {format} ")
 
+    # FIXME: we should filter by date before the API queries (if the API supports date filtering)
+    seen = SeenSet(seen_file) if only_new else None
+    roster, writer, output_paths = open_outputs(
+        rosters, output_path, format, compact, store_file, seen
+    )
+    if isinstance(roster, list):
+        total = len(roster)
+    else:
+        path, worksheet = parse_roster_spec(input_file[0])
+        total = roster_size(path, worksheet or config.WS_NAME)
+    selected_apis = {api_name: APIS[api_name] for api_name in apis}
+    progress = Progress(stats, total, selected_apis, progress_interval, metrics_file)
+    try:
+        with progress:
+            pipeline = scrape_authors(
+                roster,
+                selected_apis,
+                number,
+                writer,
+                cutoff_date=cutoff_date,
+                workers={"fetch": workers},
+                stats=stats,
+                budgets=budgets,
+                enrich=not no_enrich,
+            )
+    finally:
+        writer.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+    write_errors = pipeline.errors["write"]
+    if write_errors:
+        logger.error(f"Couldn't write the results of {write_errors} authors, exiting")
+    else:
+        logger.info(f"Data successfully exported to {', '.join(output_paths)}")
+    if seen is not None and not write_errors:
+        # only now that the report is complete are its publications remembered
+        seen.save()
+
+    logger.debug(f"Pipeline queue depths at exit: {pipeline.queue_depths()}")
+    counters = stats.summary()["counters"]
+    http = {
+        kind: sum(v for k, v in counters.items() if k.endswith(f".http.{kind}"))
+        for kind in ("fetches", "revalidations", "hits")
+    }
+    logger.info(
+        f"HTTP requests: {http['fetches']} full fetches, "
+        f"{http['revalidations']} revalidations, {http['hits']} cache hits"
+    )
+    if counters.get("authors_truncated"):
+        truncated = [
+            author
+            for author, counts in stats.summary()["per_author"].items()
+            if counts.get("authors_truncated")
+        ]
+        logger.warning(
+            f"{counters['authors_truncated']} authors ran out of budget and have partial "
+            f"results: {', '.join(truncated)}"
+        )
+    logger.info(f"Run statistics: {counters}")
+    if stats_file:
+        stats.write(stats_file)
+    cache.close()
+
+    if write_errors:
+        exit(1)
+    return 0
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", type=int, default=8000, show_default=True, help="Port to listen on")
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=config.SERVE_JOB_WORKERS,
+    show_default=True,
+    help="Number of submitted jobs to run at the same time",
+)
+@click.pass_context
+def serve(ctx, host, port, jobs):
     """
-    Using TabLib to format data in specified format
+    Run a local HTTP service that keeps sessions, rate limits and caches warm
+    between scrapes. Submit rosters or authors with POST /jobs, poll GET
+    /jobs/<id> and fetch GET /jobs/<id>/results, or look up a single author
+    with GET /authors/<name>.
+    """
+    options = ctx.obj
+    cache, stats, parse_pool = configure_apis(
+        options["cache_file"],
+        options["affiliation"],
+        options["parse_processes"],
+        options["pubmed_author_batch"],
+        options["http_client"],
+    )
+    service = ScrapeService(
+        APIS,
+        stats=stats,
+        job_workers=jobs,
+        fetch_workers=options["workers"],
+        number=options["number"],
+        budgets=options["budgets"],
+        enrich=options["enrich"],
+    )
+    server = make_server(service, host, port)
+    logger.info(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        service.shutdown()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        cache.close()
+
+
+@main.command()
+@click.option(
+    "--budget",
+    type=click.IntRange(min=1),
+    default=config.REFRESH_REQUEST_BUDGET,
+    show_default=True,
+    help="Max number of API requests to spend on each tick",
+)
+@click.option(
+    "--period_start",
+    type=str,
+    default=None,
+    help="Start of the current reporting period; authors not refreshed since then are refreshed sooner. Example input: 2024-09-01.",
+)
+@click.option(
+    "--ticks",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of ticks to run",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0),
+    default=3600,
+    show_default=True,
+    help="Number of seconds to wait between ticks",
+)
+@click.pass_context
+def refresh(ctx, budget, period_start, ticks, interval):
+    """
+    Refresh the authors of the roster whose data is most likely out of date,
+    within a request budget, instead of re-scraping the whole roster. Refresh
+    history is kept in the cache file.
+    """
+    options = ctx.obj
+    rosters = load_rosters(options["input_file"])
+    try:
+        period_start = parse(period_start).timestamp() if period_start else None
+    except (ValueError, OverflowError):
+        raise click.BadParameter(f"Can't parse date {period_start}", param_hint="--period_start")
+    try:
+        output_path, format = resolve_output(options["output_file"], options["format"])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--output_file")
+
+    cache, stats, parse_pool = configure_apis(
+        options["cache_file"],
+        options["affiliation"],
+        options["parse_processes"],
+        options["pubmed_author_batch"],
+        options["http_client"],
+    )
+    scheduler = RefreshScheduler(cache, budget=budget, period_start=period_start)
+    roster, writer, output_paths = open_outputs(
+        rosters, output_path, format, options["compact"], options["store_file"]
+    )
+    roster = list(roster)
+    try:
+        for tick in range(ticks):
+            if tick:
+                time.sleep(interval)
+            scheduler.tick(
+                roster,
+                {api_name: APIS[api_name] for api_name in options["apis"]},
+                options["number"],
+                writer,
+                cutoff_date=options["cutoff_date"],
+                workers={"fetch": options["workers"]},
+                stats=stats,
+                budgets=options["budgets"],
+                enrich=options["enrich"],
+            )
+    finally:
+        writer.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+    logger.info(f"Data successfully exported to {', '.join(output_paths)}")
+    if options["stats_file"]:
+        stats.write(options["stats_file"])
+    cache.close()
+
+
+@main.group(name="cache")
+def cache_group():
+    """
+    Manage the cache file (see --cache_file): export it to a portable file
+    to warm-start other containers or nodes, import such a file, show what
+    it holds or prune old entries.
     """
-    logger.debug(f"Results: {(json.dumps(authors_and_pubs, indent=2))}")
-    logger.info(f"Exporting the dataset in the specified format: {format} ")
 
+
+def open_cache(ctx) -> Cache:
+    path = ctx.obj["cache_file"]
+    if not os.path.isfile(path):
+        raise click.BadParameter(f"No cache at {path}", param_hint="--cache_file")
+    return Cache(path)
+
+
+@cache_group.command(name="export")
+@click.argument(
+    "path", type=click.Path(dir_okay=False, writable=True), default=config.CACHE_EXPORT_FILE
+)
+@click.option(
+    "--namespace",
+    type=click.Choice(NAMESPACES),
+    multiple=True,
+    help="Only export this kind of entry (repeat for several; default is all)",
+)
+@click.option(
+    "--skip_expired",
+    is_flag=True,
+    default=False,
+    help="Leave out expired entries (they are otherwise kept to revalidate responses)",
+)
+@click.pass_context
+def cache_export(ctx, path, namespace, skip_expired):
+    """
+    Export the response, negative and state caches to PATH (default
+    pubscraper_cache.jsonl.gz; compressed with gzip or zstd according to its
+    suffix)
+    """
+    cache = open_cache(ctx)
     try:
-        os.remove(output_file)
-        logger.debug(f"successfully removed {output_file}")
-    except Exception:
-        logger.warning(f"could not remove {output_file}")
-
-    dataset = tablib.Dataset()
-
-    dataset.headers = [
-        "From",
-        "Author",
-        "DOI",
-        "Journal",
-        "Content Type",
-        "Publication Date",
-        "Title",
-        "Authors",
-    ]
-
-    # Loop through each author and their publications in authors_and_pubs
-    for author_result in authors_and_pubs:
-        for (
-            author,
-            publications,
-        ) in author_result.items():  # Use .items() to unpack dictionary
-            for pub in publications:
-                if isinstance(pub, dict):  # Only process dictionary entries
-                    # Safely fetch values using .get to avoid KeyError, defaulting to 'N/A' if the key is missing
-                    dataset.append(
-                        [
-                            pub.get("from", "N/A"),
-                            author,
-                            pub.get("doi", "N/A"),
-                            pub.get("journal", "N/A"),
-                            pub.get("content_type", "N/A"),
-                            pub.get("publication_date", "N/A"),
-                            pub.get("title", "N/A"),
-                            pub.get("authors", "N/A"),
-                        ]
-                    )
-
-    if format == "xlsx":
-        with open(f"output.{format}", "wb") as f:
-            f.write(dataset.export("xlsx"))
-    else:
-        with open(f"output.{format}", "w") as f:
-            if format == "csv":
-                f.write(dataset.export("csv"))
-            elif format == "json":
-                json.dump(authors_and_pubs, f, indent=4)
+        count = cache.export_entries(path, namespace, skip_expired)
+    finally:
+        cache.close()
+    click.echo(f"Exported {count} entries to {path}")
 
-    logger.info(f"Data successfully exported to {output_file}.{format}")
 
-    return 0
+@cache_group.command(name="import")
+@click.argument(
+    "path", type=click.Path(exists=True, dir_okay=False), default=config.CACHE_EXPORT_FILE
+)
+@click.pass_context
+def cache_import(ctx, path):
+    """
+    Import an exported cache file into the cache file, creating it if
+    needed. Entries already in the cache are kept unless the imported copy
+    is newer.
+    """
+    cache = Cache(ctx.obj["cache_file"])
+    try:
+        count = cache.import_entries(path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="PATH")
+    finally:
+        cache.close()
+    click.echo(f"Imported {count} entries into {ctx.obj['cache_file']}")
+
+
+@cache_group.command(name="stats")
+@click.pass_context
+def cache_stats(ctx):
+    """
+    Show the number of entries, expired entries and stored bytes of each
+    kind of cache entry
+    """
+    cache = open_cache(ctx)
+    try:
+        stats = cache.stats()
+    finally:
+        cache.close()
+    click.echo(f"{'namespace':<10}\t{'entries':>8}\t{'expired':>8}\t{'bytes':>12}")
+    for namespace, counts in stats.items():
+        click.echo(
+            f"{namespace:<10}\t{counts['entries']:>8}\t{counts['expired']:>8}\t"
+            f"{counts['bytes']:>12}"
+        )
+    click.echo(f"{ctx.obj['cache_file']}: {os.path.getsize(ctx.obj['cache_file'])} bytes")
+
+
+@cache_group.command(name="prune")
+@click.option(
+    "--namespace",
+    type=click.Choice(NAMESPACES),
+    multiple=True,
+    help="Only prune this kind of entry (repeat for several; default is all)",
+)
+@click.option(
+    "--older_than",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Prune entries stored more than this many days ago, whether they have expired or not",
+)
+@click.option(
+    "--all",
+    "prune_all",
+    is_flag=True,
+    default=False,
+    help="Prune every entry, not only expired ones (and, with --older_than, old ones)",
+)
+@click.pass_context
+def cache_prune(ctx, namespace, older_than, prune_all):
+    """
+    Delete expired cache entries (or, with --older_than, entries stored
+    before then) and shrink the cache file
+    """
+    stored_before = None
+    if older_than is not None:
+        stored_before = time.time() - older_than * 24 * 60 * 60
+    # an age limit replaces the expiry check rather than narrowing it
+    expired_only = not prune_all and stored_before is None
+    cache = open_cache(ctx)
+    try:
+        count = cache.prune(namespace, expired_only=expired_only, stored_before=stored_before)
+    finally:
+        cache.close()
+    click.echo(f"Pruned {count} entries from {ctx.obj['cache_file']}")
+
+
+def parse_query_date(value: str, param_hint: str) -> str:
+    """
+    :return: the date as YYYY-MM-DD, missing months and days defaulting to 1
+    """
+    if not value:
+        return None
+    try:
+        return parse(value, default=datetime(1, 1, 1)).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError):
+        raise click.BadParameter(f"Can't parse date {value}", param_hint=param_hint)
+
+
+@main.command()
+@click.option("--author", help="Authors whose name contains this text")
+@click.option("--journal", help="Journals whose name contains this text")
+@click.option("--source", type=click.Choice(list(APIS)), help="API the publication was found with")
+@click.option("--doi", help="Publication with this DOI")
+@click.option("--title", help="Full-text search on titles, e.g. 'protein AND folding'")
+@click.option("--since", help="Only publications published on or after this date, e.g. 2024-05")
+@click.option("--until", help="Only publications published before this date")
+@click.option("--limit", type=click.IntRange(min=1), default=None, help="Max number of results")
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the results to a report file (in --format, or the file's extension) instead "
+    "of printing them",
+)
+@click.pass_context
+def query(ctx, author, journal, source, doi, title, since, until, limit, report):
+    """
+    Answer questions such as "who published in X since Y" from the
+    publication store, without touching the network.
+    """
+    options = ctx.obj
+    store_file = options["store_file"] or config.STORE_FILE
+    if not os.path.isfile(store_file):
+        raise click.BadParameter(
+            f"No publication store at '{store_file}'", param_hint="--store_file"
+        )
+    since = parse_query_date(since, "--since")
+    until = parse_query_date(until, "--until")
+    store = PublicationStore(store_file)
+    try:
+        results = store.query(
+            author=author,
+            journal=journal,
+            source=source,
+            doi=doi,
+            title=title,
+            since=since,
+            until=until,
+            limit=limit,
+        )
+    except sqlite3.OperationalError as e:
+        # --title is passed on as an FTS5 query, e.g. 'protein-folding' isn't valid
+        raise click.BadParameter(
+            f"Invalid full-text query {title!r} ({e}); quote phrases, e.g. '\"protein-folding\"'",
+            param_hint="--title",
+        )
+    finally:
+        store.close()
+    logger.info(f"Found {len(results)} publications")
+
+    if report is None:
+        for author_name, pub in results:
+            row = [
+                pub.get("publication_date"),
+                author_name,
+                pub.get("from"),
+                pub.get("journal"),
+                pub.get("title"),
+                pub.get("doi"),
+            ]
+            click.echo("\t".join(str(value or "") for value in row))
+        return
+
+    try:
+        report_path, format = resolve_output(report, options["format"])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--report")
+    by_author = {}
+    for author_name, pub in results:
+        by_author.setdefault(author_name, []).append(pub)
+    writer = open_writer(report_path, format, compact=options["compact"])
+    try:
+        for author_name, pubs in by_author.items():
+            writer.write(author_name, pubs)
+    finally:
+        writer.close()
+    logger.info(f"Report written to {report_path}")
 
 
 if __name__ == "__main__":
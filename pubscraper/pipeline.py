@@ -0,0 +1,352 @@
+import itertools
+import logging
+import queue
+import threading
+from datetime import datetime
+
+from dateutil.parser import parse
+
+from pubscraper import budget
+from pubscraper.enrich import enrich_publications
+from pubscraper.roster import author_key
+import pubscraper.config as config
+from pubscraper.stats import RunStats
+
+logger = logging.getLogger(__name__)
+
+"""
+A small staged pipeline. Every stage reads from its own bounded queue and
+runs its function on a configurable number of worker threads; whatever the
+function yields is put on the next stage's queue. Because the queues are
+bounded, a slow stage makes the stages in front of it block (backpressure)
+instead of letting work pile up in memory.
+"""
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, func, workers: int = 1):
+        """
+        :param name: name of the stage, used for logging and queue depths
+        :param func: called with each item; returns an iterable of items for
+        the next stage (or None)
+        :param workers: number of threads running func. Stages that keep
+        state between items must use a single worker.
+        """
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker")
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = config.PIPELINE_QUEUE_SIZE,
+        stats: RunStats = None,
+    ):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.stats = stats if stats is not None else RunStats()
+        self._remaining = [stage.workers for stage in stages]
+        # number of items each stage failed on, for this run only
+        self.errors = {stage.name: 0 for stage in stages}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def queue_depths(self) -> dict[str, int]:
+        """
+        :return: the number of items waiting in front of each stage
+        """
+        return {
+            stage.name: stage_queue.qsize()
+            for stage, stage_queue in zip(self.stages, self.queues)
+        }
+
+    def _put(self, index: int, item):
+        self.queues[index].put(item)
+        if item is not _DONE:
+            self.stats.maximum(
+                f"pipeline.{self.stages[index].name}.max_queue_depth",
+                self.queues[index].qsize(),
+            )
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        is_last = index == len(self.stages) - 1
+        while True:
+            item = self.queues[index].get()
+            if item is _DONE:
+                break
+            try:
+                outputs = stage.func(item)
+                for output in outputs or []:
+                    if not is_last:
+                        self._put(index + 1, output)
+            except Exception as e:
+                logger.error(f"Error in pipeline stage {stage.name}: {e}")
+                self.stats.incr(f"pipeline.{stage.name}.errors")
+                with self._lock:
+                    self.errors[stage.name] += 1
+            self.stats.incr(f"pipeline.{stage.name}.items")
+
+        with self._lock:
+            self._remaining[index] -= 1
+            finished = self._remaining[index] == 0
+        if finished and not is_last:
+            for _ in range(self.stages[index + 1].workers):
+                self._put(index + 1, _DONE)
+
+    def _monitor(self, interval: float):
+        while not self._stopped.wait(interval):
+            logger.debug(f"Pipeline queue depths: {self.queue_depths()}")
+
+    def run(self, source):
+        """
+        Feed every item of source through the pipeline and wait for all
+        stages to finish
+        :param source: iterable of items for the first stage
+        """
+        threads = [
+            threading.Thread(
+                target=self._work, args=(index,), name=f"{stage.name}-{n}", daemon=True
+            )
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        monitor = threading.Thread(
+            target=self._monitor,
+            args=(config.PIPELINE_MONITOR_INTERVAL,),
+            name="pipeline-monitor",
+            daemon=True,
+        )
+        for thread in threads:
+            thread.start()
+        monitor.start()
+
+        try:
+            for item in source:
+                self._put(0, item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._put(0, _DONE)
+            for thread in threads:
+                thread.join()
+            self._stopped.set()
+
+
+def filter_by_cutoff(publications: list, cutoff_date: str = None) -> list:
+    """
+    Keep publications published after cutoff_date
+    :param cutoff_date: date in YYYY, YYYY-MM, or YYYY-MM-DD format (optional)
+    """
+    if not cutoff_date:
+        return list(publications)
+
+    kept = []
+    for pub in publications:
+        publication_date_str = pub.get("publication_date", "")
+        if not publication_date_str:
+            continue
+        try:
+            publication_date = parse(publication_date_str).strftime("%Y-%m-%d")
+        except (ValueError, OverflowError):
+            logger.debug(f"Could not parse publication date {publication_date_str}")
+            continue
+        if publication_date > cutoff_date:
+            kept.append(pub)
+    return kept
+
+
+def iso_date(value: str) -> str:
+    """
+    :param value: a publication date as an API returns it, e.g.
+    "2024-Jan-05", "2024-Jan-" or "2024"
+    :return: the date as YYYY-MM-DD (missing months and days default to 1),
+    or None if it has no year or can't be parsed
+    """
+    if not value:
+        return None
+    try:
+        date = parse(str(value).strip("- "), default=datetime(1, 1, 1))
+    except (ValueError, OverflowError):
+        return None
+    return date.strftime("%Y-%m-%d") if date.year > 1 else None
+
+
+def publication_key(pub: dict) -> str:
+    """
+    :return: a key identifying the work a publication refers to (its DOI, or
+    its title when there is no DOI)
+    """
+    doi = (pub.get("doi") or "").strip().lower()
+    if doi:
+        return f"doi:{doi}"
+    title = " ".join((pub.get("title") or "").lower().split())
+    return f"title:{title}"
+
+
+def scrape_authors(
+    roster,
+    apis: dict,
+    number: int,
+    writer,
+    cutoff_date: str = None,
+    workers: dict[str, int] = None,
+    stats: RunStats = None,
+    budgets: dict[str, dict] = None,
+    enrich: bool = False,
+):
+    """
+    Query every API for every author in the roster and write the results
+    through a roster reader -> query -> fetch -> filter -> dedup -> enrich ->
+    write pipeline. Parsing happens in the API classes as part of the fetch stage.
+    Authors are handed to each API in batches of its batch_size through
+    get_publications_by_authors (see APIClasses.Base).
+    :param roster: iterable of (author_name, institution) or (author_name,
+    institution, orcid) tuples
+    :param apis: dict of {api_name: API class instance} to query
+    :param number: max number of publications to request for each author
+    :param writer: writer with a write(author, publications, truncated) method
+    :param cutoff_date: only keep publications published after this date
+    (also passed on to the APIs, which may filter by it in their queries)
+    :param workers: number of workers for each stage (defaults to
+    config.PIPELINE_WORKERS)
+    :param budgets: {"seconds": ..., "requests": ...} limits for each "author"
+    and for the whole "run" (defaults to config.BUDGETS). Authors whose budget
+    runs out are written with the results gathered so far, marked as truncated.
+    :param enrich: complete publications that are missing fields by looking
+    their DOIs up in the other APIs (see pubscraper.enrich)
+    :return: the Pipeline that was run, for inspection
+    """
+    workers = {**config.PIPELINE_WORKERS, **(workers or {})}
+    budgets = {**config.BUDGETS, **(budgets or {})}
+    stats = stats if stats is not None else RunStats()
+    api_names = list(apis.keys())
+    run_budget = budget.Budget(**budgets["run"])
+    run_budget.start()
+
+    def query(batch):
+        entries = []
+        for index, (author, institution, *identifiers) in batch:
+            author_budget = budget.Budget(**budgets["author"], parent=run_budget)
+            entries.append((index, author, author_budget, identifiers[0] if identifiers else None))
+        for api_name in api_names:
+            size = apis[api_name].batch_size
+            for start in range(0, len(entries), size):
+                yield api_name, entries[start : start + size]
+
+    def fetch(item):
+        api_name, entries = item
+        # the APIs return results by name, so namesakes with different ORCID
+        # iDs (see roster.author_key) are looked up in separate calls
+        rounds = []
+        for entry in entries:
+            key = author_key(entry[1], entry[3])
+            for keys, waiting in rounds:
+                if keys.setdefault(entry[1], key) == key:
+                    break
+            else:
+                keys, waiting = {entry[1]: key}, {}
+                rounds.append((keys, waiting))
+            waiting.setdefault(key, []).append(entry)
+        for keys, waiting in rounds:
+            yield from fetch_round(api_name, keys, waiting)
+
+    def fetch_round(api_name, keys, waiting):
+        """
+        :param keys: dict of {author_name: author_key}, one key per name
+        :param waiting: dict of {author_key: [query entries]}
+        """
+        entries = [entry for pending_entries in waiting.values() for entry in pending_entries]
+        author_budgets = {author: author_budget for _, author, author_budget, _ in entries}
+        orcids = {author: orcid for _, author, _, orcid in entries if orcid}
+        try:
+            with budget.activate(run_budget):
+                for author, pubs_found in apis[api_name].get_publications_by_authors(
+                    list(keys), number, since=cutoff_date, budgets=author_budgets, orcids=orcids
+                ):
+                    for index, author, author_budget, _ in waiting.pop(keys.get(author), []):
+                        yield index, author, api_name, author_budget, pubs_found or []
+        except Exception as e:
+            authors = ", ".join(entry[1] for entries in waiting.values() for entry in entries)
+            logger.error(f"Error fetching data for {authors} from {api_name}: {e}")
+        # still pass (empty) results on for authors left out, so they can be completed
+        for pending_entries in waiting.values():
+            for index, author, author_budget, _ in pending_entries:
+                yield index, author, api_name, author_budget, []
+
+    def filter_pubs(item):
+        index, author, api_name, author_budget, pubs = item
+        yield index, author, api_name, author_budget, filter_by_cutoff(pubs, cutoff_date)
+
+    pending = {}
+
+    def dedup(item):
+        index, author, api_name, author_budget, pubs = item
+        received = pending.setdefault(index, [author, 0, []])
+        received[1] += 1
+        received[2].extend(pubs)
+        if received[1] < len(api_names):
+            return
+
+        del pending[index]
+        truncated = author_budget.exhausted
+        if truncated:
+            logger.warning(f"Ran out of budget for {author}, writing partial results")
+            stats.incr("authors_truncated", author=author)
+        seen = set()
+        unique = []
+        for pub in received[2]:
+            key = publication_key(pub)
+            if key in seen:
+                stats.incr("duplicates_dropped", author=author)
+                continue
+            seen.add(key)
+            unique.append(pub)
+        yield index, author, author_budget, unique, truncated
+
+    def enrich_pubs(item):
+        index, author, author_budget, pubs, truncated = item
+        if enrich and not author_budget.exhausted:
+            with budget.activate(author_budget):
+                enrich_publications(pubs, apis, stats, author)
+        yield index, author, pubs, truncated
+
+    # results can finish out of order; buffer them so output follows the roster
+    buffered = {}
+    next_index = [0]
+
+    def write(item):
+        index, author, pubs, truncated = item
+        buffered[index] = (author, pubs, truncated)
+        while next_index[0] in buffered:
+            author, pubs, truncated = buffered.pop(next_index[0])
+            writer.write(author, pubs, truncated=truncated)
+            stats.incr("authors_written")
+            next_index[0] += 1
+
+    pipeline = Pipeline(
+        [
+            Stage("query", query, workers["query"]),
+            Stage("fetch", fetch, workers["fetch"]),
+            Stage("filter", filter_pubs, workers["filter"]),
+            Stage("dedup", dedup, 1),
+            Stage("enrich", enrich_pubs, workers["enrich"]),
+            Stage("write", write, 1),
+        ],
+        stats=stats,
+    )
+    # authors are read in batches so APIs with a bulk interface can combine them
+    batch_size = max((api.batch_size for api in apis.values()), default=1)
+    pipeline.run(itertools.batched(enumerate(roster), batch_size))
+
+    # anything still buffered is behind an author that never completed
+    for index in sorted(buffered):
+        author, pubs, truncated = buffered.pop(index)
+        writer.write(author, pubs, truncated=truncated)
+        stats.incr("authors_written")
+    return pipeline
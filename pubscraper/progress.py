@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from pubscraper.stats import RunStats
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+Live progress of a run. A background thread samples the run statistics
+every few seconds and reports authors done and remaining, the ETA, the
+current authors/sec, each API's request rate next to the rate it is limited
+to, 429 responses and the cache hit rate. Progress is drawn on a single
+updating line when stderr is a terminal, and logged otherwise. Each
+snapshot can also be written to a metrics file, either as JSON or (for
+paths ending in .prom) in the Prometheus textfile format, so long runs can
+be monitored from outside.
+"""
+
+
+def _atomic_write(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prometheus_text(snapshot: dict) -> str:
+    """
+    :return: a progress snapshot in the Prometheus text exposition format
+    """
+    lines = []
+    described = set()
+
+    def metric(name, value, help, labels=""):
+        if value is None:
+            return
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP pubscraper_{name} {help}")
+            lines.append(f"# TYPE pubscraper_{name} gauge")
+        lines.append(f"pubscraper_{name}{labels} {value}")
+
+    metric("authors_done", snapshot["authors_done"], "Authors written so far")
+    metric("authors_total", snapshot["authors_total"], "Authors on the roster (estimate)")
+    metric("elapsed_seconds", snapshot["elapsed"], "Seconds since the run started")
+    metric("eta_seconds", snapshot["eta"], "Estimated seconds until the run finishes")
+    metric("authors_per_second", snapshot["authors_per_second"], "Current author throughput")
+    metric("cache_hit_ratio", snapshot["cache_hit_rate"], "Share of requests served from cache")
+    for name, api in snapshot["apis"].items():
+        labels = f'{{api="{name}"}}'
+        metric("api_requests_total", api["requests"], "API requests sent", labels)
+        metric("api_requests_per_second", api["requests_per_second"], "API request rate", labels)
+        metric("api_rate_limit", api["limit"], "Request rate the API is limited to", labels)
+        metric("api_throttled_total", api["throttled"], "HTTP 429 responses", labels)
+    return "\n".join(lines) + "\n"
+
+
+class Progress:
+    def __init__(
+        self,
+        stats: RunStats,
+        total: int = None,
+        apis: dict = None,
+        interval: float = config.PROGRESS_INTERVAL,
+        metrics_file: str = None,
+        stream=None,
+    ):
+        """
+        :param stats: run statistics of the run to follow
+        :param total: number of authors the run will write (None if unknown)
+        :param apis: dict of {api_name: API class instance} being queried
+        :param interval: number of seconds between updates
+        :param metrics_file: file each snapshot is written to (JSON, or the
+        Prometheus textfile format if it ends in .prom)
+        :param stream: where progress is drawn (stderr by default)
+        """
+        self.stats = stats
+        self.total = total
+        self.apis = apis or {}
+        self.interval = interval
+        self.metrics_file = metrics_file
+        self.stream = stream if stream is not None else sys.stderr
+        self.started = time.monotonic()
+        self._last = (self.started, 0, {name: 0 for name in self.apis})
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _requests(self, name: str) -> int:
+        return self.stats.get(f"{name}.http.fetches") + self.stats.get(
+            f"{name}.http.revalidations"
+        )
+
+    def snapshot(self) -> dict:
+        """
+        :return: the progress of the run since the previous snapshot, as a
+        JSON-serializable dict
+        """
+        now = time.monotonic()
+        done = self.stats.get("authors_written")
+        requests = {name: self._requests(name) for name in self.apis}
+        last_time, last_done, last_requests = self._last
+        self._last = (now, done, requests)
+        window = now - last_time
+
+        rate = (done - last_done) / window if window > 0 else None
+        remaining = max(self.total - done, 0) if self.total is not None else None
+        average = done / (now - self.started) if now > self.started else 0
+        eta = None
+        if remaining is not None and (rate or average):
+            # the current rate is noisy, so the ETA uses the run's average
+            eta = round(remaining / (average or rate), 1)
+
+        hits = sum(self.stats.get(f"{name}.http.hits") for name in self.apis)
+        sent = sum(requests.values())
+        return {
+            "timestamp": time.time(),
+            "elapsed": round(now - self.started, 1),
+            "authors_done": done,
+            "authors_total": self.total,
+            "authors_remaining": remaining,
+            "authors_per_second": round(rate, 3) if rate is not None else None,
+            "eta": eta,
+            "cache_hit_rate": round(hits / (hits + sent), 3) if hits + sent else None,
+            "apis": {
+                name: {
+                    "requests": requests[name],
+                    "requests_per_second": (
+                        round((requests[name] - last_requests.get(name, 0)) / window, 2)
+                        if window > 0
+                        else None
+                    ),
+                    "limit": getattr(api, "requests_per_second", None),
+                    "throttled": self.stats.get(f"{name}.http.status_429"),
+                }
+                for name, api in self.apis.items()
+            },
+        }
+
+    @staticmethod
+    def format(snapshot: dict) -> str:
+        """
+        :return: a one-line summary of a snapshot
+        """
+        done = snapshot["authors_done"]
+        if snapshot["authors_total"] is not None:
+            parts = [f"{done}/{snapshot['authors_total']} authors"]
+        else:
+            parts = [f"{done} authors"]
+        if snapshot["authors_per_second"] is not None:
+            parts.append(f"{snapshot['authors_per_second']:.2f}/s")
+        if snapshot["eta"] is not None:
+            minutes, seconds = divmod(int(snapshot["eta"]), 60)
+            parts.append(f"ETA {minutes // 60}:{minutes % 60:02d}:{seconds:02d}")
+        for name, api in snapshot["apis"].items():
+            text = f"{name} {api['requests_per_second'] or 0:.1f}"
+            if api["limit"]:
+                text += f"/{api['limit']}"
+            text += " req/s"
+            if api["throttled"]:
+                text += f" ({api['throttled']}x429)"
+            parts.append(text)
+        if snapshot["cache_hit_rate"] is not None:
+            parts.append(f"cache {snapshot['cache_hit_rate']:.0%}")
+        return " | ".join(parts)
+
+    def update(self):
+        """
+        Take a snapshot, show it and write it to the metrics file
+        """
+        snapshot = self.snapshot()
+        line = self.format(snapshot)
+        if self.interval and self.stream.isatty():
+            self.stream.write(f"\r\033[K{line}")
+            self.stream.flush()
+        elif self.interval:
+            logger.info(f"Progress: {line}")
+        if self.metrics_file:
+            if self.metrics_file.endswith(".prom"):
+                text = prometheus_text(snapshot)
+            else:
+                text = json.dumps(snapshot, indent=4)
+            try:
+                _atomic_write(self.metrics_file, text)
+            except OSError as e:
+                logger.warning(f"Couldn't write metrics to {self.metrics_file}: {e}")
+        return snapshot
+
+    def _run(self):
+        interval = self.interval or config.PROGRESS_INTERVAL
+        while not self._stopped.wait(interval):
+            self.update()
+
+    def __enter__(self):
+        if self.interval or self.metrics_file:
+            self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            # a final snapshot, so the metrics file describes the finished run
+            self.update()
+            if self.interval and self.stream.isatty():
+                self.stream.write("\n")
+        return False
@@ -0,0 +1,343 @@
+import csv
+import json
+import logging
+import os
+import re
+import unicodedata
+
+from openpyxl import load_workbook
+
+from pubscraper.compression import open_file, split_compression
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+Roster readers. A roster can be an Excel workbook, a CSV file, a JSON Lines
+file (one author object per line) or a Parquet file (needs pyarrow: pip
+install pyarrow); CSV and JSONL rosters may be gzip/zstd compressed. Every
+reader streams its rows, and names are normalized and deduplicated as they
+go past, so only the set of names seen so far is kept in memory and blank
+or incomplete rows are dropped before any API is queried.
+"""
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+ORCID_PATTERN = re.compile(r"(\d{4}-\d{4}-\d{4}-\d{3}[\dX])", re.IGNORECASE)
+
+# accepted column names (or JSON keys) for each roster field, lowercase
+COLUMNS = {
+    "institution": ("root_institution_name", "institution"),
+    "first_name": ("first_name", "first"),
+    "last_name": ("last_name", "last"),
+    "name": ("name", "author", "author_name"),
+    "orcid": ("orcid",),
+}
+
+# spreadsheet columns used when the header doesn't name them
+POSITIONS = {"institution": 0, "first_name": 1, "last_name": 2}
+
+
+def normalize_orcid(value) -> str:
+    """
+    :param value: an ORCID iD, bare or as a URL (e.g.
+    "https://orcid.org/0000-0002-1825-0097")
+    :return: the bare iD (e.g. "0000-0002-1825-0097"), or None if value
+    doesn't hold one
+    """
+    if not value:
+        return None
+    match = ORCID_PATTERN.search(str(value))
+    if match is None:
+        logger.warning(f"Ignoring invalid ORCID iD {value}")
+        return None
+    return match.group(1).upper()
+
+
+def normalize_name(*parts) -> str:
+    """
+    :param parts: parts of a name (e.g. first and last name); None and
+    blank parts are left out
+    :return: the parts joined with single spaces, e.g. "Joe  Allen " ->
+    "Joe Allen"
+    """
+    return " ".join(" ".join(str(part) for part in parts if part is not None).split())
+
+
+def name_key(name: str) -> str:
+    """
+    :return: the key names are deduplicated by, ignoring case and
+    diacritics, e.g. "José Álvarez" and "jose alvarez" share a key
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def author_key(name: str, orcid: str = None) -> str:
+    """
+    :return: the key authors are deduplicated by: their ORCID iD when they
+    have one, so namesakes with different iDs are kept apart, and otherwise
+    their name (see name_key)
+    """
+    return f"orcid:{orcid}" if orcid else f"name:{name_key(name)}"
+
+
+def _named_record(record: dict) -> dict:
+    """
+    Map a record's keys (e.g. a CSV header or JSON object keys) onto roster
+    fields
+    """
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    return {
+        field: next((lowered[alias] for alias in aliases if alias in lowered), None)
+        for field, aliases in COLUMNS.items()
+    }
+
+
+def _tabular_records(rows):
+    """
+    Turn spreadsheet-style rows (a header row, then one row per author) into
+    roster records. Columns are found by header name; if the header names
+    none of them, the institution, first and last name are taken from the
+    first three columns.
+    """
+    header = [str(value or "").strip().lower() for value in next(rows, [])]
+    indexes = {}
+    for field, aliases in COLUMNS.items():
+        found = [header.index(alias) for alias in aliases if alias in header]
+        indexes[field] = found[0] if found else None
+    if all(index is None for index in indexes.values()):
+        indexes.update(POSITIONS)
+
+    for row in rows:
+        yield {
+            field: row[index] if index is not None and index < len(row) else None
+            for field, index in indexes.items()
+        }
+
+
+def _read_xlsx(path, worksheet_name=config.WS_NAME):
+    authors_workbook = load_workbook(filename=path, read_only=True)
+    worksheet = authors_workbook[worksheet_name]
+
+    def records():
+        if worksheet.max_row is not None and worksheet.max_row <= 1:
+            return
+        rows = worksheet.iter_rows(values_only=True)
+        yield from _tabular_records(rows)
+        authors_workbook.close()
+
+    return records()
+
+
+def _read_csv(path, worksheet_name=None):
+    file = open_file(path, "rt", newline="", encoding="utf-8-sig")
+
+    def records():
+        with file:
+            yield from _tabular_records(csv.reader(file))
+
+    return records()
+
+
+def _read_jsonl(path, worksheet_name=None):
+    file = open_file(path, "rt", encoding="utf-8")
+
+    def records():
+        with file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    logger.warning(f"Skipping line {line_number} of {path}: {e}")
+                    continue
+                if isinstance(record, str):
+                    record = {"name": record}
+                yield _named_record(record)
+
+    return records()
+
+
+def _read_parquet(path, worksheet_name=None):
+    if pq is None:
+        raise RuntimeError("Parquet rosters require the pyarrow package (pip install pyarrow)")
+    parquet_file = pq.ParquetFile(path)
+
+    def records():
+        for batch in parquet_file.iter_batches(batch_size=config.ROSTER_PARQUET_BATCH_SIZE):
+            for record in batch.to_pylist():
+                yield _named_record(record)
+
+    return records()
+
+
+READERS = {
+    "xlsx": _read_xlsx,
+    "csv": _read_csv,
+    "jsonl": _read_jsonl,
+    "parquet": _read_parquet,
+}
+
+
+def roster_format(input_file: str) -> str:
+    """
+    :return: the roster format of a file, from its extension (ignoring a
+    .gz or .zst suffix)
+    :raises ValueError: if the format isn't one of READERS
+    """
+    base, codec = split_compression(input_file)
+    extension = base.rsplit(".", 1)[-1].lower() if "." in base else None
+    if extension not in READERS:
+        raise ValueError(
+            f"Unsupported roster format for {input_file}, expected one of: {', '.join(READERS)}"
+        )
+    if codec is not None and extension in ("xlsx", "parquet"):
+        raise ValueError(f"{extension} rosters can't be gzip/zstd compressed")
+    return extension
+
+
+def roster_size(input_file: str, worksheet_name: str = config.WS_NAME) -> int:
+    """
+    Estimate the number of authors in a roster without reading it into
+    memory, e.g. to show progress
+    :return: the number of rows (an upper bound, since blank and duplicate
+    rows count too), or None if it can't be told
+    """
+    format = roster_format(input_file)
+    if format == "xlsx":
+        workbook = load_workbook(filename=input_file, read_only=True)
+        rows = workbook[worksheet_name].max_row
+        workbook.close()
+        return max(rows - 1, 0) if rows is not None else None
+    if format == "parquet":
+        return pq.ParquetFile(input_file).metadata.num_rows if pq is not None else None
+    with open_file(input_file, "rb") as f:
+        lines = sum(1 for line in f if line.strip())
+    return max(lines - 1, 0) if format == "csv" else lines
+
+
+def roster_entries(records):
+    """
+    Normalize and deduplicate roster records (see author_key), dropping rows
+    without a usable name. Names are kept as first seen (with whitespace
+    collapsed). A row without an ORCID iD is taken to repeat an earlier row
+    with the same name.
+    :param records: iterable of dicts with the keys of COLUMNS
+    :return: a generator of (author_name, institution, orcid) tuples
+    """
+    seen = set()
+    seen_names = set()
+    skipped = 0
+    for record in records:
+        author_name = normalize_name(record.get("first_name"), record.get("last_name"))
+        if not author_name:
+            author_name = normalize_name(record.get("name"))
+        # every API search needs at least a first and a last name
+        if len(author_name.split()) < 2:
+            if author_name:
+                logger.warning(f"Skipping incomplete name in roster: {author_name}")
+            skipped += 1
+            continue
+        orcid = normalize_orcid(record.get("orcid"))
+        key = author_key(author_name, orcid)
+        if key in seen or (not orcid and name_key(author_name) in seen_names):
+            continue
+        seen.add(key)
+        seen_names.add(name_key(author_name))
+        yield author_name, record.get("institution"), orcid
+    logger.debug(f"number of names in roster: {len(seen)} ({skipped} rows skipped)")
+
+
+def read_names(names) -> list:
+    """
+    :param names: author names, e.g. from the command line or a service request
+    :return: a roster of the names, normalized and deduplicated
+    """
+    return list(roster_entries({"name": name} for name in names))
+
+
+def parse_roster_spec(spec: str) -> tuple[str, str]:
+    """
+    :param spec: a roster file, optionally followed by ":<worksheet>" to
+    read a worksheet other than config.WS_NAME, e.g. "rosters.xlsx:Physics"
+    :return: a (path, worksheet) tuple; worksheet is None if not given
+    """
+    if not os.path.exists(spec):
+        path, sep, worksheet = spec.rpartition(":")
+        if sep and path and worksheet:
+            return path, worksheet
+    return spec, None
+
+
+def roster_label(path: str, worksheet: str = None) -> str:
+    """
+    :return: a short name for a roster, used to name its output, e.g.
+    "rosters_Physics" for rosters.xlsx:Physics
+    """
+    base, _ = split_compression(os.path.basename(path))
+    label = os.path.splitext(base)[0]
+    return f"{label}_{worksheet}" if worksheet else label
+
+
+def merge_rosters(rosters) -> tuple[list, dict]:
+    """
+    Combine several rosters so that authors who are on more than one of
+    them are only queried once. Authors are matched by author_key; an entry
+    without an ORCID iD also matches the only namesake that has one.
+    :param rosters: list of rosters, each an iterable of (author_name,
+    institution, orcid) tuples
+    :return: the combined roster (authors in the order they are first seen,
+    as spelled there) and a dict of {author_name: [[(roster_index,
+    author_name_on_that_roster)]]} holding, for every name of the combined
+    roster, the entries of each author with that name in roster order
+    """
+    combined = {}
+    # author_key of every entry -> key of the combined entry it was merged into
+    merged_into = {}
+    namesakes = {}
+    rows = 0
+    for roster_index, roster in enumerate(rosters):
+        for author_name, institution, orcid in roster:
+            rows += 1
+            key = author_key(author_name, orcid)
+            if key not in merged_into:
+                unnamed = author_key(author_name)
+                same_name = namesakes.setdefault(name_key(author_name), [])
+                if orcid and unnamed in merged_into and not combined[merged_into[unnamed]][2]:
+                    # one roster may know an ORCID iD the others don't
+                    merged_into[key] = merged_into[unnamed]
+                    combined[merged_into[key]][2] = orcid
+                elif not orcid and len(same_name) == 1:
+                    merged_into[key] = same_name[0]
+                else:
+                    merged_into[key] = key
+                    combined[key] = [author_name, institution, orcid, []]
+                    same_name.append(key)
+            combined[merged_into[key]][3].append((roster_index, author_name))
+    logger.info(f"{len(combined)} unique authors on {len(rosters)} rosters ({rows} entries)")
+    members = {}
+    for author_name, _, _, entries in combined.values():
+        members.setdefault(author_name, []).append(entries)
+    return [tuple(entry[:3]) for entry in combined.values()], members
+
+
+def read_roster(input_file: str, worksheet_name: str = config.WS_NAME):
+    """
+    Read the authors to query from a roster file, in any format of READERS.
+    The file is opened up front (so a bad input file fails immediately) and
+    rows are then streamed one at a time. Authors are named by first_name
+    and last_name columns (the second and third column of a spreadsheet
+    without a header naming them) or by a single name column. An optional
+    column headed "ORCID" holds each author's ORCID iD, which the APIs
+    search by instead of the name.
+    :param input_file: path to the roster
+    :param worksheet_name: name of the worksheet holding the roster (xlsx only)
+    :return: a generator of (author_name, institution, orcid) tuples
+    """
+    reader = READERS[roster_format(input_file)]
+    return roster_entries(reader(input_file, worksheet_name))
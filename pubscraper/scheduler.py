@@ -0,0 +1,227 @@
+import heapq
+import logging
+import time
+
+from dateutil.parser import parse
+
+from pubscraper.cache import STATE, Cache
+from pubscraper.pipeline import scrape_authors
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+Staleness-aware refreshing. Instead of re-scraping the whole roster, each
+tick refreshes the authors whose data is most likely to be out of date,
+within a request budget. An author's priority grows with the time since
+their last refresh and with how often they publish, and is boosted when
+they haven't been refreshed since the current reporting period started.
+Refresh history is kept in the cache, so it carries over between runs.
+"""
+
+DAY = 24 * 60 * 60
+
+# counters that correspond to API requests (see the API classes). Requests
+# shared by a batch of authors (e.g. PubMed.esearch_batches and
+# OpenAlex.works_requests) aren't attributed to any one author.
+REQUEST_COUNTERS = (
+    "PubMed.esearch",
+    "PubMed.esearch_count",
+    "PubMed.esearch_batches",
+    "PubMed.efetch",
+    "PubMed.esummary",
+    "CrossRef.requests",
+    "CrossRef.count_requests",
+    "CrossRef.doi_requests",
+    "PubMed.doi_searches",
+    "OpenAlex.author_lookups",
+    "OpenAlex.works_requests",
+)
+
+
+def publication_rate(
+    publications: list, now: float, window: float = config.REFRESH_RATE_WINDOW
+) -> float:
+    """
+    :param publications: publications found for an author
+    :param window: number of seconds to look back
+    :return: the number of publications per day published within the window
+    """
+    count = 0
+    for pub in publications:
+        try:
+            published = parse(pub.get("publication_date") or "").timestamp()
+        except (ValueError, OverflowError):
+            continue
+        if now - window <= published <= now:
+            count += 1
+    return count / (window / DAY)
+
+
+class RefreshScheduler:
+    def __init__(
+        self,
+        cache: Cache,
+        budget: int = config.REFRESH_REQUEST_BUDGET,
+        period_start: float = None,
+        default_cost: int = config.REFRESH_DEFAULT_COST,
+    ):
+        """
+        :param cache: cache holding each author's refresh history
+        :param budget: max number of API requests spent in one tick
+        :param period_start: timestamp the current reporting period started at
+        :param default_cost: estimated requests per API for an author that
+        hasn't been refreshed yet
+        """
+        self.cache = cache
+        self.budget = budget
+        self.period_start = period_start
+        self.default_cost = default_cost
+
+    @staticmethod
+    def _key(author: str) -> str:
+        return f"refresh:{author}"
+
+    def history(self, author: str) -> dict:
+        """
+        :return: the author's refresh history, or None if they were never refreshed
+        """
+        return self.cache.get(STATE, self._key(author))
+
+    def priority(self, author: str, now: float = None) -> float:
+        """
+        :return: how valuable refreshing the author is right now (higher is
+        more valuable; authors that were never refreshed come first)
+        """
+        now = now if now is not None else time.time()
+        history = self.history(author)
+        if history is None:
+            return float("inf")
+        staleness = max(0.0, now - history["last_refresh"]) / DAY
+        priority = staleness * (history["rate"] + config.REFRESH_BASE_RATE)
+        if self.period_start is not None and history["last_refresh"] < self.period_start:
+            priority *= config.REFRESH_PERIOD_BOOST
+        return priority
+
+    def cost(self, author: str, api_count: int) -> float:
+        """
+        :return: the estimated number of requests refreshing the author takes
+        """
+        history = self.history(author)
+        if history is None or history.get("cost") is None:
+            return self.default_cost * api_count
+        return history["cost"]
+
+    def plan(self, authors, api_count: int = 1, now: float = None) -> list[str]:
+        """
+        Pick the most valuable authors to refresh within the request budget
+        :param authors: names of the authors that could be refreshed
+        :param api_count: number of APIs each author is queried with
+        :return: the authors to refresh, most valuable first (ties keep their
+        order in authors)
+        """
+        now = now if now is not None else time.time()
+        heap = [
+            (-self.priority(author, now), index, author)
+            for index, author in enumerate(dict.fromkeys(authors))
+        ]
+        heapq.heapify(heap)
+
+        selected = []
+        spent = 0
+        while heap:
+            _, _, author = heapq.heappop(heap)
+            cost = self.cost(author, api_count)
+            # always refresh at least one author, so expensive ones can't starve
+            if selected and spent + cost > self.budget:
+                continue
+            selected.append(author)
+            spent += cost
+        logger.debug(f"Planned {len(selected)} refreshes costing ~{spent} requests")
+        return selected
+
+    def record(self, author: str, publications: list, requests: int = None, now: float = None):
+        """
+        Remember that the author was refreshed
+        :param publications: publications found for the author
+        :param requests: number of API requests the refresh took
+        """
+        now = now if now is not None else time.time()
+        previous = self.history(author) or {}
+        self.cache.set(
+            STATE,
+            self._key(author),
+            {
+                "last_refresh": now,
+                "refreshes": previous.get("refreshes", 0) + 1,
+                "rate": publication_rate(publications, now),
+                "cost": requests if requests else previous.get("cost"),
+            },
+        )
+
+    def tick(self, roster, apis: dict, number: int, writer, **kwargs) -> list[str]:
+        """
+        Refresh the most valuable authors of a roster within the budget. The
+        budget caps the requests of the tick (see scrape_authors' run budget),
+        unless a single author is estimated to need more, in which case they
+        are allowed what they are estimated to need.
+        :param roster: iterable of (author_name, institution[, orcid]) tuples
+        :param apis: dict of {api_name: API class instance} to query
+        :param number: max number of publications to request for each author
+        :param writer: writer the refreshed authors are written to
+        :param kwargs: passed on to scrape_authors
+        :return: the authors that were refreshed
+        """
+        entries = {entry[0]: entry for entry in roster}
+        selected = self.plan(entries, len(apis))
+
+        budgets = {**config.BUDGETS, **(kwargs.pop("budgets", None) or {})}
+        cap = max([self.budget] + [self.cost(author, len(apis)) for author in selected[:1]])
+        if budgets["run"].get("requests") is not None:
+            cap = min(cap, budgets["run"]["requests"])
+        budgets["run"] = {**budgets["run"], "requests": cap}
+
+        # the APIs usually share one RunStats, which must only be counted once
+        run_stats = list({id(api.stats): api.stats for api in apis.values()}.values())
+
+        def requests_made(author=None):
+            return sum(
+                stats.get(counter, author=author)
+                for stats in run_stats
+                for counter in REQUEST_COUNTERS
+            )
+
+        before_total = requests_made()
+        before = {author: requests_made(author) for author in selected}
+        recorder = _RecordingWriter(writer)
+        scrape_authors(
+            [entries[author] for author in selected],
+            apis,
+            number,
+            recorder,
+            budgets=budgets,
+            **kwargs,
+        )
+        own = {author: requests_made(author) - before[author] for author in selected}
+        # requests made for a whole batch are shared evenly by its authors
+        shared = (requests_made() - before_total - sum(own.values())) / max(len(selected), 1)
+        for author, publications in recorder.written.items():
+            self.record(author, publications, round(own[author] + shared, 2))
+        logger.info(f"Refreshed {len(selected)} of {len(entries)} authors")
+        return selected
+
+
+class _RecordingWriter:
+    """
+    Passes results on to another writer, keeping them for the scheduler
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.written = {}
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        # truncated authors aren't recorded, so they are retried on the next tick
+        if not truncated:
+            self.written[author] = publications
+        self.writer.write(author, publications, truncated=truncated)
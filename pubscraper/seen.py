@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from array import array
+
+from pubscraper.pipeline import publication_key
+
+logger = logging.getLogger(__name__)
+
+"""
+The set of publications already reported, for "new publications only"
+reports. Each publication is remembered as a 64-bit hash of its key (its DOI,
+or its normalized title when there is no DOI; see pipeline.publication_key),
+and the file holds the sorted hashes, 8 bytes per publication. The file is
+loaded into a set, so checking a publication is O(1), and is only rewritten
+(atomically, through a temporary file) once a report has been written.
+"""
+
+
+def key_hash(pub: dict) -> int:
+    """
+    :return: the 64-bit hash a publication is remembered by
+    """
+    digest = hashlib.blake2b(publication_key(pub).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class SeenSet:
+    def __init__(self, path: str):
+        """
+        :param path: file holding the hashes of the publications reported so
+        far (created by the first save)
+        """
+        self.path = path
+        self._seen = set()
+        self._pending = set()
+        if os.path.exists(path):
+            hashes = array("Q")
+            with open(path, "rb") as f:
+                hashes.frombytes(f.read())
+            if sys.byteorder == "little":
+                hashes.byteswap()  # stored big-endian
+            self._seen.update(hashes)
+        logger.debug(f"Loaded {len(self._seen)} reported publications from {path}")
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, pub: dict) -> bool:
+        return key_hash(pub) in self._seen
+
+    def add(self, pub: dict):
+        """
+        Mark a publication as reported. It is only remembered once save() is
+        called, so publications shared by several authors of the same report
+        are reported for each of them.
+        """
+        self._pending.add(key_hash(pub))
+
+    def save(self):
+        """
+        Remember the publications added since the file was loaded, replacing
+        the file atomically
+        """
+        new = self._pending - self._seen
+        if not new and os.path.exists(self.path):
+            return
+        self._seen |= new
+        self._pending.clear()
+        hashes = array("Q", sorted(self._seen))
+        if sys.byteorder == "little":
+            hashes.byteswap()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".seen-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(hashes.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Remembered {len(new)} newly reported publications in {self.path}")
+
+
+class OnlyNewWriter:
+    """
+    Passes only publications that haven't been reported before on to
+    another writer, marking them as reported in the seen set
+    """
+
+    def __init__(self, writer, seen: SeenSet):
+        self.writer = writer
+        self.seen = seen
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        new = [pub for pub in publications if isinstance(pub, dict) and pub not in self.seen]
+        for pub in new:
+            self.seen.add(pub)
+        self.writer.write(author, new, truncated=truncated)
+
+    def close(self):
+        self.writer.close()
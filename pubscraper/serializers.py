@@ -0,0 +1,72 @@
+import json
+import logging
+import random
+
+import pubscraper.config as config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+"""
+JSON encoding and decoding for API responses, caches and output. orjson or
+msgspec are used when installed (pip install orjson), otherwise the standard
+library json module. Compact output is identical whichever backend is used;
+indented output other than indent=2 always goes through the standard library
+so the file layout doesn't change.
+"""
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+
+def loads(data):
+    """
+    :param data: JSON document as bytes or str
+    :return: the decoded object
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: int = None) -> str:
+    """
+    :param obj: JSON-serializable object
+    :param indent: number of spaces to indent by (compact if None)
+    :return: the encoded document
+    """
+    if indent is None:
+        if BACKEND == "orjson":
+            return orjson.dumps(obj).decode("utf-8")
+        if BACKEND == "msgspec":
+            return msgspec.json.encode(obj).decode("utf-8")
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    if indent == 2 and BACKEND == "orjson":
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=indent)
+
+
+def log_payload(logger: logging.Logger, message: str, data):
+    """
+    Log a (possibly large) payload at DEBUG level. Nothing is encoded unless
+    DEBUG is enabled for the logger, and only a sample of payloads is logged
+    (see config.DEBUG_PAYLOAD_SAMPLE_RATE).
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= config.DEBUG_PAYLOAD_SAMPLE_RATE:
+        return
+    logger.debug(f"{message}: {dumps(data, indent=2)}")
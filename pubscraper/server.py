@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from pubscraper import serializers
+from pubscraper.pipeline import scrape_authors
+from pubscraper.roster import read_names, read_roster
+from pubscraper.stats import RunStats
+from pubscraper.writers import author_entry
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+Long-running service mode (`pubscraper serve`). A single process keeps the
+API classes, their HTTP sessions, rate limiters and cache warm, and exposes
+a small local HTTP API:
+
+    POST /jobs                 submit {"authors": [...]} or {"roster": "file.xlsx"}
+                               (optional "number", "apis", "cutoff_date")
+    GET  /jobs/<id>            poll a job's status
+    GET  /jobs/<id>/results    fetch a finished job's results
+    GET  /authors/<name>       look up a single author right away
+                               (optional ?number=&apis=&cutoff_date=)
+    GET  /stats                run statistics since the service started
+"""
+
+
+class ResultsCollector:
+    """
+    Writer that keeps results in memory, in the same shape as the JSON output,
+    and the authors whose results were cut short in a separate list
+    """
+
+    def __init__(self):
+        self.results = []
+        self.truncated = []
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        self.results.append(author_entry(author, publications))
+        if truncated:
+            self.truncated.append(author)
+
+
+class Job:
+    def __init__(self, roster: list, number: int, apis: list[str], cutoff_date: str = None):
+        self.id = uuid.uuid4().hex
+        self.roster = roster
+        self.number = number
+        self.apis = apis
+        self.cutoff_date = cutoff_date
+        self.status = "queued"
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.collector = ResultsCollector()
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "authors_total": len(self.roster),
+            "authors_done": len(self.collector.results),
+            "authors_truncated": list(self.collector.truncated),
+            "submitted": self.submitted,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+
+def _check_number(number):
+    valid = isinstance(number, int) and not isinstance(number, bool) and number > 0
+    if number is not None and not valid:
+        raise ValueError(f"number must be a positive integer, not {number!r}")
+
+
+def _check_names(names, field: str):
+    if names is not None and (
+        not isinstance(names, list) or not all(isinstance(name, str) for name in names)
+    ):
+        raise ValueError(f"{field} must be a list of strings, not {names!r}")
+
+
+class ScrapeService:
+    def __init__(
+        self,
+        apis: dict,
+        stats: RunStats = None,
+        job_workers: int = config.SERVE_JOB_WORKERS,
+        fetch_workers: int = config.PIPELINE_WORKERS["fetch"],
+        number: int = 10,
+        budgets: dict = None,
+        enrich: bool = False,
+    ):
+        """
+        :param apis: dict of {api_name: API class instance}, shared by all jobs
+        :param stats: run statistics shared by all jobs
+        :param job_workers: number of jobs run at the same time
+        :param fetch_workers: fetch stage workers for each job
+        :param number: default number of publications requested per author
+        :param budgets: time and request budgets for each job (see scrape_authors)
+        :param enrich: complete publications that are missing fields (see scrape_authors)
+        """
+        self.apis = apis
+        self.stats = stats if stats is not None else RunStats()
+        self.fetch_workers = fetch_workers
+        self.number = number
+        self.budgets = budgets
+        self.enrich = enrich
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(job_workers, thread_name_prefix="job")
+
+    def _select_apis(self, api_names=None) -> dict:
+        if not api_names:
+            return self.apis
+        unknown = [name for name in api_names if name not in self.apis]
+        if unknown:
+            raise ValueError(f"Unknown APIs: {', '.join(unknown)}")
+        return {name: self.apis[name] for name in api_names}
+
+    def _scrape(self, roster: list, collector, number=None, api_names=None, cutoff_date=None):
+        scrape_authors(
+            roster,
+            self._select_apis(api_names),
+            number or self.number,
+            collector,
+            cutoff_date=cutoff_date,
+            workers={"fetch": self.fetch_workers},
+            stats=self.stats,
+            budgets=self.budgets,
+            enrich=self.enrich,
+        )
+
+    def _run_job(self, job: Job):
+        job.status = "running"
+        try:
+            self._scrape(job.roster, job.collector, job.number, job.apis, job.cutoff_date)
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished = time.time()
+
+    def _forget_old_jobs(self):
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished is not None),
+            key=lambda job: job.finished,
+        )
+        for job in finished[: max(0, len(self.jobs) - config.SERVE_MAX_JOBS)]:
+            del self.jobs[job.id]
+
+    def submit(self, authors=None, roster=None, number=None, apis=None, cutoff_date=None) -> Job:
+        """
+        Queue a scrape for a list of author names or a roster file
+        :return: the queued Job
+        :raises ValueError: for badly typed arguments or unknown APIs
+        """
+        _check_names(authors, "authors")
+        _check_names(apis, "apis")
+        _check_number(number)
+        if roster is not None and not isinstance(roster, str):
+            raise ValueError(f"roster must be a file name, not {roster!r}")
+        if roster:
+            rows = list(read_roster(roster))
+        else:
+            rows = read_names(authors or [])
+        self._select_apis(apis)
+
+        job = Job(rows, number or self.number, apis, cutoff_date)
+        with self._lock:
+            self._forget_old_jobs()
+            self.jobs[job.id] = job
+        self._executor.submit(self._run_job, job)
+        logger.info(f"Queued job {job.id} for {len(rows)} authors")
+        return job
+
+    def lookup(self, author: str, number=None, apis=None, cutoff_date=None) -> list:
+        """
+        Look up a single author right away, bypassing the job queue
+        :return: the author's publications
+        """
+        _check_number(number)
+        collector = ResultsCollector()
+        self._scrape([(author, None)], collector, number, apis, cutoff_date)
+        return collector.results[0][author] if collector.results else []
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service: ScrapeService = None
+
+    def _send(self, status: int, body):
+        payload = serializers.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        query = parse_qs(url.query)
+
+        if parts == ["stats"]:
+            return self._send(200, self.service.stats.summary())
+
+        if len(parts) == 2 and parts[0] == "authors":
+            try:
+                number = int(query["number"][0]) if "number" in query else None
+                publications = self.service.lookup(
+                    parts[1],
+                    number=number,
+                    apis=query.get("apis"),
+                    cutoff_date=query.get("cutoff_date", [None])[0],
+                )
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            except Exception as e:
+                logger.exception(f"Lookup of {parts[1]} failed")
+                return self._send(500, {"error": str(e)})
+            return self._send(200, {parts[1]: publications})
+
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.service.jobs.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": f"No job {parts[1]}"})
+            if len(parts) == 2:
+                return self._send(200, job.describe())
+            if parts[2] == "results":
+                if job.status != "done":
+                    return self._send(409, job.describe())
+                return self._send(200, job.collector.results)
+
+        self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip("/") != "jobs":
+            return self._send(404, {"error": f"Unknown path {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = serializers.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            job = self.service.submit(
+                authors=body.get("authors"),
+                roster=body.get("roster"),
+                number=body.get("number"),
+                apis=body.get("apis"),
+                cutoff_date=body.get("cutoff_date"),
+            )
+        except (ValueError, OSError, KeyError) as e:
+            return self._send(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception("Job submission failed")
+            return self._send(500, {"error": str(e)})
+        self._send(202, job.describe())
+
+
+def make_server(service: ScrapeService, host: str = "127.0.0.1", port: int = 8000):
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,63 @@
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class RunStats:
+    """
+    Thread-safe counters collected over the course of a run. Counters can be
+    recorded globally or attributed to a single author (e.g. the number of
+    esearch calls made for each author).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.per_author = defaultdict(Counter)
+
+    def incr(self, name: str, amount: int = 1, author: str = None):
+        """
+        Increment a counter
+        :param name: name of the counter, e.g. "PubMed.esearch"
+        :param amount: amount to increment by (default is 1)
+        :param author: optionally attribute the increment to an author
+        """
+        with self._lock:
+            self.counters[name] += amount
+            if author is not None:
+                self.per_author[author][name] += amount
+
+    def maximum(self, name: str, value: int):
+        """
+        Record value in a counter if it is larger than the current value
+        """
+        with self._lock:
+            if value > self.counters[name]:
+                self.counters[name] = value
+
+    def get(self, name: str, author: str = None) -> int:
+        with self._lock:
+            if author is not None:
+                return self.per_author[author][name]
+            return self.counters[name]
+
+    def summary(self) -> dict:
+        """
+        :return: a JSON-serializable snapshot of all counters
+        """
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "per_author": {
+                    author: dict(sorted(counts.items()))
+                    for author, counts in self.per_author.items()
+                },
+            }
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        logger.debug(f"Wrote run statistics to {path}")
@@ -0,0 +1,191 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from pubscraper import serializers
+from pubscraper.pipeline import iso_date, publication_key
+
+logger = logging.getLogger(__name__)
+
+"""
+A local store of every publication scraped so far. Each run upserts what it
+finds (publications are keyed like the pipeline deduplicates them: by DOI,
+or by title when there is none), so history accumulates across runs instead
+of being overwritten with the output file. Publications are indexed by DOI,
+source and date, authorships by author, and titles are full-text searchable
+when SQLite has FTS5 (otherwise title searches fall back to LIKE). `pubscraper
+query` answers questions from the store without touching the network.
+"""
+
+# columns stored for each publication, besides the full publication dict
+FIELDS = ("doi", "source", "journal", "content_type", "publication_date", "title", "authors")
+
+
+class PublicationStore:
+    def __init__(self, path: str = ":memory:"):
+        """
+        :param path: SQLite database file (kept in memory by default)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS publications (
+                key TEXT PRIMARY KEY,
+                doi TEXT,
+                source TEXT,
+                journal TEXT,
+                content_type TEXT,
+                publication_date TEXT,
+                title TEXT,
+                authors TEXT,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS authorships (
+                author TEXT NOT NULL,
+                key TEXT NOT NULL REFERENCES publications (key),
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (author, key)
+            );
+            CREATE INDEX IF NOT EXISTS publications_doi ON publications (doi);
+            CREATE INDEX IF NOT EXISTS publications_source ON publications (source);
+            CREATE INDEX IF NOT EXISTS publications_date ON publications (publication_date);
+            CREATE INDEX IF NOT EXISTS authorships_key ON authorships (key);
+            """
+        )
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(key UNINDEXED, title)"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no FTS5, title searches will be slower")
+            self.full_text = False
+        self._conn.commit()
+        logger.debug(f"Opened publication store at {path}")
+
+    def _upsert(self, author: str, pub: dict, now: float):
+        key = publication_key(pub)
+        row = self._conn.execute(
+            "SELECT data, first_seen FROM publications WHERE key = ?", (key,)
+        ).fetchone()
+        first_seen = now
+        if row is not None:
+            # keep values from earlier runs that this one is missing
+            previous, first_seen = serializers.loads(row[0]), row[1]
+            pub = {**previous, **{field: value for field, value in pub.items() if value}}
+        values = {
+            "doi": (pub.get("doi") or "").strip().lower() or None,
+            "source": pub.get("from"),
+            **{field: pub.get(field) or None for field in FIELDS[2:]},
+            # stored as YYYY-MM-DD, so dates compare and sort as strings
+            "publication_date": iso_date(pub.get("publication_date")),
+        }
+        placeholders = ", ".join("?" for _ in range(len(FIELDS) + 4))
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO publications VALUES ({placeholders})",
+            (key, *(values[field] for field in FIELDS), serializers.dumps(pub), first_seen, now),
+        )
+        self._conn.execute(
+            """
+            INSERT INTO authorships VALUES (?, ?, ?, ?)
+            ON CONFLICT (author, key) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            (author, key, now, now),
+        )
+        if self.full_text and values["title"]:
+            self._conn.execute("DELETE FROM titles WHERE key = ?", (key,))
+            self._conn.execute("INSERT INTO titles VALUES (?, ?)", (key, values["title"]))
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        """
+        Upsert an author's publications (the writer interface, so the store
+        can be written to by the pipeline alongside the output file)
+        """
+        now = time.time()
+        with self._lock:
+            for pub in publications:
+                if isinstance(pub, dict):
+                    self._upsert(author, pub, now)
+            self._conn.commit()
+
+    def query(
+        self,
+        author: str = None,
+        journal: str = None,
+        source: str = None,
+        doi: str = None,
+        title: str = None,
+        since: str = None,
+        until: str = None,
+        limit: int = None,
+    ) -> list:
+        """
+        Look publications up, newest first. Every criterion is optional.
+        :param author: authors whose name contains this text (case-insensitive)
+        :param journal: journals whose name contains this text (case-insensitive)
+        :param source: API the publication was found with, e.g. "PubMed"
+        :param title: full-text search on titles (FTS5 query syntax)
+        :param since: only publications published on or after this date (YYYY[-MM[-DD]])
+        :param until: only publications published before this date
+        :return: a list of (author, publication) tuples
+        """
+        joins = ["JOIN publications p ON p.key = a.key"]
+        conditions = []
+        params = []
+        if author:
+            conditions.append("a.author LIKE ?")
+            params.append(f"%{author}%")
+        if journal:
+            conditions.append("p.journal LIKE ?")
+            params.append(f"%{journal}%")
+        if source:
+            conditions.append("p.source = ?")
+            params.append(source)
+        if doi:
+            conditions.append("p.doi = ?")
+            params.append(doi.strip().lower())
+        if title and self.full_text:
+            joins.append("JOIN titles t ON t.key = p.key")
+            conditions.append("titles MATCH ?")
+            params.append(title)
+        elif title:
+            conditions.append("p.title LIKE ?")
+            params.append(f"%{title}%")
+        if since:
+            conditions.append("p.publication_date >= ?")
+            params.append(since)
+        if until:
+            conditions.append("p.publication_date < ?")
+            params.append(until)
+
+        sql = f"SELECT a.author, p.data FROM authorships a {' '.join(joins)}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        sql += " ORDER BY p.publication_date DESC, a.author"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(author, serializers.loads(data)) for author, data in rows]
+
+    def counts(self) -> dict:
+        """
+        :return: the number of publications and authors in the store
+        """
+        with self._lock:
+            publications = self._conn.execute("SELECT COUNT(*) FROM publications").fetchone()[0]
+            authors = self._conn.execute(
+                "SELECT COUNT(DISTINCT author) FROM authorships"
+            ).fetchone()[0]
+        return {"publications": publications, "authors": authors}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
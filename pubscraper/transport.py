@@ -0,0 +1,322 @@
+import logging
+from urllib.parse import urlencode
+
+import requests
+
+from pubscraper.cache import RESPONSE, Cache
+from pubscraper import budget, serializers
+from pubscraper.stats import RunStats
+import pubscraper.config as config
+
+logger = logging.getLogger(__name__)
+
+"""
+The HTTP layer shared by the API classes. Successful responses are kept in
+the cache together with their validators (ETag / Last-Modified). Fresh
+entries are served without touching the network; expired entries are
+revalidated with a conditional GET, and a 304 answer simply renews the
+cached copy instead of downloading the body again. Requests that go over
+the network are charged to the active budget (see pubscraper.budget), and
+their timeout never runs past its deadline. Bodies are streamed in chunks
+and a response larger than the transport's byte limit is abandoned as soon
+as it goes over, so callers can ask for less (see PubMed._fetch_ids) instead
+of holding an oversized body in memory.
+
+Requests go out through requests by default. The "httpx" client (pip install
+'httpx[http2]') speaks HTTP/2 where the server supports it, so requests made
+by concurrent fetch workers are multiplexed over one connection per API
+instead of each needing its own socket. It sits underneath everything else
+here, so the cache, rate limiters, budgets and size limits, and the API
+classes' error handling, work the same with either client.
+"""
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+CLIENTS = ("requests", "httpx")
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """
+    Raised when a response body is larger than the transport accepts
+    """
+
+
+class CachedResponse:
+    """
+    Minimal stand-in for requests.Response built from a cache entry
+    """
+
+    def __init__(self, url: str, status_code: int, headers: dict, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.from_cache = True
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return serializers.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class HTTPXResponse:
+    """
+    A streamed httpx response behind the parts of the requests.Response
+    interface the transport and the API classes use
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self._content = None
+
+    def iter_content(self, chunk_size: int = None):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def close(self):
+        self._response.close()
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = b"".join(self.iter_content())
+            self.close()
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self._response.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return serializers.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class HTTPXSession:
+    """
+    Sends requests with an httpx client, using HTTP/2 when the h2 package is
+    installed, behind the requests.Session.get interface. httpx errors are
+    raised as the matching requests exceptions.
+    """
+
+    def __init__(self, http2: bool = config.HTTP2, **client_options):
+        """
+        :param http2: negotiate HTTP/2 with servers that support it
+        :param client_options: passed on to httpx.Client
+        """
+        if httpx is None:
+            raise RuntimeError(
+                "The httpx client requires the httpx package (pip install 'httpx[http2]')"
+            )
+        limits = httpx.Limits(max_connections=config.HTTP_MAX_CONNECTIONS)
+        try:
+            self.client = httpx.Client(http2=http2, limits=limits, **client_options)
+        except ImportError:
+            logger.warning("HTTP/2 requires the h2 package (pip install h2), using HTTP/1.1")
+            self.client = httpx.Client(limits=limits, **client_options)
+
+    def get(self, url: str, params: dict = None, headers: dict = None, timeout=None, stream=False):
+        try:
+            request = self.client.build_request(
+                "GET", url, params=params, headers=headers, timeout=timeout
+            )
+            response = HTTPXResponse(self.client.send(request, stream=True))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        if not stream:
+            # download the whole body, as requests does without stream=True
+            response.content
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+def make_session(client: str = config.HTTP_CLIENT):
+    """
+    :param client: one of CLIENTS
+    :return: a session to send requests with
+    :raises RuntimeError: if the client's package isn't installed
+    """
+    if client == "requests":
+        return requests.Session()
+    if client == "httpx":
+        return HTTPXSession()
+    raise ValueError(f"Unknown HTTP client {client}, expected one of: {', '.join(CLIENTS)}")
+
+
+def request_key(url: str, params: dict = None) -> str:
+    """
+    :return: a cache key identifying a GET request
+    """
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+
+class Transport:
+    def __init__(
+        self,
+        name: str,
+        cache: Cache = None,
+        stats: RunStats = None,
+        ttl: float = config.RESPONSE_CACHE_TTL,
+        max_bytes: int = config.RESPONSE_MAX_BYTES,
+        client: str = config.HTTP_CLIENT,
+    ):
+        """
+        :param name: name used to prefix statistics (usually the API name)
+        :param cache: cache holding responses (responses aren't cached if None)
+        :param stats: run statistics to record fetches, revalidations and hits
+        :param ttl: number of seconds a cached response is served without
+        revalidation (0 disables response caching)
+        :param max_bytes: largest response body downloaded (None is unlimited)
+        :param client: HTTP client requests are sent with (one of CLIENTS)
+        """
+        self.name = name
+        self.cache = cache
+        self.stats = stats if stats is not None else RunStats()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.session = make_session(client)
+
+    def _store(self, key: str, response):
+        self.cache.set(
+            RESPONSE,
+            key,
+            {
+                "url": response.url,
+                "status_code": response.status_code,
+                "headers": {
+                    name: response.headers[name]
+                    for name in ("Content-Type", "ETag", "Last-Modified")
+                    if name in response.headers
+                },
+                "text": response.text,
+            },
+            ttl=self.ttl,
+        )
+
+    def _read_body(self, response):
+        """
+        Download a streamed response body in chunks, stopping as soon as it
+        goes over max_bytes
+        :raises ResponseTooLarge: if the body is larger than max_bytes
+        """
+        def too_large():
+            self.stats.incr(f"{self.name}.http.oversized")
+            return ResponseTooLarge(
+                f"Response over the limit of {self.max_bytes} bytes for url: {response.url}",
+                response=response,
+            )
+
+        try:
+            length = response.headers.get("Content-Length", "")
+            if self.max_bytes is not None and length.isdigit() and int(length) > self.max_bytes:
+                raise too_large()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=config.DOWNLOAD_CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if self.max_bytes is not None and size > self.max_bytes:
+                    raise too_large()
+        finally:
+            response.close()
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+
+    def get(
+        self,
+        url: str,
+        params: dict = None,
+        timeout: float = 10,
+        throttle=None,
+        use_cache: bool = True,
+    ):
+        """
+        Send a GET request, going through the response cache
+        :param throttle: optional callable invoked before any request that
+        actually goes over the network (e.g. a rate limiter)
+        :param use_cache: False to always ask the API, e.g. to check whether
+        a cached answer is still right, without storing the response
+        :return: a requests.Response, or a CachedResponse
+        :raises budget.BudgetExceeded: if the active budget has run out
+        :raises ResponseTooLarge: if the response body is larger than max_bytes
+        """
+        use_cache = use_cache and self.cache is not None and self.ttl > 0
+        key = request_key(url, params)
+        entry = self.cache.get_entry(RESPONSE, key) if use_cache else None
+
+        if entry is not None and entry[1]:
+            self.stats.incr(f"{self.name}.http.hits")
+            return CachedResponse(**entry[0])
+
+        headers = {}
+        if entry is not None:
+            cached_headers = entry[0]["headers"]
+            if "ETag" in cached_headers:
+                headers["If-None-Match"] = cached_headers["ETag"]
+            if "Last-Modified" in cached_headers:
+                headers["If-Modified-Since"] = cached_headers["Last-Modified"]
+
+        active = budget.current()
+        if active is not None:
+            active.charge()
+        if throttle is not None:
+            throttle()
+        if active is not None:
+            remaining = active.remaining_time()
+            if remaining is not None:
+                if remaining <= 0:
+                    active.exhausted = True
+                    raise budget.BudgetExceeded("time budget used up waiting for the rate limit")
+                timeout = min(timeout, remaining)
+        response = self.session.get(
+            url, params=params, headers=headers, timeout=timeout, stream=True
+        )
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            logger.debug(f"{url} has not changed, renewing cached response")
+            self.stats.incr(f"{self.name}.http.revalidations")
+            self.cache.touch(RESPONSE, key, ttl=self.ttl)
+            return CachedResponse(**entry[0])
+
+        self.stats.incr(f"{self.name}.http.fetches")
+        if response.status_code >= 400:
+            # e.g. PubMed.http.status_429 when the API is rate limiting us
+            self.stats.incr(f"{self.name}.http.status_{response.status_code}")
+        self._read_body(response)
+        if getattr(response, "http_version", None) == "HTTP/2":
+            self.stats.incr(f"{self.name}.http.http2")
+        self.stats.incr(f"{self.name}.bytes_received", len(response.content))
+        if use_cache and response.status_code == 200:
+            self._store(key, response)
+        return response
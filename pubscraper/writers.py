@@ -0,0 +1,228 @@
+import csv
+import logging
+import textwrap
+
+import tablib
+
+from pubscraper import serializers
+from pubscraper.compression import open_file, split_compression
+
+logger = logging.getLogger(__name__)
+
+"""
+Streaming writers for the scraper output. Each writer receives one author
+and their publications at a time, so results are written out as soon as
+they are ready instead of being held until the end of the run. Text
+formats are compressed on the fly when the path ends in .gz or .zst.
+"""
+
+HEADERS = [
+    "From",
+    "Author",
+    "DOI",
+    "Journal",
+    "Content Type",
+    "Publication Date",
+    "Title",
+    "Authors",
+    "Truncated",
+]
+
+
+def publication_row(author: str, pub: dict, truncated: bool = False) -> list:
+    # Safely fetch values using .get to avoid KeyError, defaulting to 'N/A' if the key is missing
+    return [
+        pub.get("from", "N/A"),
+        author,
+        pub.get("doi", "N/A"),
+        pub.get("journal", "N/A"),
+        pub.get("content_type", "N/A"),
+        pub.get("publication_date", "N/A"),
+        pub.get("title", "N/A"),
+        pub.get("authors", "N/A"),
+        "yes" if truncated else "",
+    ]
+
+
+def author_entry(author: str, publications: list) -> dict:
+    return {author: publications}
+
+
+class JSONWriter:
+    """
+    Writes a JSON list of {author: [publications]} objects. With indent=None
+    each author is written compactly on its own line. Which authors' results
+    were cut short isn't part of the objects; the run statistics list them.
+    """
+
+    def __init__(self, path: str, indent: int = 4):
+        self.indent = indent
+        self._file = open_file(path, "wt", encoding="utf-8")
+        self._count = 0
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        entry = serializers.dumps(author_entry(author, publications), indent=self.indent)
+        self._file.write("[\n" if self._count == 0 else ",\n")
+        self._file.write(textwrap.indent(entry, " " * (self.indent or 0)))
+        self._count += 1
+
+    def close(self):
+        self._file.write("\n]" if self._count else "[]")
+        self._file.close()
+
+
+class JSONLWriter:
+    """
+    Writes one compact {author: [publications]} object per line (see JSONWriter)
+    """
+
+    def __init__(self, path: str):
+        self._file = open_file(path, "wt", encoding="utf-8")
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        self._file.write(serializers.dumps(author_entry(author, publications)))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class CSVWriter:
+    def __init__(self, path: str):
+        self._file = open_file(path, "wt", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HEADERS)
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        for pub in publications:
+            if isinstance(pub, dict):  # Only process dictionary entries
+                self._writer.writerow(publication_row(author, pub, truncated))
+
+    def close(self):
+        self._file.close()
+
+
+class XLSXWriter:
+    """
+    xlsx files can't be appended to, so rows are collected and the workbook
+    is written when the writer is closed
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._dataset = tablib.Dataset()
+        self._dataset.headers = HEADERS
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        for pub in publications:
+            if isinstance(pub, dict):  # Only process dictionary entries
+                self._dataset.append(publication_row(author, pub, truncated))
+
+    def close(self):
+        with open(self.path, "wb") as f:
+            f.write(self._dataset.export("xlsx"))
+
+
+class FanoutWriter:
+    """
+    Writes each author to the writer of every roster they are on (see
+    roster.merge_rosters), under the name used on that roster. Namesakes
+    (authors with different ORCID iDs) are written in roster order, which
+    is the order the pipeline writes them in.
+    """
+
+    def __init__(self, writers: list, members: dict):
+        """
+        :param writers: one writer per roster
+        :param members: dict of {author_name: [[(roster_index, author_name_on_that_roster)]]}
+        """
+        self.writers = writers
+        self.members = members
+        self._written = {}
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        namesakes = self.members.get(author)
+        if not namesakes:
+            return
+        turn = self._written.get(author, 0)
+        self._written[author] = turn + 1
+        for roster_index, name in namesakes[turn % len(namesakes)]:
+            self.writers[roster_index].write(name, publications, truncated=truncated)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+class TeeWriter:
+    """
+    Writes every author to several writers, e.g. the output file and the
+    publication store
+    """
+
+    def __init__(self, *writers):
+        self.writers = writers
+
+    def write(self, author: str, publications: list, truncated: bool = False):
+        for writer in self.writers:
+            writer.write(author, publications, truncated=truncated)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+WRITERS = {
+    "json": JSONWriter,
+    "jsonl": JSONLWriter,
+    "csv": CSVWriter,
+    "xlsx": XLSXWriter,
+}
+
+
+def resolve_output(output_file: str, format: str) -> tuple[str, str]:
+    """
+    Work out the output path and format. If output_file already ends in a
+    known format (optionally followed by .gz or .zst), it is used as is and
+    its extension decides the format; otherwise ".<format>" is appended.
+    :return: an (output_path, format) tuple
+    """
+    base, codec = split_compression(output_file)
+    extension = base.rsplit(".", 1)[-1].lower() if "." in base else None
+    if extension in WRITERS:
+        if extension != format:
+            logger.debug(f"Using {extension} format from output file {output_file}")
+        format = extension
+        path = str(output_file)
+    else:
+        path = f"{base}.{format}"
+        if codec is not None:
+            path += str(output_file)[len(base) :]
+
+    if codec is not None and format == "xlsx":
+        raise ValueError("xlsx output is already compressed and can't be gzip/zstd compressed")
+    return path, format
+
+
+def labelled_path(path: str, format: str, label: str) -> str:
+    """
+    :param path: an output path as returned by resolve_output
+    :return: the path with "_<label>" inserted before its extension, e.g.
+    "output_physics.json.gz" for ("output.json.gz", "json", "physics")
+    """
+    base, codec = split_compression(path)
+    labelled = f"{base.removesuffix(f'.{format}')}_{label}.{format}"
+    return labelled + str(path)[len(base) :] if codec is not None else labelled
+
+
+def open_writer(path: str, format: str, compact: bool = False):
+    """
+    :param path: file to write to (overwritten if it exists)
+    :param format: one of the keys of WRITERS
+    :param compact: write JSON without indentation
+    :return: a writer with write(author, publications) and close() methods
+    """
+    logger.debug(f"Opening {format} writer for {path}")
+    if format == "json" and compact:
+        return JSONWriter(path, indent=None)
+    return WRITERS[format](path)
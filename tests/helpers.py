@@ -0,0 +1,48 @@
+"""
+Stand-ins for the APIs and writers, shared by the pipeline, scheduler,
+server, budget, seen-set and performance tests
+"""
+
+import time
+
+from pubscraper.APIClasses.Base import Base
+
+
+class FakeAPI(Base):
+    def __init__(self, publications=None, delay=0, requests_per_author=0):
+        """
+        :param publications: dict of {author_name: [publications]} to return
+        :param delay: number of seconds each author takes
+        :param requests_per_author: number of PubMed.esearch requests each
+        author is counted as costing (see pubscraper.scheduler)
+        """
+        super().__init__()
+        self.publications = publications or {}
+        self.delay = delay
+        self.requests_per_author = requests_per_author
+        self.calls = []
+
+    def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+        self.calls.append(author_name)
+        time.sleep(self.delay)
+        if self.requests_per_author:
+            self.stats.incr("PubMed.esearch", self.requests_per_author, author=author_name)
+        return self.publications.get(author_name)
+
+
+class ListWriter:
+    def __init__(self):
+        self.written = []
+        self.truncated = []
+
+    def write(self, author, publications, truncated=False):
+        self.written.append((author, publications))
+        if truncated:
+            self.truncated.append(author)
+
+    def close(self):
+        pass
+
+
+def pub(doi, date="2024-01-01", source="PubMed", title=None):
+    return {"from": source, "doi": doi, "publication_date": date, "title": title or doi}
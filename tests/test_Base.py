@@ -0,0 +1,45 @@
+import asyncio
+
+from pubscraper import budget
+from pubscraper.budget import Budget
+from pubscraper.APIClasses.Base import Base
+
+
+class FakeAPI(Base):
+    def __init__(self, publications):
+        super().__init__()
+        self.publications = publications
+        self.calls = []
+
+    def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+        self.calls.append((author_name, rows, since, budget.current()))
+        return self.publications.get(author_name)
+
+
+def test_bulk_lookup_falls_back_to_single_authors():
+    api = FakeAPI({"joe allen": [{"doi": "10.1/a"}]})
+    results = list(api.get_publications_by_authors(["joe allen", "jane doe"], 5, since="2024"))
+    assert results == [("joe allen", [{"doi": "10.1/a"}]), ("jane doe", None)]
+    assert [call[:3] for call in api.calls] == [
+        ("joe allen", 5, "2024"),
+        ("jane doe", 5, "2024"),
+    ]
+
+
+def test_bulk_lookup_uses_each_authors_budget():
+    api = FakeAPI({})
+    budgets = {"joe allen": Budget(), "jane doe": Budget()}
+    list(api.get_publications_by_authors(["joe allen", "jane doe"], budgets=budgets))
+    assert [call[3] for call in api.calls] == [budgets["joe allen"], budgets["jane doe"]]
+
+
+def test_async_bulk_lookup():
+    api = FakeAPI({"joe allen": [{"doi": "10.1/a"}]})
+
+    async def collect():
+        return [
+            result
+            async for result in api.aget_publications_by_authors(["joe allen", "jane doe"])
+        ]
+
+    assert asyncio.run(collect()) == [("joe allen", [{"doi": "10.1/a"}]), ("jane doe", None)]
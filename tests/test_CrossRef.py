@@ -2,7 +2,9 @@ import json
 import pytest
 import responses
 
+from pubscraper import budget
 from pubscraper.APIClasses import CrossRef
+from pubscraper.budget import Budget
 import pubscraper.config as config
 
 BASE_URL = config.CROSSREF_URL
@@ -171,7 +173,7 @@ def test_search_all_names(mock_api):
 
 
 def test_no_results(mock_api):
-    """Test that an author with no results returns None."""
+    """Test that works missing fields other than the title are kept for enrichment."""
     mock_api.add(
         responses.GET,
         BASE_URL,
@@ -203,7 +205,9 @@ def test_no_results(mock_api):
         status=200,
     ) 
     results = CrossRef.search_multiple_authors(["Magert O. Adekunle"])
-    assert results.get("Magert O. Adekunle") == []
+    publications = results.get("Magert O. Adekunle")
+    assert [pub["doi"] for pub in publications] == ["10.1234/sample.doi"]
+    assert publications[0]["journal"] is None
 
 
 def test_limit_results(mock_api):
@@ -242,6 +246,174 @@ def test_limit_results(mock_api):
     assert len(results["Allen"]) < 10
 
 
+def test_known_short_author_uses_count_request(mock_api):
+    """Test that an author with too few results is rechecked with rows=0."""
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "query.author": "Allen",
+                    "rows": "10",
+                    "offset": 0,
+                    "mailto": "jlh7459@my.utexas.edu",
+                }
+            )
+        ],
+        body=mock_CrossRef_response(
+            {
+                "message": {
+                    "items": [
+                        {
+                            "title": ["Sample Paper"],
+                            "container-title": ["Sample Journal"],
+                            "author": [{"given": "Joe", "family": "Allen"}],
+                            "created": {"date-time": "2024-01-01T00:00:00Z"},
+                            "DOI": "10.1234/sample.doi"
+                        }
+                    ],
+                    "total-results": 1
+                }
+            }
+        ),
+        status=200,
+    )
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "query.author": "Allen",
+                    "rows": "0",
+                    "mailto": "jlh7459@my.utexas.edu",
+                }
+            )
+        ],
+        body=mock_CrossRef_response({"message": {"items": [], "total-results": 1}}),
+        status=200,
+    )
+    cr = CrossRef.CrossRef()
+    first = cr.get_publications_by_author("Allen")
+    second = cr.get_publications_by_author("Allen")
+    assert first == second
+    assert len(second) == 1
+    assert cr.stats.get("CrossRef.requests") == 1
+    assert cr.stats.get("CrossRef.count_requests") == 1
+    # every recheck asks CrossRef, rather than the response cache
+    cr.get_publications_by_author("Allen")
+    assert cr.stats.get("CrossRef.http.hits") == 0
+    assert len(mock_api.calls) == 3
+
+
+def invalid_items(count):
+    # items without a title are skipped, so they never fill up the results
+    return [{"DOI": f"10.1/{i}", "author": [{"family": "Allen"}]} for i in range(count)]
+
+
+def test_refill_stops_when_results_run_out(mock_api):
+    """Test that pages of invalid items don't make the refill loop run forever."""
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        body=mock_CrossRef_response(
+            {"message": {"items": invalid_items(10), "total-results": 25}}
+        ),
+        status=200,
+    )
+    cr = CrossRef.CrossRef()
+    assert cr.get_publications_by_author("Allen") == []
+    assert cr.stats.get("CrossRef.requests") == 3
+
+
+def test_budget_returns_partial_results(mock_api):
+    """Test that running out of budget returns the publications found so far."""
+    valid = {
+        "title": ["Sample Paper"],
+        "container-title": ["Sample Journal"],
+        "author": [{"given": "Joe", "family": "Allen"}],
+        "created": {"date-time": "2024-01-01T00:00:00Z"},
+        "DOI": "10.1234/sample.doi",
+    }
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        body=mock_CrossRef_response(
+            {"message": {"items": [valid] + invalid_items(9), "total-results": 1000}}
+        ),
+        status=200,
+    )
+    cr = CrossRef.CrossRef()
+    author_budget = Budget(requests=2)
+    with budget.activate(author_budget):
+        publications = cr.get_publications_by_author("Allen")
+    assert [pub["doi"] for pub in publications] == ["10.1234/sample.doi"] * 2
+    assert author_budget.exhausted
+    assert len(mock_api.calls) == 2
+
+
+
+def test_orcid_replaces_author_query(mock_api):
+    """Test that authors with an ORCID iD are searched by it rather than by name."""
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "filter": "orcid:0000-0002-1825-0097,from-pub-date:2024-05",
+                    "rows": "10",
+                    "offset": "0",
+                    "mailto": "jlh7459@my.utexas.edu",
+                }
+            )
+        ],
+        body=mock_CrossRef_response({"message": {"items": [], "total-results": 0}}),
+        status=200,
+    )
+    cr = CrossRef.CrossRef()
+    assert (
+        cr.get_publications_by_author("Allen", since="2024-05", orcid="0000-0002-1825-0097")
+        == []
+    )
+    assert len(mock_api.calls) == 1
+
+
+def test_works_are_looked_up_by_doi(mock_api):
+    mock_api.add(
+        responses.GET,
+        BASE_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"filter": "doi:10.1/a,doi:10.1/b", "rows": "2"}, strict_match=False
+            )
+        ],
+        body=mock_CrossRef_response(
+            {
+                "message": {
+                    "items": [
+                        {
+                            "title": ["Paper A"],
+                            "container-title": ["Sample Journal"],
+                            "author": [{"given": "Joe", "family": "Allen"}],
+                            "created": {"date-time": "2024-01-01T00:00:00Z"},
+                            "DOI": "10.1/A",
+                        }
+                    ],
+                    "total-results": 1,
+                }
+            }
+        ),
+        status=200,
+    )
+    cr = CrossRef.CrossRef()
+    publications = cr.get_publications_by_dois(["10.1/a", "10.1/b", "10.1/c,d"])
+    assert list(publications) == ["10.1/a"]
+    assert publications["10.1/a"]["journal"] == "Sample Journal"
+    assert cr.stats.get("CrossRef.doi_requests") == 1
+
+
 # def test_author_retry(mock_api):
 #     results = CrossRef.search_multiple_authors(["j l hendrix"])
 #     # requesting 10 valid results for "j l hendrix" will provoke a KeyError
@@ -260,3 +432,27 @@ def test_limit_results(mock_api):
 #     cr.base_url = "https://httpstat.us/500"
 #     result = cr.get_publications_by_author("j l hendrix")
 #     assert result is None
+
+
+def test_works_without_authors_are_kept():
+    body = mock_CrossRef_response(
+        {
+            "message": {
+                "items": [
+                    {"title": ["Editorial"], "DOI": "10.1/editorial"},
+                    {
+                        "title": ["Paper A"],
+                        "author": [{"given": "Joe", "family": "Allen"}],
+                        "DOI": "10.1/a",
+                    },
+                ],
+                "total-results": 2,
+            }
+        }
+    )
+    total, publications = CrossRef.parse_works_page(body)
+    assert total == 2
+    assert [(pub["doi"], pub["authors"]) for pub in publications] == [
+        ("10.1/editorial", None),
+        ("10.1/a", "Joe Allen"),
+    ]
@@ -0,0 +1,190 @@
+import pytest
+import responses
+
+from pubscraper import budget
+from pubscraper.APIClasses import OpenAlex
+from pubscraper.budget import Budget
+from pubscraper.cache import STATE
+import pubscraper.config as config
+
+AUTHORS_URL = config.OPENALEX_AUTHORS_URL
+WORKS_URL = config.OPENALEX_WORKS_URL
+
+
+@pytest.fixture
+def mock_api():
+    with responses.RequestsMock() as rsps:
+        yield rsps
+
+
+def mock_author(mock_api, name, author_id):
+    mock_api.add(
+        responses.GET,
+        AUTHORS_URL,
+        match=[responses.matchers.query_param_matcher({"search": name}, strict_match=False)],
+        json={"results": [{"id": f"https://openalex.org/{author_id}"}] if author_id else []},
+    )
+
+
+def work(doi, *author_ids, date="2024-01-01"):
+    return {
+        "id": f"https://openalex.org/W{doi}",
+        "doi": f"https://doi.org/10.1/{doi}",
+        "title": f"Paper {doi}",
+        "publication_date": date,
+        "type": "article",
+        "primary_location": {"source": {"display_name": "Sample Journal"}},
+        "authorships": [
+            {"author": {"id": f"https://openalex.org/{a}", "display_name": a}}
+            for a in author_ids
+        ],
+    }
+
+
+def test_skip_empty_name(mock_api):
+    results = OpenAlex.search_multiple_authors([""])
+    assert results == {}
+    assert len(mock_api.calls) == 0
+
+
+def test_batch_of_authors_uses_one_works_filter(mock_api):
+    mock_author(mock_api, "joe allen", "A1")
+    mock_author(mock_api, "jane doe", "A2")
+    mock_author(mock_api, "nobody here", None)
+    mock_api.add(
+        responses.GET,
+        WORKS_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"filter": "author.id:A1|A2,from_publication_date:2024-05-01", "cursor": "*"},
+                strict_match=False,
+            )
+        ],
+        json={
+            "meta": {"next_cursor": None},
+            "results": [work("a", "A1"), work("b", "A1", "A2"), work("c", "A3")],
+        },
+    )
+    oa = OpenAlex.OpenAlex()
+    results = dict(
+        oa.get_publications_by_authors(["joe allen", "jane doe", "nobody here"], since="2024-05")
+    )
+    assert [pub["doi"] for pub in results["joe allen"]] == ["10.1/a", "10.1/b"]
+    assert results["jane doe"][0] == {
+        "from": "OpenAlex",
+        "journal": "Sample Journal",
+        "content_type": "article",
+        "publication_date": "2024-01-01",
+        "title": "Paper b",
+        "authors": "A1,A2",
+        "doi": "10.1/b",
+    }
+    assert results["nobody here"] is None
+    assert oa.stats.get("OpenAlex.works_requests") == 1
+
+
+def test_author_ids_are_remembered(mock_api):
+    mock_author(mock_api, "joe allen", "A1")
+    mock_api.add(
+        responses.GET, WORKS_URL, json={"meta": {"next_cursor": None}, "results": []}
+    )
+    oa = OpenAlex.OpenAlex()
+    oa.get_publications_by_author("joe allen")
+    oa.get_publications_by_author("joe allen", rows=5)
+    assert oa.stats.get("OpenAlex.author_lookups") == 1
+
+
+def test_orcid_resolves_author_by_filter(mock_api):
+    mock_api.add(
+        responses.GET,
+        AUTHORS_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"filter": "orcid:0000-0002-1825-0097"}, strict_match=False
+            )
+        ],
+        json={"results": [{"id": "https://openalex.org/A1"}]},
+    )
+    mock_api.add(
+        responses.GET,
+        WORKS_URL,
+        json={"meta": {"next_cursor": None}, "results": [work("a", "A1")]},
+    )
+    oa = OpenAlex.OpenAlex()
+    publications = oa.get_publications_by_author("joe allen", orcid="0000-0002-1825-0097")
+    assert [pub["doi"] for pub in publications] == ["10.1/a"]
+
+
+def test_name_search_prefers_affiliated_namesake(mock_api, monkeypatch):
+    mock_api.add(
+        responses.GET,
+        AUTHORS_URL,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"search": "joe allen", "per-page": str(config.OPENALEX_AUTHOR_CANDIDATES)},
+                strict_match=False,
+            )
+        ],
+        json={
+            "results": [
+                {"id": "https://openalex.org/A1", "last_known_institutions": []},
+                {
+                    "id": "https://openalex.org/A2",
+                    "affiliations": [
+                        {"institution": {"display_name": "The University of Texas at Austin"}}
+                    ],
+                },
+            ]
+        },
+    )
+    # resolved IDs expire, so authors that move are looked up again
+    monkeypatch.setattr(config, "OPENALEX_AUTHOR_TTL", -1)
+    oa = OpenAlex.OpenAlex()
+    assert oa._resolve_author("joe allen") == "A2"
+    assert oa.cache.get_entry(STATE, "OpenAlex.author:joe allen") == ("A2", False)
+
+
+def test_pick_author():
+    candidates = [
+        {"id": "A1"},
+        {"id": "A2", "last_known_institutions": [{"display_name": "University of Texas"}]},
+        {"id": "A3", "orcid": "https://orcid.org/0000-0002-1825-0097"},
+    ]
+    assert OpenAlex.pick_author(candidates, "0000-0002-1825-0097", "texas")["id"] == "A3"
+    assert OpenAlex.pick_author(candidates, None, "texas")["id"] == "A2"
+    assert OpenAlex.pick_author(candidates, None, "oxford")["id"] == "A1"
+    assert OpenAlex.pick_author([], None, "texas") is None
+
+
+def test_cursor_paging_stops_when_rows_are_filled(mock_api):
+    mock_author(mock_api, "joe allen", "A1")
+    mock_api.add(
+        responses.GET,
+        WORKS_URL,
+        match=[responses.matchers.query_param_matcher({"cursor": "*"}, strict_match=False)],
+        json={"meta": {"next_cursor": "page2"}, "results": [work("a", "A1")]},
+    )
+    mock_api.add(
+        responses.GET,
+        WORKS_URL,
+        match=[responses.matchers.query_param_matcher({"cursor": "page2"}, strict_match=False)],
+        json={"meta": {"next_cursor": "page3"}, "results": [work("b", "A1"), work("c", "A1")]},
+    )
+    oa = OpenAlex.OpenAlex()
+    publications = oa.get_publications_by_author("joe allen", rows=2)
+    assert [pub["doi"] for pub in publications] == ["10.1/a", "10.1/b"]
+    assert oa.stats.get("OpenAlex.works_requests") == 2
+
+
+def test_budget_marks_batch_truncated(mock_api):
+    mock_author(mock_api, "joe allen", "A1")
+    oa = OpenAlex.OpenAlex()
+    run_budget = Budget(requests=1)
+    author_budget = Budget(parent=run_budget)
+    # the author lookup uses up the run's budget, leaving none for the works
+    with budget.activate(run_budget):
+        results = dict(
+            oa.get_publications_by_authors(["joe allen"], budgets={"joe allen": author_budget})
+        )
+    assert results == {"joe allen": None}
+    assert author_budget.exhausted
@@ -1,8 +1,14 @@
+import json
+import os
+
 import pytest
 import responses
 from responses import _recorder
 
+from pubscraper import budget, roster
 from pubscraper.APIClasses import PubMed
+from pubscraper.budget import Budget
+import pubscraper.config as config
 
 
 def test_skip_empty_name():
@@ -301,3 +307,372 @@ def test_HTTP_failure_summaries():
 def test_failure_multiple_authors():
     empty_results = PubMed.search_multiple_authors(["kelsey", "erik"], -1)
     assert empty_results == {}
+
+
+@responses.activate
+def test_search_strategy_is_remembered():
+    search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+    responses.add(
+        responses.GET,
+        search_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"term": "allen+w+j[Full Author Name]"}, strict_match=False
+            )
+        ],
+        json={"esearchresult": {"idlist": []}},
+    )
+    responses.add(
+        responses.GET,
+        search_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"term": "allen+w[Author]"}, strict_match=False
+            )
+        ],
+        json={"esearchresult": {"idlist": ["12345678"]}},
+    )
+    pb = PubMed.PubMed()
+    assert pb._get_UIDs_by_author("w j allen", 1) == ["12345678"]
+    assert pb.stats.get("PubMed.esearch", author="w j allen") == 2
+
+    # the [Author] format worked, so it should be the only one tried next time
+    assert pb._get_UIDs_by_author("w j allen", 1) == ["12345678"]
+    assert pb.stats.get("PubMed.esearch", author="w j allen") == 3
+
+
+@responses.activate
+def test_concurrent_search_formats():
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        json={"esearchresult": {"idlist": ["12345678"]}},
+    )
+    pb = PubMed.PubMed(concurrent_formats=True)
+    assert pb._get_UIDs_by_author("w j allen", 1) == ["12345678"]
+    assert pb.stats.get("PubMed.esearch", author="w j allen") == 2
+
+
+@responses.activate
+def test_known_empty_author_uses_count_request():
+    search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+    responses.add(
+        responses.GET,
+        search_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"rettype": "count"}, strict_match=False
+            )
+        ],
+        json={"esearchresult": {"count": "0"}},
+    )
+    responses.add(
+        responses.GET,
+        search_url,
+        json={"esearchresult": {"idlist": []}},
+    )
+    pb = PubMed.PubMed()
+    assert pb._get_UIDs_by_author("joseph hendrix", 1) is None
+    assert pb.stats.get("PubMed.esearch", author="joseph hendrix") == 2
+
+    # both formats came back empty, so a single count-only request is made
+    assert pb._get_UIDs_by_author("joseph hendrix", 1) is None
+    assert pb.stats.get("PubMed.esearch", author="joseph hendrix") == 2
+    assert pb.stats.get("PubMed.esearch_count", author="joseph hendrix") == 1
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_summary_path_without_affiliation_check():
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        json={"esearchresult": {"idlist": ["12345678"]}},
+    )
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi",
+        json={
+            "result": {
+                "uids": ["12345678"],
+                "12345678": {
+                    "authors": [{"name": "Allen WJ"}, {"name": "Hendrix J"}],
+                    "title": "BiasNet",
+                    "fulljournalname": "some journal",
+                    "sortdate": "2000/09/06 00:00",
+                    "articleids": [
+                        {"idtype": "pubmed", "value": "12345678"},
+                        {"idtype": "doi", "value": "10.1234/biasnet"},
+                    ],
+                },
+            }
+        },
+    )
+    pb = PubMed.PubMed(affiliation="")
+    publications = pb.get_publications_by_author("w j allen", 1)
+    assert publications == [
+        {
+            "from": "PubMed",
+            "journal": "some journal",
+            "publication_date": "2000-09-06",
+            "title": "BiasNet",
+            "authors": "Allen WJ,Hendrix J",
+            "doi": "10.1234/biasnet",
+        }
+    ]
+    assert pb.stats.get("PubMed.efetch") == 0
+
+
+EFETCH_XML = """<?xml version="1.0" ?>
+<PubmedArticleSet>
+  <PubmedArticle>
+    <MedlineCitation>
+      <Article>
+        <Journal><Title>Some Journal</Title></Journal>
+        <ArticleTitle>BiasNet</ArticleTitle>
+        <AuthorList>
+          <Author>
+            <LastName>Allen</LastName>
+            <ForeName>William</ForeName>
+            <AffiliationInfo>
+              <Affiliation>The University of Texas at Austin</Affiliation>
+            </AffiliationInfo>
+          </Author>
+        </AuthorList>
+      </Article>
+      <DateCompleted></DateCompleted>
+    </MedlineCitation>
+    <PubmedData>
+      <ArticleIdList>
+        <ArticleId IdType="doi">10.1234/biasnet</ArticleId>
+      </ArticleIdList>
+    </PubmedData>
+    <PubDate><Year>2024</Year><Month>Oct</Month><Day>22</Day></PubDate>
+  </PubmedArticle>
+</PubmedArticleSet>
+"""
+
+
+@responses.activate
+def test_oversized_efetch_batches_are_split():
+    def efetch(request):
+        ids = request.params["id"].split(",")
+        # a response per article fits in the limit, two articles don't
+        return 200, {}, EFETCH_XML + " " * 100 * (len(ids) - 1)
+
+    responses.add_callback(
+        responses.GET, "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi", efetch
+    )
+    pb = PubMed.PubMed()
+    pb.transport.max_bytes = len(EFETCH_XML) + 50
+    publications = pb._get_publication_details(["1", "2", "3"], "w j allen")
+    assert [pub["title"] for pub in publications] == ["BiasNet"] * 3
+    requested = [call.request.params["id"] for call in responses.calls]
+    assert requested == ["1,2,3", "1", "2,3", "2", "3"]
+    assert pb.stats.get("PubMed.batches_split") == 2
+    assert pb.stats.get("PubMed.efetch") == 5
+
+
+@responses.activate
+def test_budget_keeps_articles_fetched_so_far(monkeypatch):
+    monkeypatch.setattr(config, "PUBMED_BATCH_SIZE", 1)
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        json={"esearchresult": {"count": "2", "idlist": ["1", "2"]}},
+    )
+    responses.add(
+        responses.GET, "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi", body=EFETCH_XML
+    )
+    pb = PubMed.PubMed()
+    author_budget = Budget(requests=2)
+    # the esearch and the first efetch batch fit in the budget, the second batch doesn't
+    with budget.activate(author_budget):
+        publications = pb.get_publications_by_author("w j allen", 2)
+    assert [pub["title"] for pub in publications] == ["BiasNet"]
+    assert author_budget.exhausted
+    assert pb.stats.get("PubMed.efetch") == 2
+
+
+def test_parse_efetch_xml():
+    publications = PubMed.parse_efetch_xml(EFETCH_XML.encode(), "university of texas")
+    assert len(publications) == 1
+    assert publications[0]["title"] == "BiasNet"
+    assert publications[0]["doi"] == "10.1234/biasnet"
+    assert publications[0]["publication_date"] == "2024-10-22"
+    assert PubMed.parse_efetch_xml(EFETCH_XML.encode(), "rice university") == []
+
+
+def test_parse_in_process_pool():
+    from concurrent.futures import ProcessPoolExecutor
+
+    pb = PubMed.PubMed()
+    with ProcessPoolExecutor(1) as pool:
+        pb.parse_pool = pool
+        publications = pb._parse(
+            PubMed.parse_efetch_xml, EFETCH_XML.encode(), "university of texas"
+        )
+    assert publications == PubMed.parse_efetch_xml(
+        EFETCH_XML.encode(), "university of texas"
+    )
+    assert pb.stats.get("PubMed.parses_offloaded") == 1
+
+
+@responses.activate
+def test_since_is_sent_as_date_range():
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        match=[
+            responses.matchers.query_param_matcher(
+                {"datetype": "pdat", "mindate": "2024/05/01", "maxdate": "3000"},
+                strict_match=False,
+            )
+        ],
+        json={"esearchresult": {"idlist": []}},
+    )
+    pb = PubMed.PubMed()
+    assert pb._get_UIDs_by_author("w j allen", 1, since="2024-05") is None
+    # empty results are only remembered for the same date range
+    assert pb.cache.get(PubMed.NEGATIVE, pb._negative_key("w j allen", "author")) is None
+    assert pb.cache.get(
+        PubMed.NEGATIVE, pb._negative_key("w j allen", "author", "2024-05")
+    ) == {"count": 0}
+
+
+def test_orcid_is_searched_first():
+    pb = PubMed.PubMed()
+    terms = pb._get_search_terms("w j allen", "0000-0002-1825-0097")
+    assert terms[0] == ("orcid", "0000-0002-1825-0097[auid]")
+    assert [strategy for strategy, _ in terms[1:]] == ["full_author_name", "author"]
+
+
+def test_example_roster_terms_put_the_last_name_first():
+    example = os.path.join(os.path.dirname(os.path.dirname(__file__)), "example_input.xlsx")
+    names = [name for name, _, _ in roster.read_roster(example)]
+    assert names[:2] == ["Kelsey m Beavers", "James Carson"]
+    pb = PubMed.PubMed()
+    assert pb._get_search_terms(names[0]) == [
+        ("full_author_name", "Beavers+Kelsey+m[Full Author Name]"),
+        ("author", "Beavers+Kelsey[Author]"),
+    ]
+    assert pb._batch_search_term(names[1]) == "Carson+James[Full Author Name]"
+
+
+def test_author_matches():
+    assert PubMed.author_matches("w j allen", "Allen WJ")
+    assert PubMed.author_matches("w j allen", "William Joseph Allen")
+    assert PubMed.author_matches("allen william", "W Allen")
+    assert not PubMed.author_matches("w j allen", "Allen K")
+    assert not PubMed.author_matches("w j allen", "William Allenby")
+
+
+@responses.activate
+def test_authors_are_batched_into_one_search():
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "term": "(allen+w+j[Full Author Name]) OR (doe+jane[Full Author Name])",
+                    "retmax": "20",
+                },
+                strict_match=False,
+            )
+        ],
+        json={"esearchresult": {"idlist": ["1", "2", "3"]}},
+    )
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi",
+        json={
+            "result": {
+                "uids": ["1", "2", "3"],
+                "1": {"title": "one", "authors": [{"name": "Allen WJ"}]},
+                "2": {"title": "two", "authors": [{"name": "Doe J"}, {"name": "Allen W"}]},
+                "3": {"title": "three", "authors": [{"name": "Smith K"}]},
+            }
+        },
+    )
+    pb = PubMed.PubMed(affiliation="", author_batch_size=10)
+    results = dict(pb.get_publications_by_authors(["w j allen", "jane doe", "x"], 10))
+    assert [pub["title"] for pub in results["w j allen"]] == ["one", "two"]
+    assert [pub["title"] for pub in results["jane doe"]] == ["two"]
+    assert results["x"] is None
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_authors_crowded_out_of_a_batch_are_searched_again():
+    search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+    # the OR query matches 9 articles, but only the first 4 (all by Allen) are fetched
+    responses.add(
+        responses.GET,
+        search_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "term": "(allen+w+j[Full Author Name]) OR (doe+jane[Full Author Name])",
+                    "retmax": "4",
+                },
+                strict_match=False,
+            )
+        ],
+        json={"esearchresult": {"count": "9", "idlist": ["1", "2", "3", "4"]}},
+    )
+    responses.add(
+        responses.GET,
+        search_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"term": "doe+jane[Full Author Name]", "retmax": "2"}, strict_match=False
+            )
+        ],
+        json={"esearchresult": {"count": "1", "idlist": ["5"]}},
+    )
+
+    def summaries(request):
+        uids = request.params["id"].split(",")
+        result = {"uids": uids}
+        for uid in uids:
+            name = "Doe J" if uid == "5" else "Allen WJ"
+            result[uid] = {"title": f"paper {uid}", "authors": [{"name": name}]}
+        return 200, {}, json.dumps({"result": result})
+
+    responses.add_callback(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi",
+        summaries,
+    )
+    pb = PubMed.PubMed(affiliation="", author_batch_size=10)
+    results = dict(pb.get_publications_by_authors(["w j allen", "jane doe"], 2))
+    assert [pub["title"] for pub in results["w j allen"]] == ["paper 1", "paper 2"]
+    assert [pub["title"] for pub in results["jane doe"]] == ["paper 5"]
+    assert pb.stats.get("PubMed.batch_requeries") == 1
+
+
+@responses.activate
+def test_articles_are_looked_up_by_doi():
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi",
+        match=[
+            responses.matchers.query_param_matcher(
+                {"term": '"10.1234/biasnet"[doi] OR "10.1/other"[doi]', "retmax": "2"},
+                strict_match=False,
+            )
+        ],
+        json={"esearchresult": {"idlist": ["1"]}},
+    )
+    responses.add(
+        responses.GET,
+        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi",
+        body=EFETCH_XML,
+    )
+    # no affiliation check: the articles were already found for the author
+    pb = PubMed.PubMed(affiliation="rice university")
+    publications = pb.get_publications_by_dois(["10.1234/biasnet", "10.1/other"])
+    assert list(publications) == ["10.1234/biasnet"]
+    assert publications["10.1234/biasnet"]["journal"] == "Some Journal"
+    assert publications["10.1234/biasnet"]["publication_date"] == "2024-10-22"
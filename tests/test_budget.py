@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+import responses
+
+from pubscraper import budget
+from pubscraper.budget import Budget, BudgetExceeded
+from pubscraper.cache import Cache
+from pubscraper.pipeline import scrape_authors
+from pubscraper.stats import RunStats
+from pubscraper.transport import Transport
+from pubscraper.APIClasses.Base import Base
+from tests.helpers import ListWriter
+
+URL = "https://api.example.org/works"
+
+
+def test_request_budget():
+    author_budget = Budget(requests=2)
+    author_budget.charge()
+    author_budget.charge()
+    with pytest.raises(BudgetExceeded):
+        author_budget.charge()
+    assert author_budget.exhausted
+
+
+def test_time_budget_starts_when_activated():
+    author_budget = Budget(seconds=0.05)
+    time.sleep(0.1)
+    with budget.activate(author_budget):
+        author_budget.charge()
+        time.sleep(0.1)
+        with pytest.raises(BudgetExceeded):
+            author_budget.charge()
+
+
+def test_parent_budget_is_shared():
+    run_budget = Budget(requests=3)
+    first, second = Budget(parent=run_budget), Budget(parent=run_budget)
+    first.charge()
+    first.charge()
+    second.charge()
+    with pytest.raises(BudgetExceeded):
+        second.charge()
+    assert second.exhausted and not first.exhausted
+    assert run_budget.used == 3
+
+
+def test_bind_carries_budget_to_other_threads():
+    author_budget = Budget()
+    seen = []
+    with budget.activate(author_budget):
+        thread = threading.Thread(target=budget.bind(lambda: seen.append(budget.current())))
+    thread.start()
+    thread.join()
+    assert seen == [author_budget]
+    assert budget.current() is None
+
+
+@responses.activate
+def test_transport_charges_network_requests_only():
+    responses.add(responses.GET, URL, body="{}", status=200)
+    transport = Transport("Test", Cache())
+    author_budget = Budget(requests=1)
+    with budget.activate(author_budget):
+        transport.get(URL)
+        # served from the cache, so it doesn't count
+        transport.get(URL)
+        with pytest.raises(BudgetExceeded):
+            transport.get(URL, params={"page": 2})
+    assert len(responses.calls) == 1
+
+
+def test_pipeline_marks_truncated_authors():
+    class BudgetedAPI(Base):
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            budget.current().charge()
+            publications = [{"doi": "10.1/a", "title": "a"}]
+            try:
+                budget.current().charge()
+            except BudgetExceeded:
+                return publications
+            return publications + [{"doi": "10.1/b", "title": "b"}]
+
+    writer = ListWriter()
+    stats = RunStats()
+    scrape_authors(
+        [("joe allen", "UT"), ("jane doe", "UT")],
+        {"PubMed": BudgetedAPI()},
+        10,
+        writer,
+        stats=stats,
+        budgets={
+            "author": {"seconds": None, "requests": 2},
+            "run": {"seconds": None, "requests": 3},
+        },
+    )
+    assert [(author, len(pubs)) for author, pubs in writer.written] == [
+        ("joe allen", 2),
+        ("jane doe", 1),
+    ]
+    assert writer.truncated == ["jane doe"]
+    assert stats.get("authors_truncated", author="jane doe") == 1
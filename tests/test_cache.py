@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from pubscraper.cache import NEGATIVE, RESPONSE, STATE, Cache
+
+
+def filled_cache(path=":memory:"):
+    cache = Cache(str(path))
+    cache.set(STATE, "PubMed.strategy:joe allen", "full_author_name")
+    cache.set(NEGATIVE, "CrossRef:query.author:jane doe", {"total_results": 0}, ttl=60)
+    cache.set(RESPONSE, "https://api.crossref.org/works?rows=1", {"text": "x" * 5000}, ttl=-1)
+    return cache
+
+
+def test_export_and_import_round_trip(tmp_path):
+    path = tmp_path / "cache.jsonl.gz"
+    assert filled_cache().export_entries(str(path)) == 3
+
+    cache = Cache(compression=None)
+    assert cache.import_entries(str(path)) == 3
+    assert cache.get(STATE, "PubMed.strategy:joe allen") == "full_author_name"
+    assert cache.get(NEGATIVE, "CrossRef:query.author:jane doe") == {"total_results": 0}
+    # expiry times carry over, so expired responses are still only revalidated
+    value, fresh = cache.get_entry(RESPONSE, "https://api.crossref.org/works?rows=1")
+    assert value == {"text": "x" * 5000} and not fresh
+
+
+def test_export_filters(tmp_path):
+    path = tmp_path / "cache.jsonl"
+    cache = filled_cache()
+    assert cache.export_entries(str(path), namespaces=[STATE, NEGATIVE]) == 2
+    assert cache.export_entries(str(path), skip_expired=True) == 2
+    assert "works?rows=1" not in path.read_text()
+
+
+def test_import_keeps_newer_entries(tmp_path):
+    path = tmp_path / "cache.jsonl.gz"
+    filled_cache().export_entries(str(path))
+    cache = Cache()
+    time.sleep(0.01)
+    cache.set(STATE, "PubMed.strategy:joe allen", "initials_lastname")
+    cache.import_entries(str(path))
+    assert cache.get(STATE, "PubMed.strategy:joe allen") == "initials_lastname"
+    assert cache.get(NEGATIVE, "CrossRef:query.author:jane doe") == {"total_results": 0}
+
+
+def test_import_rejects_other_files(tmp_path):
+    path = tmp_path / "roster.jsonl"
+    path.write_text('{"name": "Joe Allen"}\n')
+    with pytest.raises(ValueError, match="not an exported pubscraper cache"):
+        Cache().import_entries(str(path))
+
+
+def test_stats_and_prune(tmp_path):
+    cache = filled_cache(tmp_path / "cache.sqlite")
+    stats = cache.stats()
+    assert stats[RESPONSE]["entries"] == 1 and stats[RESPONSE]["expired"] == 1
+    assert stats[STATE] == {"entries": 1, "expired": 0, "bytes": stats[STATE]["bytes"]}
+
+    assert cache.prune() == 1
+    assert RESPONSE not in cache.stats()
+    assert cache.prune(namespaces=[NEGATIVE], expired_only=False) == 1
+    assert cache.prune(expired_only=False, stored_before=time.time() - 60) == 0
+    assert list(cache.stats()) == [STATE]
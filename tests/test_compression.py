@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import pytest
+
+from pubscraper import compression
+from pubscraper.cache import Cache
+from pubscraper.writers import open_writer, resolve_output
+
+
+@pytest.mark.parametrize(
+    "output_file, format, expected",
+    [
+        ("output", "json", ("output.json", "json")),
+        ("results.jsonl.zst", "json", ("results.jsonl.zst", "jsonl")),
+        ("results.gz", "csv", ("results.csv.gz", "csv")),
+        ("report.csv", "json", ("report.csv", "csv")),
+    ],
+)
+def test_resolve_output(output_file, format, expected):
+    assert resolve_output(output_file, format) == expected
+
+
+def test_compressed_xlsx_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_output("results.xlsx.gz", "xlsx")
+
+
+def test_gzip_jsonl_output(tmp_path):
+    path = tmp_path / "results.jsonl.gz"
+    writer = open_writer(path, "jsonl")
+    writer.write("joe allen", [{"doi": "10.1/a"}])
+    writer.write("kelsey beavers", [])
+    writer.close()
+    with gzip.open(path, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{"joe allen": [{"doi": "10.1/a"}]}, {"kelsey beavers": []}]
+
+
+@pytest.mark.skipif(compression.zstd is None, reason="zstd is not available")
+def test_zstd_round_trip(tmp_path):
+    path = tmp_path / "results.csv.zst"
+    writer = open_writer(path, "csv")
+    writer.write("joe allen", [{"doi": "10.1/a"}])
+    writer.close()
+    with compression.open_file(path, "rt") as f:
+        assert "10.1/a" in f.read()
+
+
+def test_large_cache_entries_are_compressed():
+    cache = Cache()
+    value = {"text": "x" * 10000}
+    cache.set("response", "big", value)
+    cache.set("response", "small", {"text": "x"})
+    stored = dict(cache._conn.execute("SELECT key, value FROM entries").fetchall())
+    assert isinstance(stored["big"], bytes) and len(stored["big"]) < 1000
+    assert isinstance(stored["small"], str)
+    assert cache.get("response", "big") == value
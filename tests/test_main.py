@@ -4,6 +4,8 @@ import pytest
 from click.testing import CliRunner
 
 from pubscraper import main
+from pubscraper.cache import STATE, Cache
+from pubscraper.APIClasses.Base import Base
 from pubscraper.version import __version__
 
 RESPONSE_DIR = os.path.join(
@@ -42,6 +44,14 @@ def test_bad_input_file(runner):
     assert result.exit_code == 2
 
 
+def test_unsupported_input_format(runner, tmp_path):
+    path = tmp_path / "roster.txt"
+    path.write_text("joe allen")
+    result = runner.invoke(main.main, ["-i", str(path)])
+    assert result.exit_code == 2
+    assert "Unsupported roster format" in result.output
+
+
 def test_bad_api_selection(runner):
     result = runner.invoke(main.main, ["-a BadAPI"])
     assert result.exit_code == 2
@@ -57,3 +67,82 @@ def test_print_list_succeeds(runner):
     result = runner.invoke(main.main, ["--list"])
     assert result.exit_code == 0
     assert result.output == response_text
+
+
+def test_cache_export_and_import(runner, tmp_path):
+    source = tmp_path / "source.sqlite"
+    cache = Cache(str(source))
+    cache.set(STATE, "PubMed.strategy:joe allen", "full_author_name")
+    cache.close()
+    exported = tmp_path / "cache.jsonl.gz"
+
+    result = runner.invoke(
+        main.main, ["--cache_file", str(source), "cache", "export", str(exported)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Exported 1 entries" in result.output
+
+    target = tmp_path / "target.sqlite"
+    result = runner.invoke(
+        main.main, ["--cache_file", str(target), "cache", "import", str(exported)]
+    )
+    assert result.exit_code == 0, result.output
+    assert Cache(str(target)).get(STATE, "PubMed.strategy:joe allen") == "full_author_name"
+
+    result = runner.invoke(main.main, ["--cache_file", str(target), "cache", "stats"])
+    assert result.exit_code == 0
+    stored = str(len('"full_author_name"'))
+    assert result.output.splitlines()[1].split() == ["state", "1", "0", stored]
+
+
+def test_cache_prune_older_than(runner, tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = Cache(str(path))
+    cache.set(STATE, "old", 1)
+    cache._conn.execute("UPDATE entries SET stored_at = stored_at - 10 * 24 * 60 * 60")
+    cache._conn.commit()
+    cache.set(STATE, "new", 2)
+    cache.close()
+
+    result = runner.invoke(
+        main.main, ["--cache_file", str(path), "cache", "prune", "--older_than", "5"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Pruned 1 entries" in result.output
+    cache = Cache(str(path))
+    assert cache.get(STATE, "old") is None
+    assert cache.get(STATE, "new") == 2
+
+
+def test_cache_commands_need_a_cache(runner, tmp_path):
+    result = runner.invoke(
+        main.main, ["--cache_file", str(tmp_path / "missing.sqlite"), "cache", "stats"]
+    )
+    assert result.exit_code == 2
+    assert "No cache at" in result.output
+
+
+def test_write_errors_fail_the_run(runner, tmp_path, monkeypatch):
+    class UnwritableAPI(Base):
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            # sets can't be serialized to JSON
+            return [{"doi": "10.1/a", "title": {"a"}, "publication_date": "2024-01-01"}]
+
+    roster = tmp_path / "roster.csv"
+    roster.write_text("first_name,last_name\nJoe,Allen\n", encoding="utf-8")
+    monkeypatch.setitem(main.APIS, "CrossRef", UnwritableAPI())
+    result = runner.invoke(
+        main.main,
+        [
+            "-i", str(roster),
+            "-o", str(tmp_path / "output.json"),
+            "-a", "CrossRef",
+            "--cache_file", str(tmp_path / "cache.sqlite"),
+            "--progress_interval", "0",
+            "--only_new",
+            "--seen_file", str(tmp_path / "seen.bin"),
+        ],
+    )
+    assert result.exit_code == 1
+    # the publications weren't reported, so they aren't remembered as seen
+    assert not (tmp_path / "seen.bin").exists()
@@ -0,0 +1,256 @@
+"""
+Performance budgets. These tests run large synthetic workloads (thousands of
+PubMed articles, multi-page CrossRef results, 10k-row rosters) and fail when
+request counts, parse throughput, peak memory or export time go over the
+budgets below. They are slower than the rest of the suite and only run when
+selected: pytest -m perf
+"""
+
+import json
+import math
+import time
+import tracemalloc
+
+import pytest
+import responses
+from click.testing import CliRunner
+from openpyxl import Workbook
+
+from pubscraper import main, roster
+from pubscraper.pipeline import scrape_authors
+from pubscraper.writers import open_writer
+from pubscraper.APIClasses import CrossRef, PubMed
+from pubscraper.APIClasses.Base import Base
+import pubscraper.config as config
+from tests.helpers import ListWriter
+
+pytestmark = pytest.mark.perf
+
+# Time budgets are several times what a laptop needs, so they only trip on
+# real regressions rather than on a slow CI machine
+BUDGETS = {
+    # PubmedArticle elements parsed per second by parse_efetch_xml
+    "efetch_articles_per_second": 2000,
+    # peak memory allocated while parsing, as a multiple of the body size
+    # (building the whole tree takes over 6 times the body size)
+    "efetch_peak_memory_ratio": 2,
+    # requests for one author with 1000 PubMed articles (1 esearch + efetch batches)
+    "pubmed_requests": 1 + math.ceil(1000 / config.PUBMED_BATCH_SIZE),
+    # requests for 200 CrossRef works when a quarter of each page is invalid
+    "crossref_requests": 6,
+    # seconds to read a 10k-row roster
+    "roster_seconds": 5,
+    # seconds to export 10k authors with 5 publications each, per format
+    "export_seconds": {"json": 5, "jsonl": 5, "csv": 5, "xlsx": 30},
+    # seconds for the pipeline to get through 10k authors with instant APIs
+    "pipeline_seconds": 20,
+    # seconds for `pubscraper` to scrape a 1000-row roster with an instant API
+    "main_seconds": 20,
+}
+
+ROSTER_ROWS = 10_000
+
+
+def efetch_article(uid: int) -> str:
+    authors = "".join(
+        f"""
+          <Author>
+            <LastName>Author{uid}x{n}</LastName>
+            <ForeName>Joe</ForeName>
+            <AffiliationInfo>
+              <Affiliation>The University of Texas at Austin, Department {n}</Affiliation>
+            </AffiliationInfo>
+          </Author>"""
+        for n in range(8)
+    )
+    return f"""
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>{uid}</PMID>
+      <Article>
+        <Journal><Title>Journal of Synthetic Results</Title></Journal>
+        <ArticleTitle>Synthetic article number {uid}</ArticleTitle>
+        <Abstract><AbstractText>{"Lorem ipsum dolor sit amet. " * 40}</AbstractText></Abstract>
+        <AuthorList>{authors}
+        </AuthorList>
+      </Article>
+    </MedlineCitation>
+    <PubmedData>
+      <ArticleIdList>
+        <ArticleId IdType="pubmed">{uid}</ArticleId>
+        <ArticleId IdType="doi">10.5555/synthetic.{uid}</ArticleId>
+      </ArticleIdList>
+    </PubmedData>
+    <PubDate><Year>2024</Year><Month>Oct</Month><Day>22</Day></PubDate>
+  </PubmedArticle>"""
+
+
+def efetch_xml(uids) -> bytes:
+    articles = "".join(efetch_article(int(uid)) for uid in uids)
+    return f'<?xml version="1.0" ?>\n<PubmedArticleSet>{articles}\n</PubmedArticleSet>\n'.encode()
+
+
+def crossref_work(n: int, valid: bool = True) -> dict:
+    work = {
+        "DOI": f"10.5555/work.{n}",
+        "container-title": ["Journal of Synthetic Results"],
+        "author": [{"given": "Joe", "family": "Allen"}],
+        "published": {"date-parts": [[2024, 5, 1]]},
+    }
+    if valid:
+        work["title"] = [f"Work {n}"]
+    return work
+
+
+def publications(author: str, count: int = 5) -> list:
+    return [
+        {
+            "from": "CrossRef",
+            "journal": "Journal of Synthetic Results",
+            "publication_date": "2024-05-01",
+            "title": f"Work {n} by {author}",
+            "authors": f"{author},Jane Doe",
+            "doi": f"10.5555/{author.replace(' ', '.')}.{n}",
+        }
+        for n in range(count)
+    ]
+
+
+class InstantAPI(Base):
+    def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+        return publications(author_name)[:rows]
+
+
+def test_efetch_parse_throughput_and_memory():
+    count = 3000
+    body = efetch_xml(range(count))
+    start = time.perf_counter()
+    parsed = PubMed.parse_efetch_xml(body, "university of texas")
+    elapsed = time.perf_counter() - start
+    assert len(parsed) == count
+    assert count / elapsed >= BUDGETS["efetch_articles_per_second"]
+
+    # tracing slows parsing down, so memory is measured on a second run
+    tracemalloc.start()
+    PubMed.parse_efetch_xml(body, "university of texas")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # articles are discarded as they are parsed, so memory stays close to the
+    # size of the body instead of the size of the whole tree
+    assert peak <= BUDGETS["efetch_peak_memory_ratio"] * len(body)
+
+
+@responses.activate
+def test_pubmed_requests_per_author():
+    count = 1000
+    uids = [str(uid) for uid in range(count)]
+    responses.add(
+        responses.GET,
+        config.PUBMED_SEARCH_URL,
+        json={"esearchresult": {"count": str(count), "idlist": uids}},
+    )
+    responses.add_callback(
+        responses.GET,
+        config.PUBMED_FETCH_URL,
+        lambda request: (200, {}, efetch_xml(request.params["id"].split(","))),
+    )
+    pb = PubMed.PubMed()
+    # measure the requests made, not the time spent waiting for the rate limit
+    pb._throttle = lambda: None
+    found = pb.get_publications_by_author("joe allen", count)
+
+    assert len(found) == count
+    assert len(responses.calls) <= BUDGETS["pubmed_requests"]
+
+
+@responses.activate
+def test_crossref_requests_per_author():
+    total = 2000
+
+    def works(request):
+        rows, offset = int(request.params["rows"]), int(request.params["offset"])
+        items = [crossref_work(n, valid=n % 4 != 0) for n in range(offset, offset + rows)]
+        return 200, {}, json.dumps({"message": {"total-results": total, "items": items}})
+
+    responses.add_callback(responses.GET, config.CROSSREF_URL, works)
+    found = CrossRef.CrossRef().get_publications_by_author("joe allen", 200)
+
+    assert len(found) >= 200
+    assert len(responses.calls) <= BUDGETS["crossref_requests"]
+
+
+@pytest.mark.parametrize("format", ["csv", "xlsx"])
+def test_large_roster_read_time(tmp_path, format):
+    rows = [("UT Austin", f"First{n}", f"Last{n}") for n in range(ROSTER_ROWS)]
+    path = tmp_path / f"roster.{format}"
+    if format == "csv":
+        lines = ["root_institution_name,first_name,last_name"]
+        lines += [",".join(row) for row in rows]
+        path.write_text("\n".join(lines), encoding="utf-8")
+    else:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(config.WS_NAME)
+        worksheet.append(["root_institution_name", "first_name", "last_name"])
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(path)
+
+    start = time.perf_counter()
+    entries = list(roster.read_roster(str(path)))
+    elapsed = time.perf_counter() - start
+
+    assert len(entries) == ROSTER_ROWS
+    assert elapsed <= BUDGETS["roster_seconds"]
+
+
+@pytest.mark.parametrize("format", ["json", "jsonl", "csv", "xlsx"])
+def test_export_time(tmp_path, format):
+    authors = [f"author {n}" for n in range(ROSTER_ROWS)]
+    start = time.perf_counter()
+    writer = open_writer(str(tmp_path / f"output.{format}"), format)
+    for author in authors:
+        writer.write(author, publications(author))
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed <= BUDGETS["export_seconds"][format]
+
+
+def test_pipeline_time():
+    entries = [(f"author {n}", "UT") for n in range(ROSTER_ROWS)]
+    apis = {"CrossRef": InstantAPI(), "OpenAlex": InstantAPI()}
+    writer = ListWriter()
+    start = time.perf_counter()
+    scrape_authors(entries, apis, 10, writer)
+    elapsed = time.perf_counter() - start
+
+    assert len(writer.written) == ROSTER_ROWS
+    # both APIs found the same publications, so each author keeps five
+    assert all(len(found) == 5 for _, found in writer.written)
+    assert elapsed <= BUDGETS["pipeline_seconds"]
+
+
+def test_main_time(tmp_path, monkeypatch):
+    path = tmp_path / "roster.csv"
+    lines = ["first_name,last_name"] + [f"First{n},Last{n}" for n in range(1000)]
+    path.write_text("\n".join(lines), encoding="utf-8")
+    monkeypatch.setitem(main.APIS, "CrossRef", InstantAPI())
+    output = tmp_path / "output.json"
+
+    start = time.perf_counter()
+    result = CliRunner().invoke(
+        main.main,
+        [
+            "-i", str(path),
+            "-o", str(output),
+            "-a", "CrossRef",
+            "--cache_file", str(tmp_path / "cache.sqlite"),
+            "--store_file", str(tmp_path / "store.sqlite"),
+            "--progress_interval", "0",
+        ],
+    )
+    elapsed = time.perf_counter() - start
+
+    assert result.exit_code == 0, result.output
+    assert len(json.loads(output.read_text())) == 1000
+    assert elapsed <= BUDGETS["main_seconds"]
@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+
+import pytest
+
+from pubscraper.pipeline import Pipeline, Stage, filter_by_cutoff, scrape_authors
+from pubscraper.roster import merge_rosters
+from pubscraper.writers import FanoutWriter, labelled_path, open_writer
+from pubscraper.APIClasses.Base import Base
+from tests.helpers import FakeAPI, ListWriter, pub
+
+
+def test_results_follow_roster_order():
+    roster = [(f"author {i}", "UT") for i in range(20)]
+    apis = {
+        "PubMed": FakeAPI({f"author {i}": [pub(f"10.1/{i}")] for i in range(20)}),
+    }
+    writer = ListWriter()
+    scrape_authors(roster, apis, 10, writer, workers={"fetch": 8})
+    assert [author for author, _ in writer.written] == [a for a, _ in roster]
+
+
+def test_duplicates_across_apis_are_dropped():
+    apis = {
+        "PubMed": FakeAPI({"joe allen": [pub("10.1/A"), pub("10.1/b")]}),
+        "CrossRef": FakeAPI({"joe allen": [pub("10.1/a", source="CrossRef")]}),
+    }
+    writer = ListWriter()
+    scrape_authors([("joe allen", "UT")], apis, 10, writer)
+    author, publications = writer.written[0]
+    assert sorted(p["doi"].lower() for p in publications) == ["10.1/a", "10.1/b"]
+
+
+def test_failing_api_does_not_stall_author():
+    class BrokenAPI(Base):
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            raise RuntimeError("boom")
+
+    apis = {"PubMed": FakeAPI({"joe allen": [pub("10.1/a")]}), "Broken": BrokenAPI()}
+    writer = ListWriter()
+    scrape_authors([("joe allen", "UT"), ("kelsey beavers", "UT")], apis, 10, writer)
+    assert writer.written == [("joe allen", [pub("10.1/a")]), ("kelsey beavers", [])]
+
+
+def test_write_errors_are_counted():
+    class BrokenWriter(ListWriter):
+        def write(self, author, publications, truncated=False):
+            if author == "joe allen":
+                raise OSError("disk full")
+            super().write(author, publications, truncated)
+
+    writer = BrokenWriter()
+    pipeline = scrape_authors(
+        [("joe allen", "UT"), ("kelsey beavers", "UT")], {"PubMed": FakeAPI({})}, 10, writer
+    )
+    assert pipeline.errors["write"] == 1
+    assert writer.written == [("kelsey beavers", [])]
+
+
+def test_filter_by_cutoff():
+    pubs = [pub("a", "2023-12-31"), pub("b", "2024-06-01"), pub("c", ""), pub("d", "??")]
+    assert [p["doi"] for p in filter_by_cutoff(pubs, "2024-01")] == ["b"]
+    assert filter_by_cutoff(pubs) == pubs
+
+
+def test_backpressure_bounds_queues():
+    release = threading.Event()
+    produced = []
+
+    def source():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    def slow(item):
+        release.wait()
+
+    pipeline = Pipeline(
+        [Stage("fast", lambda item: [item]), Stage("slow", slow)], queue_size=2
+    )
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    time.sleep(0.2)
+    # the slow stage holds one item, and each queue holds at most two more
+    assert len(produced) <= 7
+    assert all(depth <= 2 for depth in pipeline.queue_depths().values())
+    release.set()
+    runner.join(timeout=5)
+    assert len(produced) == 50
+
+
+def test_stage_needs_a_worker():
+    with pytest.raises(ValueError):
+        Stage("broken", lambda item: None, workers=0)
+
+
+@pytest.mark.parametrize("results", [[], [{"joe allen": [pub("10.1/a")]}]])
+def test_json_writer_matches_json_dump(tmp_path, results):
+    path = tmp_path / "output.json"
+    writer = open_writer(path, "json")
+    for result in results:
+        for author, publications in result.items():
+            writer.write(author, publications)
+    writer.close()
+    assert path.read_text() == json.dumps(results, indent=4)
+
+
+def test_authors_on_several_rosters_are_queried_once():
+    class CountingAPI(FakeAPI):
+        def __init__(self, publications):
+            super().__init__(publications)
+            self.queried = []
+
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            self.queried.append(author_name)
+            return super().get_publications_by_author(author_name, rows, since, orcid)
+
+    api = CountingAPI({"Joe Allen": [pub("10.1/a")], "Jane Doe": [pub("10.1/b")]})
+    physics = [("Joe Allen", "UT", None), ("Jane Doe", "UT", None)]
+    chemistry = [("joe allen", "UT", "0000-0002-1825-0097")]
+    roster, members = merge_rosters([physics, chemistry])
+    assert roster == [("Joe Allen", "UT", "0000-0002-1825-0097"), ("Jane Doe", "UT", None)]
+
+    writers = [ListWriter(), ListWriter()]
+    scrape_authors(roster, {"PubMed": api}, 10, FanoutWriter(writers, members))
+    assert sorted(api.queried) == ["Jane Doe", "Joe Allen"]
+    assert [author for author, _ in writers[0].written] == ["Joe Allen", "Jane Doe"]
+    assert writers[1].written == [("joe allen", [pub("10.1/a")])]
+
+
+def test_namesakes_with_different_orcids_are_queried_apart():
+    class OrcidAPI(Base):
+        # the namesakes end up in one batch
+        batch_size = 10
+
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            return [pub(f"10.1/{orcid}")]
+
+    physics = [("Joe Allen", "UT", "0000-0002-1825-0097"), ("Jane Doe", "UT", None)]
+    chemistry = [("joe allen", "UT", None), ("Joe Allen", "UT", "0000-0001-5109-3700")]
+    roster, members = merge_rosters([physics, chemistry])
+    # the entry without an iD is taken to be the only namesake known so far
+    assert roster == [
+        ("Joe Allen", "UT", "0000-0002-1825-0097"),
+        ("Jane Doe", "UT", None),
+        ("Joe Allen", "UT", "0000-0001-5109-3700"),
+    ]
+
+    writers = [ListWriter(), ListWriter()]
+    scrape_authors(roster, {"PubMed": OrcidAPI()}, 10, FanoutWriter(writers, members))
+    assert writers[0].written == [
+        ("Joe Allen", [pub("10.1/0000-0002-1825-0097")]),
+        ("Jane Doe", [pub("10.1/None")]),
+    ]
+    assert writers[1].written == [
+        ("joe allen", [pub("10.1/0000-0002-1825-0097")]),
+        ("Joe Allen", [pub("10.1/0000-0001-5109-3700")]),
+    ]
+
+
+def test_labelled_path():
+    assert labelled_path("output.json", "json", "physics") == "output_physics.json"
+    assert labelled_path("out.jsonl.gz", "jsonl", "chem") == "out_chem.jsonl.gz"
+
+
+def test_incomplete_publications_are_enriched():
+    class LookupAPI(FakeAPI):
+        def get_publications_by_dois(self, dois, author_name=None):
+            self.looked_up = dois
+            return {"10.1/a": pub("10.1/a", source="PubMed") | {"journal": "Sample Journal"}}
+
+    incomplete = {"from": "CrossRef", "doi": "10.1/A", "title": "a", "journal": None}
+    apis = {
+        "CrossRef": FakeAPI({"joe allen": [incomplete]}),
+        "PubMed": LookupAPI({}),
+    }
+    writer = ListWriter()
+    scrape_authors([("joe allen", "UT")], apis, 10, writer, enrich=True)
+    _, publications = writer.written[0]
+    assert apis["PubMed"].looked_up == ["10.1/a"]
+    assert publications[0]["journal"] == "Sample Journal"
+    assert publications[0]["publication_date"] == "2024-01-01"
+    assert publications[0]["from"] == "CrossRef"
@@ -0,0 +1,69 @@
+import io
+import json
+
+from pubscraper.progress import Progress, prometheus_text
+from pubscraper.stats import RunStats
+
+
+class API:
+    requests_per_second = 2
+
+
+def run_stats():
+    stats = RunStats()
+    stats.incr("authors_written", 3)
+    stats.incr("PubMed.http.fetches", 6)
+    stats.incr("PubMed.http.revalidations", 2)
+    stats.incr("PubMed.http.hits", 2)
+    stats.incr("PubMed.http.status_429")
+    return stats
+
+
+def test_snapshot():
+    progress = Progress(run_stats(), total=10, apis={"PubMed": API()}, stream=io.StringIO())
+    snapshot = progress.snapshot()
+    assert snapshot["authors_done"] == 3
+    assert snapshot["authors_remaining"] == 7
+    assert snapshot["authors_per_second"] > 0
+    assert snapshot["eta"] is not None
+    assert snapshot["cache_hit_rate"] == 0.2
+    assert snapshot["apis"]["PubMed"]["requests"] == 8
+    assert snapshot["apis"]["PubMed"]["limit"] == 2
+    assert snapshot["apis"]["PubMed"]["throttled"] == 1
+
+    # rates only count what happened since the previous snapshot
+    snapshot = progress.snapshot()
+    assert snapshot["authors_per_second"] == 0
+    assert snapshot["apis"]["PubMed"]["requests_per_second"] == 0
+
+
+def test_format():
+    progress = Progress(run_stats(), total=10, apis={"PubMed": API()}, stream=io.StringIO())
+    line = progress.format(progress.snapshot())
+    assert line.startswith("3/10 authors")
+    assert "PubMed" in line and "/2 req/s (1x429)" in line
+    assert line.endswith("cache 20%")
+
+
+def test_metrics_files(tmp_path):
+    for name in ("metrics.json", "metrics.prom"):
+        path = tmp_path / name
+        with Progress(
+            run_stats(), apis={"PubMed": API()}, interval=0, metrics_file=str(path)
+        ):
+            pass
+        text = path.read_text()
+        if name.endswith(".json"):
+            assert json.loads(text)["authors_done"] == 3
+        else:
+            assert "pubscraper_authors_done 3" in text
+            assert 'pubscraper_api_throttled_total{api="PubMed"} 1' in text
+            # unknown totals are left out rather than written as None
+            assert "authors_total" not in text
+
+
+def test_prometheus_text_describes_each_metric_once():
+    progress = Progress(run_stats(), apis={"PubMed": API(), "CrossRef": API()})
+    text = prometheus_text(progress.snapshot())
+    assert text.count("# TYPE pubscraper_api_requests_total gauge") == 1
+    assert 'pubscraper_api_requests_total{api="CrossRef"} 0' in text
@@ -0,0 +1,139 @@
+import pytest
+from openpyxl import Workbook
+
+from pubscraper import roster
+import pubscraper.config as config
+
+
+def write_roster(path, rows):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = config.WS_NAME
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def test_normalize_orcid():
+    assert roster.normalize_orcid("0000-0002-1825-0097") == "0000-0002-1825-0097"
+    assert roster.normalize_orcid("https://orcid.org/0000-0002-1694-233x") == "0000-0002-1694-233X"
+    assert roster.normalize_orcid("not an orcid") is None
+    assert roster.normalize_orcid(None) is None
+
+
+def test_orcid_column_is_read(tmp_path):
+    path = write_roster(
+        tmp_path / "roster.xlsx",
+        [
+            ["Institution", "First", "Last", "ORCID"],
+            ["UT", "Joe", "Allen", "https://orcid.org/0000-0002-1825-0097"],
+            ["UT", "Jane", "Doe", None],
+            ["UT", "Joe", "Allen", None],
+        ],
+    )
+    assert list(roster.read_roster(path)) == [
+        ("Joe Allen", "UT", "0000-0002-1825-0097"),
+        ("Jane Doe", "UT", None),
+    ]
+
+
+def test_roster_without_orcid_column(tmp_path):
+    path = write_roster(
+        tmp_path / "roster.xlsx", [["Institution", "First", "Last"], ["UT", "Joe", "Allen"]]
+    )
+    assert list(roster.read_roster(path)) == [("Joe Allen", "UT", None)]
+
+
+def test_blank_rows_and_duplicate_names_are_skipped(tmp_path):
+    path = write_roster(
+        tmp_path / "roster.xlsx",
+        [
+            ["root_institution_name", "first_name", "last_name"],
+            ["UT", "José", "Álvarez"],
+            [None, None, None],
+            ["UT", "jose ", " ALVAREZ"],
+            ["UT", "Cher", None],
+        ],
+    )
+    assert list(roster.read_roster(path)) == [("José Álvarez", "UT", None)]
+
+
+def test_namesakes_with_different_orcids_are_kept(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text(
+        "first_name,last_name,orcid\n"
+        "Joe,Allen,0000-0002-1825-0097\n"
+        "Joe,Allen,0000-0001-5109-3700\n"
+        "joe,allen,\n"
+        "Joe,Allen,0000-0002-1825-0097\n",
+        encoding="utf-8",
+    )
+    assert list(roster.read_roster(path)) == [
+        ("Joe Allen", None, "0000-0002-1825-0097"),
+        ("Joe Allen", None, "0000-0001-5109-3700"),
+    ]
+
+
+def test_csv_roster(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text(
+        "last_name,first_name,institution,orcid\n"
+        "Allen,Joe,UT,0000-0002-1825-0097\n"
+        ",,,\n"
+        "Doe,Jane,UT,\n",
+        encoding="utf-8",
+    )
+    assert list(roster.read_roster(path)) == [
+        ("Joe Allen", "UT", "0000-0002-1825-0097"),
+        ("Jane Doe", "UT", None),
+    ]
+
+
+def test_unnamed_columns_fall_back_to_positions(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text("Org,Given,Family\nUT,Joe,Allen\n", encoding="utf-8")
+    assert list(roster.read_roster(path)) == [("Joe Allen", "UT", None)]
+    path.write_text("first_name,last_name\nJoe,Allen\n", encoding="utf-8")
+    assert list(roster.read_roster(path)) == [("Joe Allen", None, None)]
+
+
+def test_jsonl_roster(tmp_path):
+    path = tmp_path / "roster.jsonl"
+    path.write_text(
+        '{"first_name": "Joe", "last_name": "Allen", "institution": "UT"}\n'
+        "\n"
+        '{"name": "Jane  Doe"}\n'
+        '"joe allen"\n',
+        encoding="utf-8",
+    )
+    assert list(roster.read_roster(path)) == [("Joe Allen", "UT", None), ("Jane Doe", None, None)]
+
+
+def test_parquet_roster(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "roster.parquet"
+    table = pa.table({"first_name": ["Joe", None], "last_name": ["Allen", None]})
+    pq.write_table(table, path)
+    assert list(roster.read_roster(path)) == [("Joe Allen", None, None)]
+
+
+def test_unsupported_roster_format():
+    with pytest.raises(ValueError):
+        roster.roster_format("roster.txt")
+    assert roster.roster_format("roster.csv.gz") == "csv"
+
+
+def test_roster_size(tmp_path):
+    xlsx = write_roster(
+        tmp_path / "roster.xlsx",
+        [["root_institution_name", "first_name", "last_name"], ["UT", "Joe", "Allen"]],
+    )
+    assert roster.roster_size(xlsx) == 1
+    csv_path = tmp_path / "roster.csv"
+    csv_path.write_text("first_name,last_name\nJoe,Allen\nJane,Doe\n\n", encoding="utf-8")
+    assert roster.roster_size(csv_path) == 2
+    jsonl = tmp_path / "roster.jsonl"
+    jsonl.write_text('"Joe Allen"\n"Jane Doe"\n"Ann Lee"\n', encoding="utf-8")
+    assert roster.roster_size(jsonl) == 3
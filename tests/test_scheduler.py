@@ -0,0 +1,135 @@
+import time
+
+from pubscraper import budget
+from pubscraper.cache import Cache
+from pubscraper.scheduler import DAY, RefreshScheduler, publication_rate
+from pubscraper.stats import RunStats
+from tests.helpers import FakeAPI, ListWriter
+
+
+def days_ago(days, now):
+    return time.strftime("%Y-%m-%d", time.localtime(now - days * DAY))
+
+
+def test_publication_rate_counts_recent_publications():
+    now = time.time()
+    pubs = [
+        {"publication_date": days_ago(10, now)},
+        {"publication_date": days_ago(100, now)},
+        {"publication_date": days_ago(800, now)},
+        {"publication_date": "not a date"},
+    ]
+    assert publication_rate(pubs, now) == 2 / 365
+
+
+def test_never_refreshed_authors_come_first():
+    scheduler = RefreshScheduler(Cache(), budget=100)
+    now = time.time()
+    scheduler.record("old author", [], requests=1, now=now - 30 * DAY)
+    assert scheduler.plan(["old author", "new author"], now=now) == ["new author", "old author"]
+
+
+def test_prolific_and_stale_authors_are_preferred():
+    scheduler = RefreshScheduler(Cache(), budget=100)
+    now = time.time()
+    prolific = [{"publication_date": days_ago(d, now)} for d in range(1, 50)]
+    scheduler.record("prolific", prolific, requests=1, now=now - 10 * DAY)
+    scheduler.record("quiet", [], requests=1, now=now - 10 * DAY)
+    scheduler.record("stale quiet", [], requests=1, now=now - 60 * DAY)
+    scheduler.record("fresh", prolific, requests=1, now=now)
+    assert scheduler.plan(["quiet", "fresh", "stale quiet", "prolific"], now=now) == [
+        "prolific",
+        "stale quiet",
+        "quiet",
+        "fresh",
+    ]
+
+
+def test_reporting_period_boost():
+    now = time.time()
+    scheduler = RefreshScheduler(Cache(), budget=100, period_start=now - 15 * DAY)
+    scheduler.record("before period", [], requests=1, now=now - 20 * DAY)
+    scheduler.record("older in period", [], requests=1, now=now - 14 * DAY)
+    assert scheduler.plan(["older in period", "before period"], now=now)[0] == "before period"
+
+
+def test_plan_stays_within_budget():
+    scheduler = RefreshScheduler(Cache(), budget=5, default_cost=2)
+    now = time.time()
+    for i in range(4):
+        scheduler.record(f"author {i}", [], requests=2, now=now - (i + 1) * DAY)
+    # author 3 is the stalest; two authors fit in the budget
+    assert scheduler.plan([f"author {i}" for i in range(4)], now=now) == ["author 3", "author 2"]
+
+
+def test_expensive_author_is_not_starved():
+    scheduler = RefreshScheduler(Cache(), budget=1, default_cost=10)
+    assert scheduler.plan(["joe allen"]) == ["joe allen"]
+
+
+def test_tick_refreshes_and_records_history():
+    api = FakeAPI(
+        {"joe allen": [{"doi": "10.1/a", "publication_date": "2024-01-01"}]},
+        requests_per_author=2,
+    )
+    scheduler = RefreshScheduler(Cache(), budget=4, default_cost=2)
+    roster = [("joe allen", "UT"), ("jane doe", "UT"), ("w j allen", "UT")]
+    writer = ListWriter()
+
+    refreshed = scheduler.tick(roster, {"PubMed": api}, 10, writer)
+    assert refreshed == ["joe allen", "jane doe"]
+    assert [author for author, _ in writer.written] == refreshed
+    assert scheduler.history("joe allen")["cost"] == 2
+    assert scheduler.history("w j allen") is None
+
+    # the author left out last time is the only one never refreshed
+    assert scheduler.tick(roster, {"PubMed": api}, 10, ListWriter())[0] == "w j allen"
+
+
+def test_shared_stats_are_counted_once():
+    stats = RunStats()
+    apis = {}
+    for name in ("PubMed", "CrossRef", "OpenAlex"):
+        api = FakeAPI({}, requests_per_author=1 if name == "PubMed" else 0)
+        api.configure(stats=stats)
+        apis[name] = api
+    scheduler = RefreshScheduler(Cache(), budget=100)
+    scheduler.tick([("joe allen", "UT")], apis, 10, ListWriter())
+    assert scheduler.history("joe allen")["cost"] == 1
+
+
+def test_budget_caps_the_requests_of_a_tick():
+    class ChargingAPI(FakeAPI):
+        def get_publications_by_author(self, author_name, rows=10, since=None, orcid=None):
+            # every author takes two requests, twice the default estimate
+            for _ in range(2):
+                budget.current().charge()
+                self.stats.incr("PubMed.esearch", author=author_name)
+            return [{"doi": f"10.1/{author_name}"}]
+
+    scheduler = RefreshScheduler(Cache(), budget=3, default_cost=1)
+    roster = [(f"author {i}", "UT") for i in range(3)]
+    writer = ListWriter()
+    scheduler.tick(roster, {"PubMed": ChargingAPI()}, 10, writer)
+    assert writer.truncated == ["author 1", "author 2"]
+    assert scheduler.history("author 0")["cost"] == 2
+    # truncated authors aren't recorded, so the next tick retries them
+    assert scheduler.history("author 1") is None
+
+
+def test_batch_requests_are_shared_by_its_authors():
+    class BatchAPI(FakeAPI):
+        batch_size = 10
+
+        def get_publications_by_authors(self, authors, rows=10, since=None, **kwargs):
+            # one request for the whole batch, attributed to no author
+            self.stats.incr("OpenAlex.works_requests")
+            for author in authors:
+                self.stats.incr("OpenAlex.author_lookups", author=author)
+                yield author, []
+
+    scheduler = RefreshScheduler(Cache(), budget=100)
+    roster = [("joe allen", "UT"), ("jane doe", "UT")]
+    scheduler.tick(roster, {"OpenAlex": BatchAPI()}, 10, ListWriter())
+    assert scheduler.history("joe allen")["cost"] == 1.5
+    assert scheduler.history("jane doe")["cost"] == 1.5
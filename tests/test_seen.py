@@ -0,0 +1,37 @@
+from pubscraper.seen import OnlyNewWriter, SeenSet
+from tests.helpers import ListWriter, pub
+
+
+def report(path, results):
+    seen = SeenSet(path)
+    writer = OnlyNewWriter(ListWriter(), seen)
+    for author, publications in results:
+        writer.write(author, publications)
+    writer.close()
+    seen.save()
+    return writer.writer.written
+
+
+def test_only_new_publications_are_reported(tmp_path):
+    path = tmp_path / "seen.bin"
+    first = report(
+        path, [("joe allen", [pub("10.1/a"), pub("10.1/b")]), ("jane doe", [pub("10.1/A")])]
+    )
+    # a publication shared by two authors is reported for both in the same report
+    assert first == [
+        ("joe allen", [pub("10.1/a"), pub("10.1/b")]),
+        ("jane doe", [pub("10.1/A")]),
+    ]
+    assert path.stat().st_size == 2 * 8
+
+    second = report(path, [("joe allen", [pub("10.1/b"), pub("10.1/c"), pub("", title="Untitled")])])
+    assert second == [("joe allen", [pub("10.1/c"), pub("", title="Untitled")])]
+    assert len(SeenSet(path)) == 4
+
+
+def test_nothing_is_remembered_until_saved(tmp_path):
+    path = tmp_path / "seen.bin"
+    seen = SeenSet(path)
+    OnlyNewWriter(ListWriter(), seen).write("joe allen", [pub("10.1/a")])
+    assert not path.exists()
+    assert pub("10.1/a") not in SeenSet(path)
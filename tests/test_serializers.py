@@ -0,0 +1,40 @@
+import json
+import logging
+
+from pubscraper import serializers
+from pubscraper.writers import open_writer
+
+
+def test_round_trip():
+    data = {"title": "Trade-off in cnidarian’s response", "rows": [1, 2.5, None]}
+    assert serializers.loads(serializers.dumps(data)) == data
+    assert serializers.loads(serializers.dumps(data).encode()) == data
+    assert serializers.dumps(data, indent=4) == json.dumps(data, indent=4)
+
+
+def test_compact_output(tmp_path):
+    path = tmp_path / "output.json"
+    writer = open_writer(path, "json", compact=True)
+    writer.write("joe allen", [{"doi": "10.1/a", "title": "Café"}])
+    writer.write("kelsey beavers", [])
+    writer.close()
+    assert json.loads(path.read_text(encoding="utf-8")) == [
+        {"joe allen": [{"doi": "10.1/a", "title": "Café"}]},
+        {"kelsey beavers": []},
+    ]
+    assert "  " not in path.read_text(encoding="utf-8")
+
+
+def test_payload_is_not_encoded_unless_debug(monkeypatch):
+    calls = []
+    monkeypatch.setattr(serializers, "dumps", lambda *a, **k: calls.append(a) or "")
+    logger = logging.getLogger("test_serializers")
+
+    logger.setLevel(logging.INFO)
+    serializers.log_payload(logger, "payload", {"a": 1})
+    assert calls == []
+
+    logger.setLevel(logging.DEBUG)
+    monkeypatch.setattr(serializers.config, "DEBUG_PAYLOAD_SAMPLE_RATE", 1.0)
+    serializers.log_payload(logger, "payload", {"a": 1})
+    assert len(calls) == 1
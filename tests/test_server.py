@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from pubscraper.server import ResultsCollector, ScrapeService, make_server
+from tests.helpers import FakeAPI, pub
+
+
+@pytest.fixture
+def api():
+    return FakeAPI({"joe allen": [pub("10.1/a")], "jane doe": [pub("10.1/b")]})
+
+
+@pytest.fixture
+def base_url(api):
+    service = ScrapeService({"PubMed": api}, job_workers=1, fetch_workers=1)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_submit_and_poll_job(base_url, api):
+    status, job = request(f"{base_url}/jobs", {"authors": ["joe allen", "jane doe"]})
+    assert status == 202
+    assert job["authors_total"] == 2
+
+    for _ in range(100):
+        status, job = request(f"{base_url}/jobs/{job['id']}")
+        if job["status"] == "done":
+            break
+        time.sleep(0.05)
+    assert job["status"] == "done"
+
+    status, results = request(f"{base_url}/jobs/{job['id']}/results")
+    assert status == 200
+    assert [list(entry) for entry in results] == [["joe allen"], ["jane doe"]]
+
+
+def test_author_lookup(base_url, api):
+    status, body = request(f"{base_url}/authors/joe%20allen?number=5")
+    assert status == 200
+    assert body["joe allen"][0]["doi"] == "10.1/a"
+
+    status, stats = request(f"{base_url}/stats")
+    assert status == 200
+    assert stats["counters"]["authors_written"] == 1
+
+
+def test_bad_requests(base_url):
+    assert request(f"{base_url}/jobs/missing")[0] == 404
+    assert request(f"{base_url}/jobs", {"authors": ["joe allen"], "apis": ["Nope"]})[0] == 400
+    assert request(f"{base_url}/authors/joe%20allen?apis=Nope")[0] == 400
+    assert request(f"{base_url}/authors/joe%20allen?number=0")[0] == 400
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        ["joe allen"],
+        {"authors": "joe allen"},
+        {"authors": [["joe", "allen"]]},
+        {"authors": ["joe allen"], "number": "5"},
+        {"authors": ["joe allen"], "number": 0},
+        {"authors": ["joe allen"], "number": True},
+        {"authors": ["joe allen"], "apis": "PubMed"},
+        {"roster": 3},
+    ],
+)
+def test_malformed_jobs_are_rejected(base_url, body):
+    status, response = request(f"{base_url}/jobs", body)
+    assert status == 400
+    assert "error" in response
+
+
+def test_truncated_authors_are_listed_apart():
+    collector = ResultsCollector()
+    collector.write("joe allen", [{"doi": "10.1/a"}])
+    collector.write("jane doe", [], truncated=True)
+    # results keep the shape of the JSON output
+    assert collector.results == [{"joe allen": [{"doi": "10.1/a"}]}, {"jane doe": []}]
+    assert collector.truncated == ["jane doe"]
+
+
+def test_unexpected_errors_get_a_response(base_url, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(ScrapeService, "submit", fail)
+    assert request(f"{base_url}/jobs", {"authors": ["joe allen"]}) == (500, {"error": "boom"})
@@ -0,0 +1,97 @@
+import pytest
+from click.testing import CliRunner
+
+from pubscraper import main
+from pubscraper.store import PublicationStore
+
+
+def pub(doi, title, date="2024-01-01", journal="Sample Journal", source="PubMed"):
+    return {
+        "from": source,
+        "doi": doi,
+        "title": title,
+        "journal": journal,
+        "publication_date": date,
+        "authors": "Joe Allen",
+    }
+
+
+@pytest.fixture
+def store():
+    store = PublicationStore()
+    store.write("joe allen", [pub("10.1/a", "Protein folding"), pub("10.1/b", "Dark matter")])
+    store.write("jane doe", [pub("10.1/A", "Protein folding", journal=None)])
+    store.write("jane doe", [pub("10.1/c", "Galaxy survey", date="2023-06-01", source="CrossRef")])
+    yield store
+    store.close()
+
+
+def test_upsert_keeps_one_row_per_publication(store):
+    assert store.counts() == {"publications": 3, "authors": 2}
+    # the journal missing from the second sighting is kept from the first
+    ((_, publication),) = store.query(doi="10.1/A", author="jane")
+    assert publication["journal"] == "Sample Journal"
+    assert [a for a, _ in store.query(journal="sample", doi="10.1/a")] == ["jane doe", "joe allen"]
+
+
+def test_query(store):
+    assert [p["title"] for _, p in store.query(author="joe")] == ["Protein folding", "Dark matter"]
+    assert [p["doi"] for _, p in store.query(source="CrossRef")] == ["10.1/c"]
+    assert [p["doi"] for _, p in store.query(since="2024-01-01", author="jane")] == ["10.1/A"]
+    assert [p["doi"] for _, p in store.query(until="2024-01-01")] == ["10.1/c"]
+    assert {a for a, _ in store.query(title="protein")} == {"joe allen", "jane doe"}
+    assert len(store.query(limit=2)) == 2
+
+
+def test_dates_are_compared_as_iso_dates():
+    store = PublicationStore()
+    # efetch-style date, as older PubMed results have them
+    store.write("joe allen", [pub("10.1/d", "Cell biology", date="2024-Jan-05")])
+    store.write("joe allen", [pub("10.1/e", "Immunology", date="2024-03-01")])
+    assert [p["doi"] for _, p in store.query(since="2024-02-01")] == ["10.1/e"]
+    assert [p["doi"] for _, p in store.query(until="2024-02-01")] == ["10.1/d"]
+    assert [p["doi"] for _, p in store.query()] == ["10.1/e", "10.1/d"]
+    store.close()
+
+
+def test_query_command(tmp_path):
+    path = str(tmp_path / "publications.sqlite")
+    store = PublicationStore(path)
+    store.write("joe allen", [pub("10.1/a", "Protein folding")])
+    store.close()
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ["--store_file", path, "query", "--title", "folding"])
+    assert result.exit_code == 0
+    assert result.output.split("\t")[:2] == ["2024-01-01", "joe allen"]
+
+    report = tmp_path / "report.csv"
+    result = runner.invoke(
+        main.main, ["--store_file", path, "query", "--since", "2025", "--report", str(report)]
+    )
+    assert result.exit_code == 0
+    assert report.read_text().splitlines()[1:] == []
+
+    result = runner.invoke(main.main, ["--store_file", str(tmp_path / "nope"), "query"])
+    assert result.exit_code == 2
+
+
+def test_query_command_rejects_invalid_title_syntax(tmp_path):
+    path = str(tmp_path / "publications.sqlite")
+    store = PublicationStore(path)
+    store.write("joe allen", [pub("10.1/a", "Protein folding")])
+    full_text = store.full_text
+    store.close()
+    if not full_text:
+        pytest.skip("SQLite was built without FTS5")
+
+    runner = CliRunner()
+    for title in ("protein-folding", '"protein', "AND"):
+        result = runner.invoke(main.main, ["--store_file", path, "query", "--title", title])
+        assert result.exit_code == 2, result.output
+        assert "--title" in result.output
+    result = runner.invoke(
+        main.main, ["--store_file", path, "query", "--title", '"protein-folding"']
+    )
+    assert result.exit_code == 0
+    assert "joe allen" in result.output
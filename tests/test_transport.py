@@ -0,0 +1,133 @@
+import pytest
+import requests
+import responses
+
+from pubscraper.cache import RESPONSE, Cache
+from pubscraper import transport as transport_module
+from pubscraper.transport import (
+    HTTPXSession,
+    ResponseTooLarge,
+    Transport,
+    make_session,
+    request_key,
+)
+
+URL = "https://api.crossref.org/works"
+
+
+@pytest.fixture
+def transport():
+    return Transport("CrossRef", Cache(), ttl=60)
+
+
+@responses.activate
+def test_fresh_response_is_served_from_cache(transport):
+    responses.add(responses.GET, URL, json={"message": "hello"})
+    first = transport.get(URL, params={"rows": 1})
+    second = transport.get(URL, params={"rows": 1})
+    assert first.json() == second.json() == {"message": "hello"}
+    assert len(responses.calls) == 1
+    assert transport.stats.get("CrossRef.http.fetches") == 1
+    assert transport.stats.get("CrossRef.http.hits") == 1
+
+
+@responses.activate
+def test_expired_response_is_revalidated(transport):
+    responses.add(
+        responses.GET, URL, json={"message": "hello"}, headers={"ETag": '"abc"'}
+    )
+    responses.add(
+        responses.GET,
+        URL,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+    )
+    transport.get(URL, params={"rows": 1})
+    # expire the cached response
+    transport.cache.touch(RESPONSE, request_key(URL, {"rows": 1}), ttl=-1)
+
+    response = transport.get(URL, params={"rows": 1})
+    assert response.json() == {"message": "hello"}
+    assert transport.stats.get("CrossRef.http.fetches") == 1
+    assert transport.stats.get("CrossRef.http.revalidations") == 1
+
+    # the 304 renewed the cached copy
+    transport.get(URL, params={"rows": 1})
+    assert transport.stats.get("CrossRef.http.hits") == 1
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_errors_are_not_cached(transport):
+    responses.add(responses.GET, URL, status=500)
+    responses.add(responses.GET, URL, json={"message": "hello"})
+    with pytest.raises(requests.exceptions.HTTPError):
+        transport.get(URL).raise_for_status()
+    assert transport.get(URL).json() == {"message": "hello"}
+
+
+@responses.activate
+def test_requests_can_bypass_the_cache(transport):
+    responses.add(responses.GET, URL, json={"message": "hello"})
+    transport.get(URL, params={"rows": 0})
+    transport.get(URL, params={"rows": 0}, use_cache=False)
+    assert len(responses.calls) == 2
+    # uncached responses aren't stored either
+    transport.get(URL, params={"rows": 1}, use_cache=False)
+    assert transport.cache.get(RESPONSE, request_key(URL, {"rows": 1})) is None
+
+
+@responses.activate
+def test_zero_ttl_disables_caching():
+    responses.add(responses.GET, URL, json={"message": "hello"})
+    transport = Transport("CrossRef", Cache(), ttl=0)
+    transport.get(URL)
+    transport.get(URL)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_oversized_responses_are_abandoned():
+    responses.add(responses.GET, URL, body="x" * 1000)
+    transport = Transport("CrossRef", Cache(), ttl=60, max_bytes=100)
+    with pytest.raises(ResponseTooLarge):
+        transport.get(URL)
+    assert transport.stats.get("CrossRef.http.oversized") == 1
+    # nothing was cached, and a larger limit lets the body through
+    transport.max_bytes = 1000
+    assert transport.get(URL).text == "x" * 1000
+    assert len(responses.calls) == 2
+
+
+def test_unknown_client():
+    with pytest.raises(ValueError, match="Unknown HTTP client"):
+        make_session("urllib")
+
+
+@pytest.mark.skipif(transport_module.httpx is not None, reason="httpx is installed")
+def test_httpx_client_needs_httpx():
+    with pytest.raises(RuntimeError, match="pip install"):
+        Transport("CrossRef", Cache(), client="httpx")
+
+
+@pytest.mark.skipif(transport_module.httpx is None, reason="httpx is not available")
+def test_httpx_client():
+    httpx = transport_module.httpx
+
+    def handler(request):
+        if request.url.params.get("rows") == "0":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"message": "hello"}, headers={"ETag": '"abc"'})
+
+    transport = Transport("CrossRef", Cache(), ttl=60)
+    transport.session = HTTPXSession(transport=httpx.MockTransport(handler))
+    assert transport.get(URL, params={"rows": 1}).json() == {"message": "hello"}
+    # the response was cached like one sent with requests
+    assert transport.get(URL, params={"rows": 1}).json() == {"message": "hello"}
+    assert transport.stats.get("CrossRef.http.hits") == 1
+    with pytest.raises(requests.exceptions.HTTPError):
+        transport.get(URL, params={"rows": 0}).raise_for_status()
+
+    transport.max_bytes = 5
+    with pytest.raises(ResponseTooLarge):
+        transport.get(URL, params={"rows": 2})